@@ -0,0 +1,4 @@
+'''Common core of the generators (genart1.py ... genart13.py): geometry,
+drawing and utility helpers. Geometry primitives are batched: they take one
+point (tuple) or many points at once (array of shape (N, 2)).
+'''
@@ -0,0 +1,243 @@
+'''Command line of the generators (run from the repository root):
+
+  python -m genart list
+  python -m genart params genart6
+  python -m genart render genart6 --size 800x600 --sticks 5000 --seed 1 \
+                          -o sticks.jpg
+  python -m genart render 7 -p variant.toml -s SHADOWDEPTH=50 --tile 128
+  python -m genart render genart10 --supersample 4 --resample lanczos
+  python -m genart render genart10 --seed 7 --cache
+  python -m genart render genart9 --size 15360x8640 --tile 256 --png fast
+  python -m genart preview genart8 --scales .25,.5,1 -o preview.png
+  python -m genart batch genart6 -x STICKS=500,5000 -x RADIUS=200,450 \
+                         --seeds 10 -o 'thumbs/{name}-{STICKS}-{RADIUS}-{SEED}.jpg'
+  python -m genart bench genart8 genart10 --scales 1,2 --baseline bench.json
+  python -m genart profile genart12 -s STAMPS=False --folded genart12.folded
+
+Parameters are applied in the order: file (`-p`), `-s NAME=VALUE`, named
+options (`--size`, ...). Values of `-s` are Python literals or strings. Values
+of sweeps (`-x`) are separated by commas, a tuple value needs a trailing
+comma: `-x SIZE=(800,600),`.
+'''
+import argparse
+import ast
+import json
+import sys
+import time
+
+from genart import batch, bench, cache, png, preview
+from genart import gen as generators
+from genart.instrument import VALUES, Instrumented, Stats
+from genart.rng import rng
+from genart.tile import render
+
+
+def literal(s):
+  'Python literal `s` (number, tuple, ...) or the string itself'
+  try:
+    return ast.literal_eval(s)
+  except (ValueError, SyntaxError):
+    return s
+
+def assignment(s, value=literal):
+  name, sep, v = s.partition('=')
+  if not sep:
+    raise argparse.ArgumentTypeError('expected NAME=VALUE: %r' % s)
+  return name.strip().upper(), value(v.strip())
+
+def values(s):
+  'List of values (Python literals) separated by commas'
+  vs = literal(s)
+  return list(vs) if isinstance(vs, (tuple, list)) else [vs]
+
+def axis(s):
+  return assignment(s, values)
+
+def size(s):
+  try:
+    w, h = s.lower().replace(',', 'x').split('x')
+    return (int(w), int(h))
+  except ValueError:
+    raise argparse.ArgumentTypeError('expected WxH: %r' % s)
+
+def parser():
+  p = argparse.ArgumentParser(prog='python -m genart',
+                              description='Generative art generators')
+  cmds = p.add_subparsers(dest='cmd', required=True)
+  cmds.add_parser('list', help='list generators')
+  ps = cmds.add_parser('params', help='show parameters of a generator')
+  ps.add_argument('name')
+  r = cmds.add_parser('render', help='render a generator')
+  add_params(r, out='picture file (OUT of the generator)')
+  r.add_argument('--tile', type=int, help='render by bands of TILE rows')
+  r.add_argument('--workers', type=int, help='processes of tiled rendering')
+  r.add_argument('--canvas', action='store_true',
+                 help='draw on NumPy canvas (genart.canvas)')
+  r.add_argument('--supersample', type=int, metavar='N',
+                 help='antialias: draw N times larger and reduce '
+                      '(genart.supersample)')
+  r.add_argument('--resample', choices=('box', 'lanczos'), default='box',
+                 help='filter of --supersample (default %(default)s)')
+  r.add_argument('--png', choices=sorted(png.PRESETS),
+                 help='write PNG by strips in threads (genart.png), from '
+                      'tiles as they are rendered with --tile')
+  r.add_argument('--cache', nargs='?', const=cache.DIR, metavar='DIR',
+                 help='take/store the picture in the render cache '
+                      '(genart.cache, default %s)' % cache.DIR)
+  v = cmds.add_parser('preview', help='render a generator progressively')
+  add_params(v, out='picture file (OUT of the generator), saved at every '
+                    'scale')
+  v.add_argument('--scales', type=values, default=preview.SCALES,
+                 help='scales of the previews (default %s)' % ','.join(
+                   '%g' % s for s in preview.SCALES))
+  b = cmds.add_parser('batch', help='render variants of a generator')
+  add_params(b, out='template of picture files (default %r), see '
+                    'genart.batch.jobs()' % batch.OUT.replace('%', '%%'))
+  b.add_argument('-x', '--sweep', metavar='NAME=V1,V2,...', type=axis,
+                 action='append', default=[], help='values of parameter')
+  b.add_argument('--seeds', type=int, metavar='N', help='sweep SEED over 0..N-1')
+  b.add_argument('--workers', type=int, help='processes (all CPUs by default)')
+  m = cmds.add_parser('bench', help='benchmark generators')
+  m.add_argument('names', nargs='*', help='generators (all by default)')
+  m.add_argument('--scales', type=values, default=bench.SCALES,
+                 help='scales of SIZE (default %s)' % ','.join(
+                   '%g' % s for s in bench.SCALES))
+  m.add_argument('--seed', type=int, default=bench.SEED)
+  m.add_argument('--repeat', type=int, default=bench.REPEAT,
+                 help='renders of a case, the fastest is taken')
+  m.add_argument('--timeout', type=int, default=bench.TIMEOUT,
+                 help='seconds of one case')
+  m.add_argument('-o', '--out', help='JSON file of results')
+  m.add_argument('--baseline', help='JSON file of results to compare with')
+  m.add_argument('--tolerance', type=float, default=bench.TOLERANCE,
+                 help='time/RSS growth which is a regression')
+  f = cmds.add_parser('profile', help='statistics of drawing primitives')
+  add_params(f, out='picture file (not saved by default)')
+  f.add_argument('--folded', metavar='FILE',
+                 help='folded stacks for flamegraph.pl')
+  f.add_argument('--value', choices=VALUES, default='seconds',
+                 help='value of folded stacks')
+  return p
+
+def add_params(p, out):
+  'Options of generator name and its parameters of command parser `p`'
+  p.add_argument('name', help='generator: genart6 or just 6')
+  p.add_argument('-p', '--params', metavar='FILE',
+                 help='TOML/JSON file with parameters')
+  p.add_argument('-s', '--set', metavar='NAME=VALUE', type=assignment,
+                 action='append', default=[], help='parameter')
+  p.add_argument('--size', type=size, metavar='WxH')
+  p.add_argument('--radius', type=int)
+  p.add_argument('--sticks', type=int)
+  p.add_argument('--cells', type=int)
+  p.add_argument('--seed', type=int)
+  p.add_argument('-o', '--out', help=out)
+  p.add_argument('-f', '--format', help='PNG, JPEG, ... (by extension of OUT)')
+
+def overrides(args, names=('size', 'radius', 'sticks', 'cells', 'seed', 'out')):
+  'Parameters of command `args` as {NAME: value} and the picture format'
+  ps = generators.read_params(args.params) if args.params else {}
+  fmt = ps.pop('FORMAT', None)
+  ps.update(args.set)
+  for name in names:
+    if getattr(args, name) is not None:
+      ps[name.upper()] = getattr(args, name)
+  return ps, args.format or fmt
+
+def run_batch(args):
+  name, _ = generators.find(args.name)
+  ps, fmt = overrides(args, names=('size', 'radius', 'sticks', 'cells', 'seed'))
+  axes = dict(args.sweep)
+  if args.seeds:
+    axes['SEED'] = range(args.seeds)
+  variants = [dict(ps, **v) for v in batch.sweep(**axes)]
+  jobs = batch.jobs(name, variants, args.out or batch.OUT, fmt)
+  t = time.perf_counter()
+  results = []
+  for res in batch.run(jobs, args.workers):
+    results.append(res)
+    print('%s (seed %s) %.2fs' % (res.out, res.seed, res.seconds), flush=True)
+  rate, mean = batch.throughput(results, time.perf_counter() - t)
+  print('%d pictures: %.2f pictures/s, %.2fs per picture' % (len(results),
+                                                             rate, mean))
+
+def run_preview(args):
+  ps, fmt = overrides(args)
+  gen = generators.load(args.name, **ps)
+  out = gen.OUT
+  fmt = generators.image_format(out, fmt)
+  t = time.perf_counter()
+  def save(img, scale):
+    kw = {'pnginfo': rng.pnginfo()} if fmt == 'PNG' else {}
+    img.save(out, format=fmt, **kw)
+    print('%s x%g %dx%d %.2fs (seed %s)' % (out, scale, img.width, img.height,
+                                          time.perf_counter() - t, rng.root),
+          flush=True)
+  preview.progressive(gen, args.scales, save)
+
+def run_bench(args):
+  log = lambda case, res: print('%s: %s' % (case, bench.format_result(res)),
+                                flush=True)
+  results = bench.bench(args.names, args.scales, args.seed, args.repeat,
+                        args.timeout, log)
+  if args.out:
+    with open(args.out, 'w') as f:
+      json.dump(results, f, indent=1)
+  if args.baseline:
+    with open(args.baseline) as f:
+      diffs = bench.compare(results, json.load(f), args.tolerance)
+    for case, msg, regression in diffs:
+      print('%s %s: %s' % ('REGRESSION' if regression else 'changed', case,
+                           msg))
+    if any(regression for *_, regression in diffs):
+      sys.exit(1)
+
+def run_profile(args):
+  ps, fmt = overrides(args, names=('size', 'radius', 'sticks', 'cells', 'seed'))
+  gen = generators.load(args.name, **ps)
+  stats = Stats()
+  t = time.perf_counter()
+  img = render(gen, wrap=lambda dr: Instrumented(dr, stats))
+  print('%s: %.3fs (seed %s)' % (gen.__name__, time.perf_counter() - t,
+                                 rng.root))
+  print(stats.table('primitive'))
+  print(stats.table('caller'))
+  if args.folded:
+    with open(args.folded, 'w') as f:
+      f.write(stats.folded(args.value))
+  if args.out:
+    img.save(args.out, format=generators.image_format(args.out, fmt))
+
+def main(argv=None):
+  args = parser().parse_args(argv)
+  try:
+    if args.cmd == 'list':
+      for name in generators.names():
+        print(name)
+    elif args.cmd == 'params':
+      gen = generators.load(args.name)
+      for k, v in generators.params(gen).items():
+        print('%s = %r' % (k, v))
+    elif args.cmd == 'batch':
+      run_batch(args)
+    elif args.cmd == 'preview':
+      run_preview(args)
+    elif args.cmd == 'bench':
+      run_bench(args)
+    elif args.cmd == 'profile':
+      run_profile(args)
+    else:
+      ps, fmt = overrides(args)
+      gen = generators.load(args.name, **ps)
+      rc = cache.RenderCache(args.cache) if args.cache else None
+      out = generators.save(gen, format=fmt, cache=rc, png=args.png,
+                            tile=args.tile, workers=args.workers,
+                            canvas=args.canvas,
+                            supersample=args.supersample,
+                            resample=args.resample)
+      print('%s (seed %s)' % (out, rng.root))
+  except (AssertionError, ValueError, OSError) as e:
+    sys.exit('genart: %s' % e)
+
+if __name__ == '__main__':
+  main()
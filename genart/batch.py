@@ -0,0 +1,82 @@
+'''Batch rendering of variants: a sweep over parameters of a generator (all
+combinations of their values) is rendered in a pool of worker processes.
+Workers are started once (PIL, NumPy, the package are imported once per
+worker, not per picture) and every worker saves its pictures itself, so they
+are streamed to disk as they complete:
+
+  for res in run(jobs('genart6', sweep(STICKS=[500, 5000], SEED=range(10)),
+                      'out/sticks-{STICKS}-{SEED}.png')):
+    print(res.out, res.seconds)
+'''
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import itertools
+import os
+import time
+
+from genart import gen as generators
+from genart.rng import rng
+
+
+OUT = '{name}-{i:04d}.png'  # default template of file names of pictures
+
+Job = namedtuple('Job', 'name i params out format')
+Result = namedtuple('Result', 'job out seed seconds')
+
+
+def sweep(**axes):
+  '''All combinations of parameter values: `axes` are {NAME: values}, returns
+  list of {NAME: value}'''
+  names = list(axes)
+  return [dict(zip(names, vs))
+          for vs in itertools.product(*(list(axes[n]) for n in names))]
+
+def jobs(name, variants, out=OUT, format=None):
+  '''Jobs rendering generator `name` with every parameters of `variants`, `out`
+  is the template of file names: `str.format()` with `name`, `i` (index of
+  the variant) and parameters of the generator (`{STICKS}`, `{SIZE[0]}`, ...)
+  '''
+  return [Job(name, i, ps, out, format) for i, ps in enumerate(variants)]
+
+def out_path(job, gen):
+  'File name of the picture of `job` rendering generator `gen`'
+  try:
+    return job.out.format(name=job.name, i=job.i, **generators.params(gen))
+  except (KeyError, IndexError) as e:
+    raise ValueError('Unknown field %s in %r' % (e, job.out))
+
+def render_job(job):
+  'Renders and saves `job`, returns `Result`'
+  t = time.perf_counter()
+  gen = generators.load(job.name, **job.params)
+  out = out_path(job, gen)
+  os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+  out = generators.save(gen, out, format=job.format)
+  return Result(job, out, rng.root, time.perf_counter() - t)
+
+def _init_worker():
+  # warms the worker up: imports of PIL, NumPy and the package are done here
+  # once, not in the first job
+  import numpy
+  from PIL import Image, ImageDraw, PngImagePlugin
+  from genart import canvas, color, draw, font, geom, stamp, tile
+
+def run(jobs, workers=None):
+  '''Renders `jobs` in `workers` processes (all CPUs by default), yields
+  `Result`-s in the order of completion'''
+  workers = min(workers or os.cpu_count() or 1, len(jobs))
+  if workers <= 1:
+    for job in jobs:
+      yield render_job(job)
+    return
+  with ProcessPoolExecutor(workers, initializer=_init_worker) as ex:
+    futures = [ex.submit(render_job, job) for job in jobs]
+    for f in as_completed(futures):
+      yield f.result()
+
+def throughput(results, seconds):
+  '''Pictures per second of `results` done for `seconds` (wall time) and the
+  mean time of one picture in a worker'''
+  n = len(results)
+  mean = sum(r.seconds for r in results) / n if n else 0.
+  return (n / seconds if seconds else 0.), mean
@@ -0,0 +1,142 @@
+'''Benchmarks: every generator is rendered at scales of its native SIZE (x0.5,
+x1, x2, x4) with a fixed seed. Every case runs in a new process, which
+reports wall time of the rendering (the best of REPEAT ones), peak RSS and
+the number of PIL draw calls (per `ImageDraw` method and `Image.paste()`).
+Results are JSON:
+
+  {"cases": {"genart6@x1": {"size": [1200, 900], "seconds": 0.42,
+                            "rss_kb": 61234, "calls": {"polygon": 97200},
+                            "draw_calls": 97200}, ...}, ...}
+
+which is compared with a stored baseline by `compare()`:
+
+  python -m genart bench -o bench.json
+  python -m genart bench genart8 genart10 --baseline bench.json
+'''
+import functools
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from genart import gen as generators
+
+
+SCALES = (0.5, 1, 2, 4)
+SEED = 1
+REPEAT = 3  # renders of one case, the fastest one is taken
+TIMEOUT = 600  # seconds of one case
+TOLERANCE = 0.1  # slowdown (ratio) or RSS growth which is a regression
+
+
+def case_name(name, scale):
+  return '%s@x%g' % (name, scale)
+
+def count_calls(counts):
+  '''Counts calls of drawing methods of all `ImageDraw.Draw` objects and of
+  `Image.paste()` in `counts` ({method: number}). Patches PIL classes, so it
+  is for a process of one benchmark case only'''
+  from PIL import Image, ImageDraw
+  from genart.tile import DRAW_METHODS
+  def counted(cls, name):
+    method = getattr(cls, name)
+    @functools.wraps(method)
+    def wrapper(*args, **kw):
+      counts[name] = counts.get(name, 0) + 1
+      return method(*args, **kw)
+    setattr(cls, name, wrapper)
+  for name in DRAW_METHODS | {'regular_polygon'}:
+    counted(ImageDraw.ImageDraw, name)
+  counted(Image.Image, 'paste')
+
+def run_case(name, scale, seed=SEED, repeat=REPEAT):
+  '''Renders generator `name` at `scale` of its SIZE with `seed` in this
+  process `repeat` times, returns the result of the case'''
+  from genart.tile import render
+  counts = {}
+  count_calls(counts)
+  seconds = math.inf
+  for _ in range(repeat):
+    # a new module every time: no sprites of stamps cached by the previous one
+    gen = generators.load(name, SEED=seed)
+    generators.configure(gen, SIZE=tuple(int(c * scale) for c in gen.SIZE))
+    counts.clear()
+    t = time.perf_counter()
+    render(gen)
+    seconds = min(seconds, time.perf_counter() - t)
+  return {'size': list(gen.SIZE), 'seconds': seconds,
+          'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+          'calls': counts,
+          'draw_calls': sum(n for k, n in counts.items() if k != 'paste')}
+
+def bench_case(name, scale, seed=SEED, repeat=REPEAT, timeout=TIMEOUT):
+  'Runs the case in a new process, returns its result or {"error": ...}'
+  env = dict(os.environ)
+  env['PYTHONPATH'] = os.pathsep.join(filter(None, [generators.ROOT,
+                                                    env.get('PYTHONPATH')]))
+  cmd = [sys.executable, '-m', 'genart.bench', name, str(scale), str(seed),
+         str(repeat)]
+  try:
+    p = subprocess.run(cmd, env=env, capture_output=True, text=True,
+                       timeout=timeout)
+  except subprocess.TimeoutExpired:
+    return {'error': 'timeout %ss' % timeout}
+  if p.returncode:
+    lines = p.stderr.strip().splitlines()
+    return {'error': lines[-1] if lines else 'exit code %s' % p.returncode}
+  return json.loads(p.stdout)
+
+def bench(names=None, scales=SCALES, seed=SEED, repeat=REPEAT,
+          timeout=TIMEOUT, log=None):
+  '''Runs cases of generators `names` (all by default) at `scales`, `log(case,
+  result)` is called after every case. Returns results as JSON-able dict'''
+  from PIL import __version__ as pil_version
+  cases = {}
+  for name in names or generators.names():
+    name, _ = generators.find(name)
+    for scale in scales:
+      res = cases[case_name(name, scale)] = bench_case(name, scale, seed,
+                                                       repeat, timeout)
+      if log:
+        log(case_name(name, scale), res)
+  return {'python': platform.python_version(), 'pillow': pil_version,
+          'machine': platform.machine(), 'cpus': os.cpu_count(), 'seed': seed,
+          'repeat': repeat, 'cases': cases}
+
+def compare(results, baseline, tolerance=TOLERANCE):
+  '''Differences of `results` from `baseline` (both are of `bench()`) as list
+  of `(case, message, is_regression)` for cases present in both. Time and RSS
+  grown more than by `tolerance` are regressions; changed numbers of draw
+  calls are reported too (they don't depend on the machine)'''
+  diffs = []
+  for case, res in results['cases'].items():
+    base = baseline['cases'].get(case)
+    if base is None or 'error' in base:
+      continue
+    if 'error' in res:
+      diffs.append((case, 'failed: %s' % res['error'], True))
+      continue
+    for key, unit in (('seconds', 's'), ('rss_kb', 'KB')):
+      ratio = res[key] / base[key] if base[key] else 1.
+      if abs(ratio - 1) > tolerance:
+        diffs.append((case, '%s %.4g%s -> %.4g%s (x%.2f)' % (
+          key, base[key], unit, res[key], unit, ratio), ratio > 1))
+    if res['draw_calls'] != base['draw_calls']:
+      diffs.append((case, 'draw calls %d -> %d' % (base['draw_calls'],
+                                                   res['draw_calls']), False))
+  return diffs
+
+def format_result(res):
+  if 'error' in res:
+    return 'error: %s' % res['error']
+  return '%dx%d %.3fs %dKB %d draw calls' % (*res['size'], res['seconds'],
+                                             res['rss_kb'], res['draw_calls'])
+
+if __name__ == '__main__':
+  # a case in the new process (see `bench_case()`): NAME SCALE SEED REPEAT
+  name, scale, seed, repeat = sys.argv[1:5]
+  print(json.dumps(run_case(name, float(scale), int(seed), int(repeat))))
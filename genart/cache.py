@@ -0,0 +1,249 @@
+'''On-disk cache of pictures, content-addressed: the key is a hash of the
+source of the generator (and of the package), its parameters (all but OUT),
+the seed and the options of `render()` which change pixels, so a change of
+any of them is a miss and stale entries are just never read again:
+
+  cache = RenderCache()
+  data = cache.render(gen, seed=1, format='PNG')  # encoded picture (mmap)
+
+  <dir>/ab/ab12...ef.png        files named by keys
+  <dir>/3c/3c45...01.npy        layers (`layer()`): arrays and images
+
+Hits are files memory-mapped (`mmap`), nothing is decoded or copied. Every
+hit touches the file, the least recently used files are removed when the
+total size is over `maxsize`. Files are written atomically (renamed), so
+processes of `genart.batch` or of a web server share one directory.
+
+Intermediate layers (sprites of stamps, masks, ...) are cached by `layer()`
+while `render()` of the cache runs: one generator with another seed or
+parameters of the final picture only gets them from disk.
+'''
+import functools
+import glob
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import types
+import numpy as np
+from PIL import Image
+
+from genart import gen as generators
+from genart.rng import rng
+from genart.tile import render
+
+
+DIR = os.environ.get('GENART_CACHE') or os.path.join(
+  os.path.expanduser('~'), '.cache', 'genart')
+MAXSIZE = 1 << 30  # bytes
+PACKAGE = os.path.dirname(os.path.abspath(__file__))
+# options of `render()` which don't change pixels:
+NOTKEY = {'tile', 'workers', 'canvas'}
+
+# (cache, key of the generator but SEED) of the rendering in progress:
+_Active = None
+
+
+@functools.lru_cache(maxsize=None)
+def _file_digest(path, mtime_ns, size):
+  with open(path, 'rb') as f:
+    return hashlib.sha256(f.read()).hexdigest()
+
+def source_digest(*paths):
+  '''Hash of the contents of files `paths` and of the package's sources, files
+  are read again only if they are changed'''
+  paths = list(paths) + sorted(glob.glob(os.path.join(PACKAGE, '*.py')))
+  h = hashlib.sha256()
+  for p in paths:
+    st = os.stat(p)
+    h.update(_file_digest(p, st.st_mtime_ns, st.st_size).encode())
+  return h.hexdigest()
+
+def canonical(v):
+  '''Stable text of value `v` for hashing: `repr()`, but functions (lambdas of
+  parameters) are their code, not the address'''
+  if isinstance(v, dict):
+    return '{%s}' % ', '.join('%s: %s' % (canonical(k), canonical(v[k]))
+                              for k in sorted(v, key=repr))
+  if isinstance(v, (list, tuple)):
+    return '%s(%s)' % (type(v).__name__, ', '.join(canonical(x) for x in v))
+  if isinstance(v, types.FunctionType):
+    code = v.__code__
+    return 'code(%s, %s, %s)' % (code.co_code.hex(), canonical(code.co_consts),
+                                 canonical(code.co_names))
+  if isinstance(v, types.CodeType):
+    return canonical(types.FunctionType(v, {}))
+  return repr(v)
+
+def digest(*parts):
+  'Hex key of `parts` (see `canonical()`)'
+  return hashlib.sha256(canonical(parts).encode()).hexdigest()
+
+def layer(name, build, *deps):
+  '''Intermediate layer `name` (PIL image or NumPy array) returned by `build()`:
+  cached by the cache of the rendering in progress with the source and the
+  parameters (but SEED) of the generator and `deps` (other values which the
+  layer depends on), just `build()` without it'''
+  if _Active is None:
+    return build()
+  cache, base = _Active
+  return cache.layer(digest('layer', base, name, deps), build)
+
+class RenderCache:
+  '''Pictures and layers in the directory `dir`, at most `maxsize` bytes, see
+  the module'''
+  def __init__(self, dir=DIR, maxsize=MAXSIZE):
+    self.dir = dir
+    self.maxsize = maxsize
+    self.hits = self.misses = 0
+
+  def path(self, key, ext):
+    return os.path.join(self.dir, key[:2], '%s.%s' % (key, ext))
+
+  def _open(self, key, ext):
+    path = self.path(key, ext)
+    try:
+      with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      os.utime(path)  # recently used
+    except (FileNotFoundError, ValueError):  # ValueError: empty file
+      return None
+    return data
+
+  def get(self, key, ext):
+    'Memory-mapped file of `key` (read-only `mmap`), None if it is not cached'
+    data = self._open(key, ext)
+    if data is None:
+      self.misses += 1
+    else:
+      self.hits += 1
+    return data
+
+  def put(self, key, ext, data):
+    'Stores `data` (bytes) as the file of `key`, returns its path'
+    path = self.path(key, ext)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+      os.replace(tmp, path)
+    except BaseException:
+      os.remove(tmp)
+      raise
+    self.evict()
+    return path
+
+  def files(self):
+    'Cached files as a list of `(mtime, size, path)`'
+    res = []
+    for path in glob.glob(os.path.join(self.dir, '??', '*.*')):
+      if path.endswith('.tmp'):
+        continue
+      try:
+        st = os.stat(path)
+      except FileNotFoundError:  # removed by another process
+        continue
+      res.append((st.st_mtime, st.st_size, path))
+    return res
+
+  def evict(self):
+    'Removes the least recently used files while they are over `maxsize`'
+    files = sorted(self.files())
+    total = sum(size for _, size, _ in files)
+    for _, size, path in files:
+      if total <= self.maxsize:
+        break
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+      total -= size
+
+  def clear(self):
+    'Removes all cached files'
+    for _, _, path in self.files():
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+
+  def gen_key(self, gen, *exclude):
+    '''Key of generator `gen`: its source and parameters (all but OUT and
+    `exclude`)'''
+    ps = generators.params(gen)
+    for k in ('OUT',) + exclude:
+      ps.pop(k, None)
+    return digest(source_digest(gen.__file__), gen.__name__, ps)
+
+  def key(self, gen, seed, format, **render_kw):
+    'Key of the picture of generator `gen` with `seed` in `format`'
+    opts = {k: v for k, v in render_kw.items()
+            if k not in NOTKEY and v is not None}
+    if not opts.get('supersample'):
+      opts.pop('resample', None)
+    return digest(self.gen_key(gen), seed, format, opts)
+
+  def render(self, gen, *, seed=None, format='PNG', **render_kw):
+    '''The picture of generator `gen` with `seed` (`gen.SEED` by default)
+    encoded in `format` (PIL format, PNG gets the seed): from the cache or
+    rendered by `render()` with `render_kw` and cached. Returns bytes-like
+    (`mmap` of the file on hits). A random seed (None) is not cached'''
+    global _Active
+    seed = getattr(gen, 'SEED', None) if seed is None else seed
+    if seed is None:
+      return self._encode(render(gen, **render_kw), format)
+    key = self.key(gen, seed, format, **render_kw)
+    ext = format.lower()
+    data = self.get(key, ext)
+    if data is not None:
+      rng.seed(seed)  # the same state as after a rendering (`rng.pnginfo()`)
+      return data
+    _Active = (self, self.gen_key(gen, 'SEED'))
+    try:
+      img = render(gen, seed=seed, **render_kw)
+    finally:
+      _Active = None
+    data = self._encode(img, format)
+    self.put(key, ext, data)
+    return data
+
+  def image(self, gen, **kw):
+    'The picture of `render(gen, **kw)` as PIL image'
+    return Image.open(io.BytesIO(self.render(gen, **kw)))
+
+  def layer(self, key, build):
+    '''Layer of `key` built by `build()` (PIL image - stored as PNG, or NumPy
+    array - stored as .npy and memory-mapped read-only on hits)'''
+    data = self._open(key, 'png')
+    if data is not None:
+      self.hits += 1
+      img = Image.open(io.BytesIO(data))
+      img.load()
+      return img
+    path = self.path(key, 'npy')
+    try:
+      res = np.load(path, mmap_mode='r')
+      os.utime(path)
+      self.hits += 1
+      return res
+    except (FileNotFoundError, ValueError):
+      pass
+    self.misses += 1
+    res = build()
+    buf = io.BytesIO()
+    if isinstance(res, Image.Image):
+      res.save(buf, format='PNG')
+      self.put(key, 'png', buf.getvalue())
+    else:
+      np.save(buf, np.asarray(res))
+      self.put(key, 'npy', buf.getvalue())
+    return res
+
+  @staticmethod
+  def _encode(img, format):
+    buf = io.BytesIO()
+    kw = {'pnginfo': rng.pnginfo()} if format.upper() == 'PNG' else {}
+    img.save(buf, format=format, **kw)
+    return buf.getvalue()
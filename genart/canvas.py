@@ -0,0 +1,229 @@
+'''NumPy canvas: the picture is uint8 array `a` of shape (H, W, 3) ((H, W, 4)
+for RGBA, (H, W) for L) instead of PIL image. `Canvas` works as both `img`
+and `dr` of a generator (like `genart.tile.Recorder`): points, masks
+(`bitmap()`) and pastes of sprites are written straight into the array,
+spans and gradients are its own vectorized primitives, the rest of
+primitives (`line()`, `polygon()`, `text()`, ...) are drawn by PIL on the
+image of the same pixels:
+
+  cv = Canvas(gen.new_image())
+  gen.draw(cv, cv)        # or render(gen, canvas=True)
+  cv.fill_spans(xs, y0s, y1s, colors)
+  img = cv.image()
+
+The array and the PIL image are synchronized lazily: only a switch between
+NumPy and PIL primitives copies the picture, so runs of primitives of one
+kind cost nothing. Pixels are the same as of drawing on the PIL image
+(masks are blended with PIL's formula).
+'''
+import functools
+import numpy as np
+from PIL import Image, ImageDraw
+
+from genart.color import ink
+from genart.tile import DRAW_METHODS
+
+
+MODES = ('L', 'RGB', 'RGBA')  # modes of arrays
+
+
+def div255(v):
+  'v / 255 rounded like PIL does it (`v` is uint32 array)'
+  v = v + 128
+  return ((v >> 8) + v) >> 8
+
+def blend(dst, src, mask):
+  '''Blends `src` (pixel or array) into the array `dst` in-place by `mask`
+  (uint8 array, 255 - `src`, 0 - `dst`) as PIL's `paste()`/`bitmap()` do'''
+  m = mask.astype(np.uint32)
+  if dst.ndim == 3 and m.ndim == 2:
+    m = m[..., np.newaxis]
+  src = np.asarray(src, dtype=np.uint32)
+  dst[...] = div255(dst * (255 - m) + src * m)
+
+def put_points(a, xs, ys, fill):
+  '''Writes pixels (`xs`, `ys` - int arrays of array coords) of array `a`, ones
+  out of it are skipped, the last of repeated ones wins (like `dr.point()`).
+  `fill` is one pixel or an array of pixels (one per point)'''
+  h, w = a.shape[:2]
+  inside = (0 <= xs) & (xs < w) & (0 <= ys) & (ys < h)
+  xs = xs[inside]
+  ys = ys[inside]
+  if not len(xs):
+    return
+  fill = np.asarray(fill, dtype=np.uint8)
+  per_point = fill.ndim == a.ndim - 1
+  if per_point:
+    fill = fill[inside]
+  # numpy does not promise the order of assignment to repeated indexes, so
+  # keep only the last one:
+  idx = ys * w + xs
+  _, last = np.unique(idx[::-1], return_index=True)
+  last = len(idx) - 1 - last
+  a[ys[last], xs[last]] = fill[last] if per_point else fill
+
+def span_pixels(xs, y0s, y1s):
+  '''Pixels of vertical spans (column `xs[i]`, rows `y0s[i]`..`y1s[i]`
+  inclusive, int arrays) in the order of spans and of rows: returns arrays
+  `(px, py, si)`, `si` is the index of the span of the pixel'''
+  xs, y0s, y1s = np.broadcast_arrays(*(np.asarray(v, dtype=np.int64)
+                                       for v in (xs, y0s, y1s)))
+  n = np.maximum(y1s - y0s + 1, 0)
+  si = np.repeat(np.arange(len(n)), n)
+  starts = np.cumsum(n) - n  # index of the 1st pixel of every span
+  py = y0s[si] + (np.arange(len(si)) - starts[si])
+  return xs[si], py, si
+
+class Canvas:
+  '''The picture of PIL image `img` (`MODES`) as array `a`, see the module.
+  Other attributes (`textlength()`, `textbbox()`, ...) are of `ImageDraw.Draw`
+  '''
+  def __init__(self, img):
+    if img.mode not in MODES:
+      raise ValueError('Canvas of %s mode, expected one of %s' % (
+        img.mode, ', '.join(MODES)))
+    self.mode = img.mode
+    self.size = img.size
+    self._img = img  # PIL image, None if the array is newer
+    self._a = None  # the array, None if the image is newer
+    self._dr = None  # `ImageDraw.Draw` of `self._img`
+    self._inks = {}  # {fill: pixel}
+    # not drawing methods (`textlength()`, etc) are answered by it:
+    self._query = ImageDraw.Draw(Image.new(self.mode, (1, 1)))
+
+  @property
+  def width(self): return self.size[0]
+
+  @property
+  def height(self): return self.size[1]
+
+  @property
+  def a(self):
+    'The array of pixels for writing (the PIL image is out of date then)'
+    if self._a is None:
+      self._a = np.array(self._img)
+    self._img = self._dr = None
+    return self._a
+
+  def image(self):
+    'The picture as PIL image'
+    if self._img is None:
+      self._img = Image.fromarray(self._a, self.mode)
+    return self._img
+
+  def _draw(self):
+    'The image for PIL drawing (the array is out of date then) and its `dr`'
+    if self._dr is None:
+      self._dr = ImageDraw.Draw(self.image())
+    self._a = None
+    return self._img, self._dr
+
+  def __getattr__(self, name):
+    if name.startswith('_'):
+      raise AttributeError(name)
+    return getattr(self._query, name)
+
+  def _ink(self, fill):
+    try:
+      return self._inks[fill]
+    except TypeError:  # not hashable (list)
+      return ink(fill, self.mode)
+    except KeyError:
+      px = self._inks[fill] = ink(fill, self.mode)
+      return px
+
+  def _pil(self, name, *args, **kw):
+    return getattr(self._draw()[1], name)(*args, **kw)
+
+  for name in (DRAW_METHODS | {'regular_polygon'}) - {'point', 'bitmap'}:
+    locals()[name] = functools.partialmethod(_pil, name)
+  del name
+
+  def point(self, xy, fill=None):
+    'Like `dr.point()`: coords are truncated, the last point wins'
+    if fill is None:
+      return self._pil('point', xy)
+    px = self._ink(fill)
+    if len(xy) == 2 and not hasattr(xy[0], '__len__'):
+      # the most frequent case - one point
+      x, y = int(xy[0]), int(xy[1])
+      if 0 <= x < self.size[0] and 0 <= y < self.size[1]:
+        self.a[y, x] = px
+      return
+    self.scatter(xy, px)
+
+  def scatter(self, ps, fill):
+    '''Points `ps` (coords are truncated) with one color `fill` or an array of
+    colors (one per point)'''
+    ps = np.trunc(np.asarray(ps, dtype=float).reshape(-1, 2)).astype(np.int64)
+    put_points(self.a, ps[:, 0], ps[:, 1], fill)
+
+  def bitmap(self, xy, bitmap, fill=None):
+    'Like `dr.bitmap()`: `fill` blended by mask `bitmap` (L or 1 image)'
+    if fill is None or self.mode == 'RGBA' or bitmap.mode not in ('L', '1'):
+      # PIL blends the alpha of RGBA its own way
+      return self._pil('bitmap', xy, bitmap, fill=fill)
+    mask = np.asarray(bitmap)
+    if mask.dtype == bool:
+      mask = mask.astype(np.uint8) * 255
+    box = self._clip(int(xy[0]), int(xy[1]), mask.shape[1], mask.shape[0])
+    if box:
+      (x0, y0, x1, y1), (mx, my) = box
+      blend(self.a[y0:y1, x0:x1], self._ink(fill),
+            mask[my:my + y1 - y0, mx:mx + x1 - x0])
+
+  def paste(self, im, box=None, mask=None):
+    '''Like `Image.paste()`, image `im` of the same mode (or RGBA one on RGB
+    canvas) at the point `box` is pasted into the array, other cases by PIL'''
+    fast = (isinstance(im, Image.Image) and (box is None or len(box) == 2) and
+            (im.mode == self.mode or (self.mode, im.mode) == ('RGB', 'RGBA'))
+            and (mask is None or mask is im and im.mode == 'RGBA' or
+                 isinstance(mask, Image.Image) and mask.mode == 'L' and
+                 mask.size == im.size))
+    if not fast:
+      return self._draw()[0].paste(im, box, mask)
+    x, y = (0, 0) if box is None else box
+    clip = self._clip(x, y, *im.size)
+    if not clip:
+      return
+    (x0, y0, x1, y1), (sx, sy) = clip
+    src = np.asarray(im.crop((sx, sy, sx + x1 - x0, sy + y1 - y0)))
+    dst = self.a[y0:y1, x0:x1]
+    if mask is None:
+      dst[...] = src[..., :dst.shape[-1]] if dst.ndim == 3 else src
+      return
+    if mask is im:
+      m = src[..., 3]
+    else:
+      m = np.asarray(mask.crop((sx, sy, sx + x1 - x0, sy + y1 - y0)))
+    blend(dst, src[..., :dst.shape[-1]] if dst.ndim == 3 else src, m)
+
+  def _clip(self, x, y, w, h):
+    '''Box `(x0, y0, x1, y1)` of the rectangle of size (`w`, `h`) at (`x`,
+    `y`) within the canvas and its offset inside the rectangle, None if it is
+    out of the canvas'''
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, self.size[0]), min(y + h, self.size[1])
+    if x0 >= x1 or y0 >= y1:
+      return None
+    return (x0, y0, x1, y1), (x0 - x, y0 - y)
+
+  def raster(self, func, *args, bbox=None):
+    'Raster operation `func(img, origin, *args)`, see `genart.tile.raster()`'
+    func(self._draw()[0], (0, 0), *args)
+
+  def fill_spans(self, xs, y0s, y1s, fill):
+    '''Fills vertical spans: columns `xs`, rows from `y0s` to `y1s` (inclusive,
+    arrays of ints) with one color `fill` or with an array of colors of their
+    pixels (in the order of `span_pixels()`). Spans are drawn in their order,
+    pixels out of the canvas are skipped'''
+    px, py, _ = span_pixels(xs, y0s, y1s)
+    put_points(self.a, px, py, fill if np.ndim(fill) > 1 else self._ink(fill))
+
+  def fill_gradient(self, mode, colors, **kw):
+    '''Fills gradient of `mode` with `colors` (array of pixels of its levels)
+    and `kw` of `genart.gradient.levels()` straight into the array, see
+    `genart.gradient.draw_gradient()`'''
+    from genart.gradient import fill_levels  # it imports this module
+    colors = np.asarray(colors, dtype=np.uint8).reshape(len(colors), -1)
+    fill_levels(self.a, (0, 0), mode, colors, kw)
@@ -0,0 +1,92 @@
+'''Colors: HSV/HSL colors (hue in degrees, saturation, value/lightness in %)
+straight to RGB, without formatting and parsing of strings like
+`'hsv(%d,%d%%,%d%%)' % color`. Results are exactly the same as PIL gives for
+such strings (components are truncated like `%d` does), so the RGB tuples can
+be passed as `fill=` to any drawing function instead of the strings.
+'''
+import colorsys
+from colorsys import ONE_SIXTH, ONE_THIRD, TWO_THIRD
+import functools
+import numpy as np
+from PIL import Image, ImageColor
+
+
+def _to_rgb(floats):
+  return tuple(int(c * 255 + 0.5) for c in floats)
+
+@functools.lru_cache(maxsize=None)
+def _hsv(h, s, v):
+  return _to_rgb(colorsys.hsv_to_rgb(h / 360.0, s / 100.0, v / 100.0))
+
+@functools.lru_cache(maxsize=None)
+def _hsl(h, s, l):
+  return _to_rgb(colorsys.hls_to_rgb(h / 360.0, l / 100.0, s / 100.0))
+
+def hsv(h, s, v):
+  'RGB tuple of HSV color, the same as PIL gives for "hsv(h,s%,v%)"'
+  return _hsv(int(h), int(s), int(v))
+
+def hsl(h, s, l):
+  'RGB tuple of HSL color, the same as PIL gives for "hsl(h,s%,l%)"'
+  return _hsl(int(h), int(s), int(l))
+
+def _components(*cs):
+  'Arrays of color components truncated like `%d` does'
+  return np.broadcast_arrays(*(np.trunc(np.asarray(c, dtype=float)) for c in cs))
+
+def _to_rgb_array(r, g, b):
+  rgb = np.stack((r, g, b), axis=-1)
+  return np.clip(rgb * 255 + 0.5, 0, 255).astype(np.uint8)
+
+def hsv_array(h, s, v):
+  '''The same as `hsv()` but over arrays (broadcasted) of components, returns
+  uint8 array of shape (..., 3)'''
+  h, s, v = _components(h, s, v)
+  h, s, v = h / 360.0, s / 100.0, v / 100.0
+  # see `colorsys.hsv_to_rgb()`, the same operations in the same order:
+  i = np.trunc(h * 6.0)
+  f = (h * 6.0) - i
+  p = v * (1.0 - s)
+  q = v * (1.0 - s * f)
+  t = v * (1.0 - s * (1.0 - f))
+  i = i.astype(int) % 6
+  r = np.choose(i, (v, q, p, p, t, v))
+  g = np.choose(i, (t, v, v, q, p, p))
+  b = np.choose(i, (p, p, t, v, v, q))
+  gray = s == 0.0
+  r, g, b = (np.where(gray, v, c) for c in (r, g, b))
+  return _to_rgb_array(r, g, b)
+
+def _hls_v(m1, m2, hue):
+  hue = np.mod(hue, 1.0)
+  return np.select([hue < ONE_SIXTH, hue < 0.5, hue < TWO_THIRD],
+                   [m1 + (m2 - m1) * hue * 6.0, m2,
+                    m1 + (m2 - m1) * (TWO_THIRD - hue) * 6.0],
+                   m1)
+
+def hsl_array(h, s, l):
+  '''The same as `hsl()` but over arrays (broadcasted) of components, returns
+  uint8 array of shape (..., 3)'''
+  h, s, l = _components(h, s, l)
+  h, s, l = h / 360.0, s / 100.0, l / 100.0
+  # see `colorsys.hls_to_rgb()`, the same operations in the same order:
+  m2 = np.where(l <= 0.5, l * (1.0 + s), l + s - (l * s))
+  m1 = 2.0 * l - m2
+  r = _hls_v(m1, m2, h + ONE_THIRD)
+  g = _hls_v(m1, m2, h)
+  b = _hls_v(m1, m2, h - ONE_THIRD)
+  gray = s == 0.0
+  r, g, b = (np.where(gray, l, c) for c in (r, g, b))
+  return _to_rgb_array(r, g, b)
+
+def ink(fill, mode):
+  'Color `fill` (string or tuple) as the tuple/int of pixels of image `mode`'
+  if isinstance(fill, str):
+    return ImageColor.getcolor(fill, mode)
+  bands = Image.getmodebands(mode)
+  if isinstance(fill, int):
+    return fill if bands == 1 else (fill,) * min(3, bands) + (255,) * (bands > 3)
+  fill = tuple(fill)
+  if bands == 1:
+    return fill[0]
+  return fill[:bands] + (255,) * (bands - len(fill))
@@ -0,0 +1,229 @@
+'''Drawing helpers on top of PIL `ImageDraw`, `dr` is `ImageDraw.Draw` object
+(or `genart.tile.Recorder`, `genart.canvas.Canvas` which work like it).
+'''
+from array import array
+import math
+import numpy as np
+from PIL import Image, ImageColor
+
+from genart.canvas import Canvas, put_points, span_pixels
+from genart.color import ink
+from genart.geom import (arc_angles, arc_span, cartesian_to_canvas,
+                         polar_pairs, polar_to_cartesian)
+from genart.tile import DRAW_METHODS, Recorder, raster
+
+
+def canvas_size(dr):
+  'Size of the canvas of `dr` (`ImageDraw.Draw`, `Recorder` or `Canvas`)'
+  return dr.size if isinstance(dr, (Recorder, Canvas)) else dr.im.size
+
+def draw_circle(dr, p, radius, **kw):
+  'Circle with center `p` (canvas coords), `kw` are args of `dr.ellipse()`'
+  l = p[0] - radius
+  r = p[0] + radius
+  t = p[1] - radius
+  b = p[1] + radius
+  dr.ellipse((l,t,r,b), **kw)
+
+def draw_points(dr, ps, fill):
+  'Draws batch of points `ps` (canvas coords) with one color'
+  dr.point(np.asarray(ps, dtype=float).ravel().tolist(), fill=fill)
+
+def draw_lines(dr, xys, fill, width=0):
+  '''Draws batch of lines `xys` (canvas coords, x0, y0, x1, y1 of every
+  line) with one color and width: `Recorder` records them as one operation
+  (`Recorder.lines()`), else they are drawn one by one'''
+  if isinstance(dr, Recorder):
+    return dr.lines(xys, fill=fill, width=width)
+  for xy in np.asarray(xys, dtype=float).reshape(-1, 4).tolist():
+    dr.line(xy, fill=fill, width=width)
+
+def _scatter_points(img, origin, ps, fill):
+  xs = ps[:, 0].astype(np.int64) - origin[0]
+  ys = ps[:, 1].astype(np.int64) - origin[1]
+  inside = (0 <= xs) & (xs < img.width) & (0 <= ys) & (ys < img.height)
+  if not inside.any():
+    return
+  # only the bound box of the points is copied from/to the image:
+  x0, y0 = xs[inside].min(), ys[inside].min()
+  box = (int(x0), int(y0), int(xs[inside].max()) + 1, int(ys[inside].max()) + 1)
+  buf = np.array(img.crop(box))
+  put_points(buf, xs - x0, ys - y0, fill)
+  img.paste(Image.fromarray(buf), box[:2])
+
+def scatter_points(img, ps, fill):
+  '''Draws batch of points `ps` (canvas coords) into `img` like `dr.point()`
+  does (coords are truncated, the last point wins), but with one write of the
+  image buffer. `fill` is one color or an array of colors (one per point).
+  '''
+  ps = np.asarray(ps, dtype=float).reshape(-1, 2)
+  if isinstance(fill, str):
+    fill = ImageColor.getcolor(fill, img.mode)
+  fill = np.asarray(fill, dtype=np.uint8)
+  if isinstance(img, Canvas):
+    return img.scatter(ps, fill)
+  bbox = None
+  if len(ps):
+    (x0, y0), (x1, y1) = np.trunc(ps.min(axis=0)), np.trunc(ps.max(axis=0))
+    bbox = (int(x0), int(y0), int(x1) + 1, int(y1) + 1)
+  raster(img, _scatter_points, ps, fill, bbox=bbox)
+
+def fill_spans(img, xs, y0s, y1s, fill):
+  '''Fills vertical spans (columns `xs`, rows `y0s`..`y1s`, see
+  `genart.canvas.span_pixels()`) of `img` with one color `fill` or an array
+  of colors of their pixels: straight into the array of `Canvas`, else as
+  points (`scatter_points()`)'''
+  if isinstance(img, Canvas):
+    return img.fill_spans(xs, y0s, y1s, fill)
+  px, py, _ = span_pixels(xs, y0s, y1s)
+  scatter_points(img, np.column_stack((px, py)), fill)
+
+class PointBatch:
+  '''Drawing `dr` (`ImageDraw.Draw` or `Recorder`) of image `img`, which
+  collects `point()` calls and draws them at once by `flush()`: with one
+  `dr.point()` if they have one color, else with `scatter_points()`. Other
+  primitives flush collected points before, so the order of drawing is kept.
+  Other attributes are of `dr` itself:
+
+    with PointBatch(img, dr) as dr:
+      draw_arc(dr, ..., draw_point=callback)  # callback calls dr.point()
+  '''
+  def __init__(self, img, dr):
+    self.img = img
+    self.dr = dr
+    self.inks = []  # colors as pixels of `img`
+    self.ink_index = {}  # {fill: index in `self.inks`}
+    self._reset()
+
+  def _reset(self):
+    self.xy = array('d')  # x0, y0, x1, y1, ...
+    self.ci = array('l')  # indexes of colors in `self.inks`, one per point
+    self.mixed = False  # are there points of different colors
+
+  def point(self, xy, fill=None):
+    if fill is None:
+      self.flush()
+      return self.dr.point(xy)
+    try:
+      i = self.ink_index[fill]
+    except TypeError:  # not hashable (list)
+      return self.point(xy, tuple(fill))
+    except KeyError:
+      i = self.ink_index[fill] = len(self.inks)
+      self.inks.append(ink(fill, self.img.mode))
+    if self.ci and self.ci[0] != i:
+      self.mixed = True
+    if len(xy) == 2 and not hasattr(xy[0], '__len__'):
+      self.xy.extend(xy)
+      self.ci.append(i)
+    else:
+      ps = np.asarray(xy, dtype=float).ravel()
+      self.xy.extend(ps)
+      self.ci.extend([i] * (len(ps) // 2))
+
+  def flush(self):
+    'Draws the collected points'
+    if not self.ci:
+      return
+    if not self.mixed:
+      xy = self.xy.tolist()
+      self.dr.point(xy if len(xy) > 2 else tuple(xy),
+                    fill=self.inks[self.ci[0]])
+    else:
+      ps = np.frombuffer(self.xy, dtype=float).reshape(-1, 2)
+      ci = np.frombuffer(self.ci, dtype=self.ci.typecode)
+      scatter_points(self.img, ps, np.array(self.inks, dtype=np.uint8)[ci])
+    self._reset()
+
+  def _primitive(name):
+    # a plain method: `partialmethod` makes a new partial on every call
+    def primitive(self, *args, **kw):
+      if self.ci:
+        self.flush()
+      return getattr(self.dr, name)(*args, **kw)
+    primitive.__name__ = name
+    return primitive
+
+  for name in (DRAW_METHODS | {'regular_polygon'}) - {'point'}:
+    locals()[name] = _primitive(name)
+  del name, _primitive
+
+  def __getattr__(self, name):
+    if name.startswith('_') or name in ('img', 'dr'):
+      raise AttributeError(name)
+    return getattr(self.dr, name)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.flush()
+
+def draw_arc(dr, pt, radius, ang0, ang1, *, size, fill='white', draw_point=None):
+  '''`pt` - abstract cartesian coords, start/stop angels are in degrees, `size`
+  is the canvas size. The arc is drawn by points with `fill` color or by
+  `draw_point(dr, p, ang)` callback (`p` is canvas point).
+  '''
+  angs = arc_angles(radius, ang0, ang1)
+  ps = polar_to_cartesian(polar_pairs(angs, radius), orig=pt)
+  ps = cartesian_to_canvas(ps, size)
+  if draw_point is None:
+    draw_points(dr, ps, fill)
+  else:
+    for p, ang in zip(ps.tolist(), angs.tolist()):
+      draw_point(dr, tuple(p), ang)
+
+def annulus_mask(size, cp, r0, r1, ang0=0, ang1=360, *, aa=False):
+  r'''Mask of the annular sector with center `cp` (canvas coords), radiuses
+  `r0` <= `r1` and angles from `ang0` to `ang1` (degrees, counterclockwise like
+  `draw_arc()`) on the canvas of `size`. Returns `((x0, y0), mask)`, where
+  `mask` is uint8 array of the bound box with the top-left corner at (x0, y0),
+  or None if the sector is out of the canvas:
+
+       ,--.__ r1
+      /  ,-.\__ r0      255 - the pixel center is inside the sector,
+     | cp*  |  ang0     0 - it is outside
+      \ ang1/
+       `---'
+
+  With `aa` the mask is the coverage of pixels (0..255), it is calculated
+  analytically: radial and angular distances of the pixel center to edges.
+  '''
+  cx, cy = cp
+  x0 = max(0, math.floor(cx - r1) - 1)
+  y0 = max(0, math.floor(cy - r1) - 1)
+  x1 = min(size[0], math.ceil(cx + r1) + 1)
+  y1 = min(size[1], math.ceil(cy + r1) + 1)
+  if x0 >= x1 or y0 >= y1:
+    return None
+  # pixel (x,y) covers [x, x+1) x [y, y+1) (like `dr.point()` truncates), so its
+  # center is (x+0.5, y+0.5). Y goes up (Descartes) for angles:
+  dx = (np.arange(x0, x1) + 0.5 - cx)[np.newaxis, :]
+  dy = (cy - (np.arange(y0, y1) + 0.5))[:, np.newaxis]
+  d = np.sqrt((dx**2) + (dy**2))
+  span = arc_span(ang0, ang1)
+  whole = span >= 360
+  if not whole:
+    rel = np.mod(np.degrees(np.arctan2(dy, dx)) - ang0, 360)
+  if not aa:
+    inside = (r0 <= d) & (d <= r1)
+    if not whole:
+      inside &= rel <= span
+    return (x0, y0), inside.astype(np.uint8) * 255
+  # the pixel covers [d-0.5, d+0.5] radially:
+  cov = np.clip(np.minimum(r1, d + 0.5) - np.maximum(r0, d - 0.5), 0, 1)
+  if not whole:
+    # signed distance (along the arc, in pixels) to the nearest side:
+    sd = np.where(rel <= span, np.minimum(rel, span - rel),
+                  -np.minimum(rel - span, 360 - rel))
+    cov *= np.clip((d * np.radians(sd)) + 0.5, 0, 1)
+  return (x0, y0), np.round(cov * 255).astype(np.uint8)
+
+def draw_annulus(dr, cp, r0, r1, ang0=0, ang1=360, *, fill='white', aa=False):
+  '''Fills the annular sector (see `annulus_mask()`) with `fill` color in one
+  pass. With `aa` the edges are blended with the background (antialiasing)
+  '''
+  m = annulus_mask(canvas_size(dr), cp, r0, r1, ang0, ang1, aa=aa)
+  if m is not None:
+    xy, mask = m
+    dr.bitmap(xy, Image.fromarray(mask), fill=fill)
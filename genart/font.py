@@ -0,0 +1,69 @@
+'''Fonts: a font file is found by its name in the search path `PATH` (the
+directories of GENART_FONTS environment variable, separated like PATH, the
+current directory, the repository root and its fonts/, then the system fonts
+by PIL), loaded fonts are cached by (path, size), so a process (a worker of
+`genart.batch`) loads a font once for all its pictures:
+
+  font = load_font(FONTNAME, FONTSIZE)
+  dr.text(pt, TEXT, font=font, fill=TEXTCOLOR)
+
+Masks of rendered text (glyph runs) are cached too: `draw_text()` is for
+labels repeated across pictures.
+'''
+import functools
+import math
+import os
+from PIL import Image, ImageFont
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH = [d for d in os.environ.get('GENART_FONTS', '').split(os.pathsep) if d]
+PATH += ['.', ROOT, os.path.join(ROOT, 'fonts')]
+MASKS = 4096  # cached masks of text
+
+
+def find_font(name, path=None):
+  '''Path of the font file `name` (a file name or a path) in directories of
+  `path` (`PATH` by default), `name` itself if it is not there (PIL looks for
+  it in the system fonts then)'''
+  if os.path.isabs(name):
+    return name
+  for d in PATH if path is None else path:
+    p = os.path.join(d, name)
+    if os.path.isfile(p):
+      return os.path.abspath(p)
+  return name
+
+@functools.lru_cache(maxsize=None)
+def _load(path, size, index, default):
+  try:
+    return ImageFont.truetype(path, size, index=index)
+  except OSError:
+    if not default:
+      raise
+    return ImageFont.load_default(size)
+
+def load_font(name, size, *, index=0, default=False):
+  '''`FreeTypeFont` of font `name` (see `find_font()`) of `size`, cached. If the
+  font is not found: with `default` PIL's default font of `size` is returned,
+  else OSError is raised'''
+  try:
+    return _load(find_font(name), size, index, default)
+  except OSError:
+    raise OSError('Font %r is not found in %s (see GENART_FONTS) nor in the '
+                  'system fonts' % (name, os.pathsep.join(PATH)))
+
+@functools.lru_cache(maxsize=MASKS)
+def text_mask(font, text, start=(0., 0.)):
+  '''Mask (L image) of one line of `text` rendered by `font` with sub-pixel
+  offset `start` and its offset from the text position, cached'''
+  mask, offset = font.getmask2(text, 'L', start=start)
+  return Image.frombytes('L', mask.size, bytes(mask)), offset
+
+def draw_text(dr, xy, text, font, fill):
+  '''The same as `dr.text(xy, text, font=font, fill=fill)` of one line of
+  text (the default anchor, no stroke) on RGB/L image, but the mask of the
+  text is cached (see `text_mask()`)'''
+  x, y = xy
+  mask, (ox, oy) = text_mask(font, text, (math.modf(x)[0], math.modf(y)[0]))
+  dr.bitmap((int(x) + ox, int(y) + oy), mask, fill=fill)
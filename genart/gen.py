@@ -0,0 +1,121 @@
+'''Generators: scripts genart1.py ... genart13.py of the repository root with
+parameters. A generator is loaded as a new module object (every `load()`
+gives an independent one), its parameters - CAPS globals (SIZE, RADIUS,
+STICKS, SEED, OUT, ...) are overridden and its derived globals are
+recalculated by its `init()`:
+
+  gen = load('genart6', SIZE=(800, 600), STICKS=5000, SEED=1)
+  save(gen, 'sticks.jpg')
+
+so one process renders any number of variants without editing the scripts.
+'''
+import importlib.util
+import json
+import os
+import re
+
+from genart import png as pngs
+from genart.rng import rng
+from genart.tile import render
+
+try:
+  import tomllib
+except ImportError:  # Python < 3.11
+  tomllib = None
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NAMERE = re.compile(r'^genart(\d+)$')
+FORMATS = {'jpg': 'JPEG', 'tif': 'TIFF'}  # extensions which are not formats
+
+
+def names(root=ROOT):
+  'Names of generators in the directory `root` in the order of their numbers'
+  ns = [m for m in (NAMERE.match(f[:-3]) for f in os.listdir(root)
+                    if f.endswith('.py')) if m]
+  return [m.group(0) for m in sorted(ns, key=lambda m: int(m.group(1)))]
+
+def find(name, root=ROOT):
+  'Name and path of generator `name` ("genart6" or just "6")'
+  if name.isdigit():
+    name = 'genart' + name
+  path = os.path.join(root, name + '.py')
+  if not (NAMERE.match(name) and os.path.isfile(path)):
+    raise ValueError('Unknown generator %r, see names()' % name)
+  return name, path
+
+def params(gen):
+  'Parameters of generator `gen` as {NAME: value}'
+  return {k: v for k, v in vars(gen).items()
+          if k.isupper() and not k.startswith('_')}
+
+def configure(gen, **overrides):
+  '''Overrides parameters of generator `gen` (lists become tuples where the
+  parameter is a tuple, like SIZE) and recalculates its derived globals'''
+  known = params(gen)
+  unknown = sorted(set(overrides) - set(known))
+  if unknown:
+    raise ValueError('Unknown parameters of %s: %s' % (gen.__name__,
+                                                       ', '.join(unknown)))
+  for k, v in overrides.items():
+    if isinstance(known[k], tuple) and isinstance(v, list):
+      v = tuple(v)
+    setattr(gen, k, v)
+  if hasattr(gen, 'init'):
+    gen.init()
+  return gen
+
+def load(name, root=ROOT, **overrides):
+  '''Loads generator `name` (see `find()`) as a new module without drawing
+  anything, `overrides` are its parameters (see `configure()`)'''
+  name, path = find(name, root)
+  spec = importlib.util.spec_from_file_location(name, path)
+  gen = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(gen)
+  return configure(gen, **overrides)
+
+def read_params(path):
+  '''Parameters from TOML/JSON file `path` (by its extension) as {NAME: value},
+  names are case insensitive: `size = [800, 600]` is SIZE'''
+  if path.endswith('.toml'):
+    if tomllib is None:
+      raise ValueError('TOML needs Python 3.11+, use JSON: %s' % path)
+    with open(path, 'rb') as f:
+      ps = tomllib.load(f)
+  else:
+    with open(path) as f:
+      ps = json.load(f)
+  return {k.upper(): v for k, v in ps.items()}
+
+def image_format(out, format=None):
+  'PIL format of the picture file `out`: `format` or by the extension of `out`'
+  fmt = (format or os.path.splitext(out)[1][1:] or 'png').lower()
+  return FORMATS.get(fmt, fmt.upper())
+
+def save(gen, out=None, *, format=None, cache=None, png=None, **render_kw):
+  '''Renders generator `gen` (`render_kw` are args of `render()`) and saves
+  the picture to `out` (`gen.OUT` by default) in `format` (see
+  `image_format()`), PNG gets the seed. With `cache`
+  (`genart.cache.RenderCache`) the encoded picture is taken from it/stored
+  there. `png` - preset of `genart.png` (see `PRESETS`): PNG is compressed by
+  strips in threads, tiles (`tile`, `supersample`) are written as they are
+  rendered, the whole picture is never held. Returns `out`'''
+  out = out or gen.OUT
+  fmt = image_format(out, format)
+  if cache is not None:
+    data = cache.render(gen, format=fmt, **render_kw)
+    with open(out, 'wb') as f:
+      f.write(data)
+    return out
+  if png is not None and fmt == 'PNG':
+    tiled = render_kw.get('tile') or render_kw.get('supersample')
+    if tiled and not render_kw.get('canvas'):
+      render_kw.pop('canvas', None)
+      return pngs.render(gen, out, preset=png, **render_kw)
+    img = render(gen, **render_kw)
+    pngs.save(img, out, preset=png, text={'seed': rng.root})
+    return out
+  img = render(gen, **render_kw)
+  kw = {'pnginfo': rng.pnginfo()} if fmt == 'PNG' else {}
+  img.save(out, format=fmt, **kw)
+  return out
@@ -0,0 +1,227 @@
+'''Geometry primitives. Every function accepts a single point `(x, y)` (or
+a polar pair `(ang, rad)`) and returns a tuple, or a batch of them - anything
+convertible to an array of shape (N, 2) - and returns `numpy.ndarray` of the
+same shape. Batched calculations do the same float operations in the same
+order as the single ones, so results are identical.
+
+Coordinates are "Cartesian" (abstract, Descartes: 0y goes up, the origin is
+in the center of the canvas) or "canvas" (PIL: 0y goes down, the origin is in
+the top-left corner).
+'''
+import math
+import numpy as np
+
+
+def is_single(p):
+  'Is `p` a single point/pair (not a batch of points)?'
+  if isinstance(p, np.ndarray):
+    return p.ndim == 1
+  return not isinstance(p[0], (tuple, list, np.ndarray))
+
+def as_points(ps):
+  'Batch of points as a float array of shape (N, 2)'
+  return np.asarray(ps, dtype=float).reshape(-1, 2)
+
+def polar_pairs(angs, rads):
+  'Batch of polar pairs `(ang, rad)`, any of `angs`, `rads` can be a scalar'
+  angs, rads = np.broadcast_arrays(np.asarray(angs, dtype=float),
+                                   np.asarray(rads, dtype=float))
+  return np.column_stack((angs.ravel(), rads.ravel()))
+
+def distance(pt1, pt2):
+  'Distance b/w points, any of them can be a batch'
+  if is_single(pt1) and is_single(pt2):
+    return math.sqrt(((pt2[0] - pt1[0])**2) + ((pt2[1] - pt1[1])**2))
+  pt1 = np.asarray(pt1, dtype=float)
+  pt2 = np.asarray(pt2, dtype=float)
+  d = pt2 - pt1
+  return np.sqrt((d[..., 0]**2) + (d[..., 1]**2))
+
+def polar_to_cartesian(pp, orig=None, *, radians=False):
+  r'''Converts polar coordinates (angle, radius) to abstract Descartes (x,y)
+  if `orig` is None or to real/global Descrates if `orig` points out the
+  real cartesian coordinates of the origin point of the polar turning.
+  Angles are in degrees (in radians if `radians` is True):
+
+   x,y...|
+         |^  ang
+  orig...|.\.___    Polar coord  (ang,dist) - vector tip is "x"
+         | /:
+         |/_:_____
+       0,0  :
+          orig
+  '''
+  if is_single(pp):
+    ang, rad = pp
+    if not radians:
+      ang = math.radians(ang)
+    x = rad * math.cos(ang)
+    y = rad * math.sin(ang)
+    ox, oy = (0,0) if orig is None else orig
+    # if to return int-s I hit strange error with multiple points very close
+    # to each others, like additive error:
+    return (x + ox, y + oy)
+  pp = as_points(pp)
+  ang = pp[:, 0] if radians else np.radians(pp[:, 0])
+  rad = pp[:, 1]
+  res = np.column_stack((rad * np.cos(ang), rad * np.sin(ang)))
+  if orig is not None:
+    res += orig
+  return res
+
+def cartesian_to_polar(p, orig=None):
+  r'''Cartesian (Descartes) coordinates to polar `(length, ang)`, angle is
+  in degrees:
+
+   x,y...|
+         |^  ang
+  orig...|.\.___    Polar coord  (ang,dist) - vector tip is "x"
+         | /:
+         |/_:_____
+       0,0  :
+          orig
+  '''
+  if is_single(p):
+    if orig is not None:
+      length = distance(p, orig)
+      x1 = p[0] - orig[0]
+      cos_ang = x1 / length
+      return (length, math.degrees(math.acos(cos_ang)))
+    else:
+      hipot = distance(p, (0, 0))
+      sin_ang = p[1] / hipot
+      return (hipot, math.degrees(math.asin(sin_ang)))
+  p = as_points(p)
+  if orig is not None:
+    length = distance(p, orig)
+    x1 = p[:, 0] - np.asarray(orig, dtype=float)[..., 0]
+    ang = np.degrees(np.arccos(x1 / length))
+  else:
+    length = distance(p, (0, 0))
+    ang = np.degrees(np.arcsin(p[:, 1] / length))
+  return np.column_stack((length, ang))
+
+def cartesian_to_canvas(pt, size):
+  'Abstract Descartes coords to the canvas ones, `size` is the canvas size'
+  cx, cy = size[0]//2, size[1]//2
+  if is_single(pt):
+    return (pt[0] + cx, cy - pt[1])
+  pt = as_points(pt)
+  return np.column_stack((pt[:, 0] + cx, cy - pt[:, 1]))
+
+def canvas_to_cartesian(pt, size):
+  'Canvas coords to the abstract Descartes ones, `size` is the canvas size'
+  cx, cy = size[0]//2, size[1]//2
+  if is_single(pt):
+    return (pt[0] - cx, cy - pt[1])
+  pt = as_points(pt)
+  return np.column_stack((pt[:, 0] - cx, cy - pt[:, 1]))
+
+def affine(p, mx):
+  'Affine transformation of `p` with matrix `mx`: ((a,b,c), (d,e,f))'
+  ((a,b,c), (d,e,f)) = mx
+  if is_single(p):
+    x,y = p
+    return (a*x + b*y + c, d*x + e*y + f)
+  p = as_points(p)
+  x = p[:, 0]
+  y = p[:, 1]
+  return np.column_stack((a*x + b*y + c, d*x + e*y + f))
+
+def circle_point(cp, radius, *, x=None, y=None):
+  '''Returns 2 x-s or 2 y-s from y or x of the circle with a center `cp`.
+  Returned x-s (or y-s) are naturally sorted. If `x` (`y`) is an array then
+  the result is an array of shape (N, 2).
+  '''
+  #  (x-cx)^2 + (y-cy)^2 = R^2
+  #  (y-cy) = +/-sqrt(R^2 - (x-cx)^2) => y = cy +/- sqrt(R^2 - (x-cx)^2)
+  #  (x-cx) = +/-sqrt(R^2 - (y-cy)^2) => x = cx +/- sqrt(R^2 - (y-cy)^2)
+  cx, cy = cp
+  if x is not None:
+    c, d = cy, x - cx
+  elif y is not None:
+    c, d = cx, y - cy
+  else:
+    raise ValueError('Either x or y keyword arg must be passed')
+  if np.ndim(d) == 0:
+    v = math.sqrt((radius**2) - (d**2))
+    return sorted((c + v, c - v))
+  v = np.sqrt((radius**2) - (np.asarray(d, dtype=float)**2))
+  return np.column_stack((c - v, c + v))
+
+def determine_line(p1, p2):
+  '''Determines the equation on 2 points as a dict with keys `k`, `b`,
+  `domain`, `codomain`. Vertical line has `k`=inf and `b`=None. For batches
+  of points values are arrays (`b` is NaN for vertical lines).
+  '''
+  if is_single(p1) and is_single(p2):
+    x1,y1 = p1; x2,y2 = p2
+    if x1 != x2:
+      k = (y1 - y2) / (x1 - x2)
+      b = y2 - (k*x2)
+      return dict(k=k, b=b, domain=(x1,x2), codomain=(y1,y2))
+    else:
+      return dict(k=math.inf, b=None, domain=(x1,x2), codomain=(y1,y2))
+  p1 = as_points(p1)
+  p2 = as_points(p2)
+  x1, y1 = p1[:, 0], p1[:, 1]
+  x2, y2 = p2[:, 0], p2[:, 1]
+  vert = x1 == x2
+  with np.errstate(divide='ignore', invalid='ignore'):
+    k = np.where(vert, np.inf, (y1 - y2) / np.where(vert, 1, x1 - x2))
+    b = np.where(vert, np.nan, y2 - (k*x2))
+  return dict(k=k, b=b, domain=np.column_stack((x1, x2)),
+              codomain=np.column_stack((y1, y2)))
+
+def bound_box(ps):
+  '''Bound box `[(x0,y0), (x1,y1)]` from list of points. If `ps` is a batch of
+  polygons (array of shape (M, N, 2)) then returns array of shape (M, 2, 2).
+  '''
+  if is_single(ps[0]):
+    xs, ys = zip(*ps)
+    return [(min(xs), min(ys)), (max(xs), max(ys))]
+  ps = np.asarray(ps)
+  return np.stack((ps.min(axis=1), ps.max(axis=1)), axis=1)
+
+def is_outside(pts, *args):
+  '''Returns True if all `pts` are outside of the canvas. Args are ranges
+  `xr, yr` as (min, max) or just max-s or the canvas size (then the ranges are
+  Cartesian)
+  '''
+  if len(args) == 2:
+    xr, yr = args
+    if not isinstance(xr, (list, tuple)): xr = (0, xr)
+    if not isinstance(yr, (list, tuple)): yr = (0, yr)
+  elif len(args) == 1:
+    w, h = args[0]
+    xr = (-w//2, w//2); yr = (-h//2, h//2)
+  pts = as_points(pts)
+  x, y = pts[:, 0], pts[:, 1]
+  return bool(np.all((x < xr[0]) | (x > xr[1]) | (y < yr[0]) | (y > yr[1])))
+
+def arc_span(ang0, ang1):
+  'Angular length (degrees) of the arc from `ang0` to `ang1` (counterclockwise)'
+  if ang1 < ang0:
+    ang1 += 360 * (1 + (ang0 // 360)) # add N full turn like they are in ang0
+  # Now make ang1 to follow ang0 (clockwise turn!), so: 120..0 is 120,121..360:
+  return abs(ang1 - ang0)
+
+def arc_angles(radius, ang0, ang1, *, step=0.25):
+  '''Angles (degrees) of points of the arc with `radius` from `ang0` to `ang1`
+  (counterclockwise). Points are spaced by `step` pixels along the arc (0.25
+  looks smooth).
+  '''
+  delta_ang = arc_span(ang0, ang1)
+  ang1 = ang0 + delta_ang
+  if not delta_ang:
+    return np.array([ang0], dtype=float)
+  # arc_len = (PI * r * angle)/180
+  # angle = (arc_len * 180) / (PI * r)
+  ang_step = (step * 180) / (math.pi * max(1, radius))
+  # Accumulate like `ang += ang_step` does, so angles are exactly the same as
+  # angles of the point-by-point stepping:
+  n = int(delta_ang / ang_step) + 3
+  steps = np.full(n, ang_step)
+  steps[0] = ang0
+  angs = np.cumsum(steps)
+  return angs[:np.searchsorted(angs, ang1, side='right')]
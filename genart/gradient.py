@@ -0,0 +1,118 @@
+'''Gradients: every pixel gets its color once, by its level - the quantized
+distance from the center - instead of drawing nested shapes one over another
+(like SIZE[1] full-canvas rectangles):
+
+  +-------------+   rect: nested rectangles of one aspect, the level of a
+  | +---------+ |   pixel is the innermost rectangle containing it (coords
+  | | +-----+ | |   are truncated like PIL does, so the picture is the same
+  | | | n-1 | | |   as of the drawn rectangles)
+  | | +-----+ | |   radial: nested circles
+  | +---------+ |   linear: bands across the direction `angle`
+  +-------------+
+        0
+
+Levels are 0 (the outermost shape) ... n-1 (the innermost), -1 is out of the
+outermost one. Pixels of levels are written by a raster operation
+(`genart.tile.raster()`) on PIL images and tiles of `Recorder`, straight into
+the array of `Canvas` (`Canvas.fill_gradient()`).
+'''
+import math
+import numpy as np
+from PIL import Image
+
+from genart.canvas import Canvas
+from genart.tile import raster
+
+
+MODES = ('rect', 'radial', 'linear')
+BAND = 256  # rows computed at once
+
+
+def rect_levels(xs, ys, center, hs, aspect=1):
+  '''Levels (array of shape (len(ys), len(xs))) of pixels of columns `xs` and
+  rows `ys` in nested rectangles centered at `center`, rectangle k is of
+  height `hs[k]` (descending) and of width `aspect * hs[k]`'''
+  hs = np.asarray(hs, dtype=float)
+  def axis(vs, c, sizes):
+    # levels are nested: ones containing `v` are 0...k on both sides
+    lo = np.trunc(c - (sizes/2))  # non-decreasing with the level
+    hi = np.trunc(c + (sizes/2))  # non-increasing
+    n_lo = np.searchsorted(lo, vs, side='right')  # levels where lo <= v
+    n_hi = np.searchsorted(-hi, -np.asarray(vs), side='right')  # hi >= v
+    return (np.minimum(n_lo, n_hi) - 1).astype(np.int32)
+  return np.minimum(axis(ys, center[1], hs)[:, np.newaxis],
+                    axis(xs, center[0], aspect * hs)[np.newaxis, :])
+
+def distance_levels(d, outer, inner, n):
+  '''Levels of distances `d` (array) in `n` nested shapes: level 0 is up to
+  distance `outer`, level n-1 from distance `inner` and less'''
+  k = np.floor((outer - d) * n / (outer - inner))
+  return np.where(d > outer, -1, np.minimum(k, n - 1)).astype(np.int32)
+
+def levels(mode, box, n, *, center, outer, inner=0, aspect=1, angle=0):
+  '''Levels of pixels of `box` (`(x0, y0, x1, y1)` of the canvas, the right and
+  bottom edges are excluded) in gradient of `mode` (see `MODES`) of `n`
+  levels from `outer` (level 0) to `inner`: heights of rectangles ('rect',
+  of width `aspect` * height), radii ('radial') or distances from `center`
+  along `angle` (degrees, 'linear'). Returns int array of shape (h, w)'''
+  x0, y0, x1, y1 = box
+  xs = np.arange(x0, x1)
+  ys = np.arange(y0, y1)
+  if mode == 'rect':
+    hs = outer - (outer - inner) * np.arange(n) / n
+    return rect_levels(xs, ys, center, hs, aspect)
+  dx = (xs - center[0])[np.newaxis, :]
+  dy = (ys - center[1])[:, np.newaxis]
+  if mode == 'radial':
+    d = np.hypot(dx, dy)
+  elif mode == 'linear':
+    a = math.radians(angle)
+    d = dx * math.cos(a) + dy * math.sin(a)
+  else:
+    raise ValueError('Unknown gradient %r, expected one of %s' % (
+      mode, ', '.join(MODES)))
+  return distance_levels(d, outer, inner, n)
+
+def fill_levels(a, origin, mode, colors, kw):
+  '''Writes gradient of `mode` with `colors` (uint8 array, a row per level)
+  and `kw` of `levels()` into array `a` (its top-left pixel is at `origin` of
+  the canvas) band by band'''
+  x, y = origin
+  h, w = a.shape[:2]
+  if a.ndim == 2:
+    colors = colors[:, 0]
+  elif a.shape[-1] > colors.shape[-1]:  # RGB colors on RGBA
+    colors = np.concatenate(
+      (colors, np.full((len(colors), 1), 255, np.uint8)), axis=1)
+  for y0 in range(0, h, BAND):
+    band = a[y0:y0 + BAND]
+    lv = levels(mode, (x, y + y0, x + w, y + y0 + len(band)), len(colors),
+                **kw)
+    px = np.take(colors, lv, axis=0, mode='clip')
+    outside = lv < 0
+    if outside.any():
+      if a.ndim == 3:
+        outside = outside[..., np.newaxis]
+      band[...] = np.where(outside, band, px)
+    else:
+      band[...] = px
+
+def _fill_levels(img, origin, mode, colors, kw):
+  a = np.array(img)
+  fill_levels(a, origin, mode, colors, kw)
+  img.paste(Image.fromarray(a))
+
+def draw_gradient(img, mode, colors, *, center=None, outer, inner=0,
+                  aspect=1, angle=0):
+  '''Draws gradient of `mode` on `img` (PIL image, `Recorder` or `Canvas`):
+  `colors` (RGB tuples or an array) of its levels from the outermost to the
+  innermost, see `levels()`. `center` is the center of the canvas by
+  default. Pixels out of the outermost shape are kept'''
+  if center is None:
+    center = (img.width // 2, img.height // 2)
+  colors = np.asarray(colors, dtype=np.uint8).reshape(len(colors), -1)
+  kw = dict(center=center, outer=outer, inner=inner, aspect=aspect,
+            angle=angle)
+  if isinstance(img, Canvas):  # straight into its array
+    return img.fill_gradient(mode, colors, **kw)
+  raster(img, _fill_levels, mode, colors, kw)
@@ -0,0 +1,169 @@
+'''Instrumented drawing: `Instrumented` wraps `dr` (`ImageDraw.Draw`) passed to
+the drawing functions and collects statistics of its primitives (`point()`,
+`line()`, `ellipse()`, `polygon()`, `rectangle()`, `text()`, ...): calls, time
+and touched pixels (estimated by bound boxes) per primitive and per stack of
+calling functions:
+
+  stats = Stats()
+  img = render(genart12, wrap=lambda dr: Instrumented(dr, stats))
+  print(stats.table('caller'))
+  open('genart12.folded', 'w').write(stats.folded())  # for flamegraph.pl
+
+Only `dr` is instrumented: sprites of stamps (`genart.stamp`) are drawn with
+their own `ImageDraw.Draw`, so set STAMPS=False to see the drawing of motifs.
+'''
+import os
+import sys
+import time
+
+from genart.tile import DRAW_METHODS, TEXT_OPTIONS, flat_xy, line_width, render
+
+
+PACKAGE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(PACKAGE)
+# modules which run generators, their functions are not in stacks:
+RUNNERS = {os.path.join(PACKAGE, m + '.py')
+           for m in ('__main__', 'batch', 'bench', 'gen', 'instrument', 'tile')}
+VALUES = ('calls', 'seconds', 'pixels')
+TOP = render.__code__  # stacks are cut here (above it there are runners only)
+
+
+_Names = {}  # {code: name of the function or None (it's not in stacks)}
+
+def code_name(code):
+  '''Name of the function of `code` like "genart12.draw_ring_point" or
+  "genart.draw.draw_circle", None for functions out of stacks'''
+  name = _Names.get(code, False)
+  if name is False:
+    path = code.co_filename
+    if path.startswith(ROOT) and path not in RUNNERS:
+      module = os.path.splitext(os.path.relpath(path, ROOT))[0]
+      qualname = getattr(code, 'co_qualname', code.co_name)  # Python 3.11+
+      name = '%s.%s' % (module.replace(os.sep, '.'), qualname)
+    else:
+      name = None
+    _Names[code] = name
+  return name
+
+def codes(frame):
+  'Code objects of `frame` and of all its callers (the stack) up to TOP'
+  res = []
+  while frame is not None:
+    code = frame.f_code
+    if code is TOP:
+      break
+    res.append(code)
+    frame = frame.f_back
+  return tuple(res)
+
+def stack(codes):
+  '''Names of drawing functions of the repository (generators and the package
+  but RUNNERS) from the outer one to the inner one of stack `codes`'''
+  return tuple(n for n in map(code_name, reversed(codes)) if n)
+
+def touched(dr, name, xy, args, kw):
+  'Estimated number of pixels touched by primitive `name` of `dr`'
+  if name in ('text', 'multiline_text'):
+    textbbox = dr.textbbox if name == 'text' else dr.multiline_textbbox
+    opts = {k: v for k, v in kw.items() if k in TEXT_OPTIONS}
+    x0, y0, x1, y1 = textbbox(xy, args[0] if args else kw['text'], **opts)
+    return (x1 - x0) * (y1 - y0)
+  if name == 'regular_polygon':
+    r = xy[-1]
+    return int(2*r + 1) ** 2
+  if name == 'bitmap':
+    w, h = (args[0] if args else kw['bitmap']).size
+    return w * h
+  flat = len(xy) in (2, 4) and not hasattr(xy[0], '__len__')
+  if name == 'point' and flat and len(xy) == 2:
+    return 1
+  xy = xy if flat else flat_xy(xy)
+  if name == 'point':
+    return len(xy) // 2
+  m = line_width(name, args, kw)
+  return int((max(xy[0::2]) - min(xy[0::2]) + m) *
+             (max(xy[1::2]) - min(xy[1::2]) + m))
+
+class Stats:
+  '''Statistics of primitives: `raw` is {(codes, primitive): [calls, seconds,
+  pixels]}, where `codes` is the stack of calling functions (see `codes()`)
+  '''
+  def __init__(self):
+    self.raw = {}
+
+  def add(self, codes, primitive, seconds, pixels):
+    d = self.raw.get((codes, primitive))
+    if d is None:
+      d = self.raw[codes, primitive] = [0, 0., 0]
+    d[0] += 1
+    d[1] += seconds
+    d[2] += pixels
+
+  @property
+  def data(self):
+    '''{(stack, primitive): [calls, seconds, pixels]}, where stack is the tuple
+    of names of drawing functions (see `stack()`)'''
+    res = {}
+    for (cs, prim), d in self.raw.items():
+      t = res.setdefault((stack(cs), prim), [0, 0., 0])
+      for i, v in enumerate(d):
+        t[i] += v
+    return res
+
+  def totals(self, by='primitive'):
+    '''{key: [calls, seconds, pixels]}, key is the primitive (`by` is
+    "primitive") or the immediate calling function ("caller")'''
+    res = {}
+    for (st, prim), d in self.data.items():
+      key = prim if by == 'primitive' else (st[-1] if st else '?')
+      t = res.setdefault(key, [0, 0., 0])
+      for i, v in enumerate(d):
+        t[i] += v
+    return res
+
+  def table(self, by='primitive'):
+    'Text table of `totals(by)` sorted by time'
+    rows = sorted(self.totals(by).items(), key=lambda kv: -kv[1][1])
+    total = sum(d[1] for _, d in rows) or 1.
+    lines = ['%-40s %10s %10s %6s %12s' % (by, 'calls', 'seconds', '%',
+                                           'pixels')]
+    for key, (calls, seconds, pixels) in rows:
+      lines.append('%-40s %10d %10.4f %6.1f %12d' % (
+        key, calls, seconds, 100*seconds/total, pixels))
+    return '\n'.join(lines)
+
+  def folded(self, value='seconds'):
+    '''Folded stacks ("f1;f2;primitive value" lines) for flamegraph.pl or
+    speedscope, `value` is one of VALUES (seconds become microseconds)'''
+    i = VALUES.index(value)
+    lines = []
+    for (st, prim), d in sorted(self.data.items()):
+      v = d[i] * 1e6 if value == 'seconds' else d[i]
+      lines.append('%s %d' % (';'.join(st + (prim,)), round(v)))
+    return '\n'.join(lines) + '\n'
+
+class Instrumented:
+  '''`ImageDraw.Draw` `dr` which adds statistics of its primitives to `stats`
+  (`Stats`), other attributes are of `dr` itself'''
+  def __init__(self, dr, stats):
+    self.dr = dr
+    self.stats = stats
+    for name in DRAW_METHODS | {'regular_polygon'}:
+      setattr(self, name, self._primitive(name))
+
+  def _primitive(self, name):
+    method = getattr(self.dr, name)
+    def call(xy, *args, **kw):
+      t = time.perf_counter()
+      res = method(xy, *args, **kw)
+      seconds = time.perf_counter() - t
+      self.stats.add(codes(sys._getframe(1)), name, seconds,
+                     touched(self.dr, name, xy, args, kw))
+      return res
+    call.__name__ = name
+    return call
+
+  def __getattr__(self, name):
+    if name.startswith('_') or name == 'dr':
+      raise AttributeError(name)
+    return getattr(self.dr, name)
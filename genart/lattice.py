@@ -0,0 +1,49 @@
+'''Spatial hash of points of a lattice: items are keyed by the lattice coords
+of their points, quantized by the steps of the lattice:
+
+  j
+  2   .   x   .   x      (i, j) = (round(x/dx), round(y/dy)), so points
+  1   x   .   x   .      drifted by float errors fall into the same key
+  0   .   x   .   x
+      0   1   2   3  i   <- dx ->
+
+so adding a point which is already there is O(1), and rows/columns of the
+lattice are indexed directly by `j`/`i`.
+'''
+
+
+class Lattice(dict):
+  '''{(i, j): item} of items at points of the lattice with steps `step` =
+  (dx, dy), see the module'''
+  def __init__(self, step, items=()):
+    super().__init__(items)
+    self.step = tuple(step)
+
+  def key(self, p):
+    'Lattice coords `(i, j)` of point `p`'
+    return (round(p[0] / self.step[0]), round(p[1] / self.step[1]))
+
+  def add(self, p, item=None):
+    '''Adds `item` (point `p` itself by default) at point `p` if the lattice
+    has no item there yet (the first one wins), returns the key'''
+    k = self.key(p)
+    if k not in self:
+      self[k] = p if item is None else item
+    return k
+
+  def update_points(self, ps):
+    'Adds points `ps` (see `add()`)'
+    for p in ps:
+      self.add(p)
+
+  def map(self, func):
+    'New lattice of the same steps with items `func(item)`'
+    return Lattice(self.step, ((k, func(v)) for k, v in self.items()))
+
+  def rows(self):
+    '''Items by rows: list of rows in ascending `j` (from the bottom up in
+    Cartesian coords), items of a row are in ascending `i`'''
+    rows = {}
+    for (i, j), item in sorted(self.items(), key=lambda kv: kv[0][::-1]):
+      rows.setdefault(j, []).append(item)
+    return list(rows.values())
@@ -0,0 +1,91 @@
+'''Layer stages: a generator which defines `stages()` draws its picture as an
+ordered list of named stages, every stage declares the parameters it
+depends on:
+
+  def stages():
+    return [Stage('circles', ('SIZE', 'SEED', 'CIRCLERADIUS'), draw_circles),
+            Stage('text', ('SIZE', 'TEXT', 'FONTSIZE'), draw_text)]
+
+  def draw(img, dr):
+    draw_stages(img, dr, stages())
+
+`draw()` draws them one over another as before. `LayerCache` draws every
+stage alone on a transparent RGBA layer, keeps it (cropped to its pixels)
+and composites the layers over `new_image()`:
+
+  new_image()  +  [circles]  +  [text]   = picture
+                     |            |
+                  cached by     cached by (source, 'text', SIZE, TEXT,
+                  its deps      FONTSIZE)
+
+so after a change of TEXT only the text stage is drawn again. A stage must
+not read the pixels drawn beneath it: it draws opaque pixels over them
+(primitives, pastes, raster operations which only write pixels, like
+gradients of `genart.gradient` do, but not ones which blend with or shade
+the pixels beneath) and takes random numbers from its own streams
+(`rng.stream()`), then the composited picture is the same as the drawn one
+(antialiased edges of text may differ in a unit of a channel).
+'''
+from collections import OrderedDict, namedtuple
+from PIL import Image, ImageDraw
+
+from genart import gen as generators
+from genart.cache import digest, source_digest
+from genart.rng import rng
+
+
+class Stage(namedtuple('Stage', 'name deps draw')):
+  '''Stage `name` of a picture: `draw(img, dr)` draws it, `deps` - names of
+  the parameters of the generator which it depends on (SEED if it takes
+  random numbers)'''
+
+def draw_stages(img, dr, stages):
+  'Draws `stages` on `img` one over another'
+  for stage in stages:
+    stage.draw(img, dr)
+
+class LayerCache:
+  'LRU cache of layers of stages (at most `maxsize` ones), see the module'
+  def __init__(self, maxsize=64):
+    self.maxsize = maxsize
+    self.layers = OrderedDict()  # {key: (RGBA image, its offset)}
+    self.hits = self.misses = 0
+
+  def key(self, gen, stage):
+    'Key of the layer of `stage` of generator `gen`: its source and deps'
+    ps = generators.params(gen)
+    ps['SEED'] = rng.root
+    return digest(source_digest(gen.__file__), gen.__name__, stage.name,
+                  {k: ps[k] for k in stage.deps})
+
+  def layer(self, gen, stage):
+    '''The layer of `stage` of generator `gen` (cached): RGBA image of its
+    pixels and its offset on the canvas, None if it's empty'''
+    key = self.key(gen, stage)
+    if key in self.layers:
+      self.hits += 1
+      self.layers.move_to_end(key)
+      return self.layers[key]
+    self.misses += 1
+    img = Image.new('RGBA', gen.new_image().size, (0, 0, 0, 0))
+    stage.draw(img, ImageDraw.Draw(img))
+    box = img.getbbox()
+    res = self.layers[key] = (img.crop(box), box[:2]) if box else None
+    if len(self.layers) > self.maxsize:
+      self.layers.popitem(last=False)
+    return res
+
+  def render(self, gen, *, seed=None):
+    '''Renders generator `gen` with `stages()` by its layers with random
+    `seed` (`gen.SEED` by default, see `rng.root` then), returns the image'''
+    if not hasattr(gen, 'stages'):
+      raise ValueError('%s has no layer stages (stages())' % gen.__name__)
+    rng.seed(getattr(gen, 'SEED', None) if seed is None else seed)
+    img = gen.new_image()
+    mode = img.mode
+    img = img.convert('RGBA')
+    for stage in gen.stages():
+      layer = self.layer(gen, stage)
+      if layer is not None:
+        img.alpha_composite(*layer)
+    return img.convert(mode)
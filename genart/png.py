@@ -0,0 +1,251 @@
+'''Streaming PNG writer: rows are filtered and compressed by strips as they
+come (from tiles of `genart.tile.tiles()` or from a picture), so neither the
+picture nor its encoding is held at once:
+
+  with PNGWriter(f, (w, h), 'RGB', preset='fast') as png:
+    for box, img in tiles(gen, tile=256):
+      png.write(img)
+
+Strips are compressed by threads in parallel (like pigz does): every strip
+is a raw deflate stream with the last 32K of the previous strip as its
+dictionary, ended by a sync flush (the last one is finished), they are
+concatenated into one zlib stream in IDAT chunks, so the file is a usual PNG:
+
+  zlib header | strip 0 | strip 1 | ... | strip n (final) | adler32
+               \  IDAT  / \ IDAT /        \     IDAT     /
+
+Presets (`PRESETS`) are zlib levels with PNG filters of rows: 'fast' - level
+1 and Up, 'small' - level 9 without filters. Flat colors and repeated motifs
+of the pictures are long matches of deflate, filters (even adaptive ones -
+the least sum of absolute differences per row, like libpng does) break them,
+so only the fast level gains by Up (on gradients).
+'''
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import os
+import struct
+import zlib
+import numpy as np
+from PIL import Image
+
+from genart.rng import rng
+from genart.tile import tiles
+
+
+SIGNATURE = b'\x89PNG\r\n\x1a\n'
+COLORTYPES = {'L': 0, 'RGB': 2, 'LA': 4, 'RGBA': 6}  # 8 bits per channel
+FILTERS = ('none', 'sub', 'up', 'average', 'paeth')  # PNG filter types 0..4
+PRESETS = {'fast': (1, 'up'), 'default': (6, 'none'),
+           'small': (9, 'none')}  # zlib level, filter
+STRIP = 1 << 18  # bytes of rows compressed by a thread at a time
+WINDOW = 1 << 15  # of deflate: the dictionary of a strip
+INFLIGHT = 2  # strips in progress per thread
+
+
+def chunk(f, kind, data):
+  'Writes PNG chunk of `kind` (bytes) with `data` to file `f`'
+  f.write(struct.pack('>I', len(data)))
+  f.write(kind)
+  f.write(data)
+  f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+def filter_rows(rows, prior, filter, bpp):
+  '''Rows (uint8 array of shape (h, w*`bpp`), `bpp` - bytes per pixel)
+  filtered by `filter` (see `FILTERS`, 'adaptive' - the best one per row),
+  `prior` is the row above the first one. Returns array (h, 1 + w*`bpp`):
+  the type of the filter and filtered bytes of every row'''
+  x = rows
+  b = np.vstack((prior, x[:-1]))  # up
+  a = np.zeros_like(x)  # left
+  a[:, bpp:] = x[:, :-bpp]
+  c = np.zeros_like(x)  # up-left
+  c[:, bpp:] = b[:, :-bpp]
+  def filtered(name):  # uint8 arithmetic wraps modulo 256 like PNG's
+    if name == 'none':
+      return x
+    if name == 'sub':
+      return x - a
+    if name == 'up':
+      return x - b
+    if name == 'average':
+      return x - ((a.astype(np.uint16) + b) >> 1).astype(np.uint8)
+    ia, ib, ic = (v.astype(np.int16) for v in (a, b, c))  # paeth
+    pa, pb, pc = np.abs(ib - ic), np.abs(ia - ic), np.abs(ia + ib - 2*ic)
+    return x - np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+  if filter != 'adaptive':
+    fs = np.full((len(x), 1), FILTERS.index(filter), dtype=np.uint8)
+    return np.hstack((fs, filtered(filter)))
+  cands = np.stack([filtered(name) for name in FILTERS])  # [filter, y, x]
+  cost = np.abs(cands.view(np.int8).astype(np.int32)).sum(axis=2)
+  best = cost.argmin(axis=0)
+  fs = best.astype(np.uint8)[:, np.newaxis]
+  return np.hstack((fs, cands[best, np.arange(len(x))]))
+
+def deflate(data, level, zdict, last):
+  '''Raw deflate stream of `data` with dictionary `zdict` (bytes before
+  `data`), sync-flushed or finished if it's the `last` one'''
+  kw = {'zdict': zdict} if zdict else {}
+  c = zlib.compressobj(level, zlib.DEFLATED, -15, **kw)
+  return c.compress(data) + c.flush(zlib.Z_FINISH if last else
+                                    zlib.Z_SYNC_FLUSH)
+
+def zlib_header(level):
+  'Header of zlib stream (deflate, 32K window) compressed with `level`'
+  flevel = 0 if level < 2 else 1 if level < 6 else 2 if level == 6 else 3
+  cmf = 0x78
+  flg = flevel << 6
+  return bytes((cmf, flg + 31 - ((cmf << 8) + flg) % 31))
+
+class PNGWriter:
+  '''Writes PNG picture of `size` and `mode` (L, LA, RGB, RGBA) to binary
+  file `f` by rows (`write()`), see the module. `preset` (see `PRESETS`) is
+  zlib `level` and `filter` of rows unless they are given. Strips are
+  compressed by `threads` (all CPUs by default). `text` - {key: value} of
+  text chunks (`tEXt`)'''
+  def __init__(self, f, size, mode='RGB', *, preset='default', level=None,
+               filter=None, threads=None, text=None):
+    if mode not in COLORTYPES:
+      raise ValueError('Unsupported mode %r, expected one of %s' % (
+        mode, ', '.join(COLORTYPES)))
+    if preset not in PRESETS:
+      raise ValueError('Unknown preset %r, expected one of %s' % (
+        preset, ', '.join(PRESETS)))
+    self.level, self.filter = PRESETS[preset]
+    self.level = self.level if level is None else level
+    self.filter = self.filter if filter is None else filter
+    if self.filter not in FILTERS + ('adaptive',):
+      raise ValueError('Unknown filter %r, expected one of %s, adaptive' % (
+        self.filter, ', '.join(FILTERS)))
+    self.f = f
+    self.size = tuple(size)
+    self.mode = mode
+    self.bpp = len(mode)  # bytes per pixel
+    rowbytes = self.size[0] * self.bpp
+    self.strip = max(1, STRIP // rowbytes)  # rows
+    self.rows = 0  # rows written
+    self.pending = []  # rows (arrays) which are not compressed yet
+    self.prior = np.zeros((1, rowbytes), dtype=np.uint8)
+    self.zdict = b''  # the end of the filtered rows
+    self.adler = zlib.adler32(b'')
+    self.threads = threads or os.cpu_count() or 1
+    self.pool = ThreadPoolExecutor(self.threads) if self.threads > 1 else None
+    self.strips = collections.deque()  # compressed (futures if in threads)
+    f.write(SIGNATURE)
+    chunk(f, b'IHDR', struct.pack('>IIBBBBB', *self.size, 8,
+                                  COLORTYPES[mode], 0, 0, 0))
+    for k, v in (text or {}).items():
+      chunk(f, b'tEXt', ('%s\0%s' % (k, v)).encode('latin-1'))
+    chunk(f, b'IDAT', zlib_header(self.level))
+
+  def write(self, rows):
+    '''Writes rows: PIL image (a tile) or uint8 array of shape (h, w) or
+    (h, w, channels) of the width of the picture'''
+    if isinstance(rows, Image.Image):
+      if rows.mode != self.mode:
+        raise ValueError('Rows of mode %s, expected %s' % (rows.mode,
+                                                           self.mode))
+      for y in range(0, rows.height, self.strip):  # not all at once
+        y1 = min(y + self.strip, rows.height)
+        self.write(np.asarray(rows.crop((0, y, rows.width, y1))))
+      return
+    a = np.asarray(rows, dtype=np.uint8)
+    a = a.reshape(len(a), -1)
+    if a.shape[1] != self.size[0] * self.bpp:
+      raise ValueError('Rows of %d bytes, expected %d' % (
+        a.shape[1], self.size[0] * self.bpp))
+    if self.rows + len(a) > self.size[1]:
+      raise ValueError('More than %d rows' % self.size[1])
+    self.rows += len(a)
+    self.pending.append(a)
+    n = sum(len(p) for p in self.pending)
+    if n < self.strip:
+      return
+    a = np.concatenate(self.pending)
+    full = n - n % self.strip
+    for y in range(0, full, self.strip):
+      self._compress(a[y:y + self.strip])
+    self.pending = [a[full:]] if full < n else []
+
+  def _compress(self, rows, last=False):
+    data = b''
+    if len(rows):
+      data = filter_rows(rows, self.prior, self.filter, self.bpp).tobytes()
+      self.prior = rows[-1:]
+    self.adler = zlib.adler32(data, self.adler)
+    job = functools.partial(deflate, data, self.level, self.zdict, last)
+    self.zdict = (self.zdict + data)[-WINDOW:]
+    self.strips.append(self.pool.submit(job) if self.pool else job())
+    while len(self.strips) > (0 if last else self.threads * INFLIGHT):
+      data = self.strips.popleft()
+      chunk(self.f, b'IDAT', data.result() if self.pool else data)
+
+  def close(self):
+    'Compresses the rest of rows and finishes the file'
+    if self.rows != self.size[1]:
+      raise ValueError('%d rows of %d are written' % (self.rows,
+                                                      self.size[1]))
+    rest = (np.concatenate(self.pending) if self.pending else
+            np.zeros((0, self.size[0] * self.bpp), dtype=np.uint8))
+    self.pending = []
+    self._compress(rest, last=True)
+    chunk(self.f, b'IDAT', struct.pack('>I', self.adler))
+    chunk(self.f, b'IEND', b'')
+    self._shutdown()
+
+  def _shutdown(self):
+    if self.pool:
+      self.pool.shutdown(cancel_futures=True)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc, *_):
+    if exc is None:
+      self.close()
+    else:
+      self._shutdown()
+
+def _open(out):
+  return open(out, 'wb') if isinstance(out, (str, os.PathLike)) else out
+
+def save(img, out, *, text=None, **kw):
+  '''Writes PIL image `img` to PNG file `out` (path or binary file) by
+  `PNGWriter` with `kw`'''
+  f = _open(out)
+  try:
+    with PNGWriter(f, img.size, img.mode, text=text, **kw) as png:
+      png.write(img)
+  finally:
+    if f is not out:
+      f.close()
+
+def render(gen, out, *, seed=None, tile=None, workers=None, supersample=None,
+           resample='box', **kw):
+  '''Renders generator `gen` by tiles (see `genart.tile.tiles()`) and writes
+  them to PNG file `out` (path or binary file) as they are ready by
+  `PNGWriter` with `kw`, so pixels of the whole picture are never held (but
+  the operations recorded for it are, see `genart.tile`). The seed is saved
+  like by `rng.pnginfo()`. Returns `out`'''
+  seed = getattr(gen, 'SEED', None) if seed is None else seed
+  if seed is None:
+    rng.seed(None)
+    seed = rng.root
+  f = _open(out)
+  try:
+    png = None
+    for box, img in tiles(gen, seed=seed, tile=tile, workers=workers,
+                          supersample=supersample, resample=resample):
+      if png is None:
+        png = PNGWriter(f, gen.SIZE, img.mode, text={'seed': seed}, **kw)
+      png.write(img)
+    if png is not None:  # no tiles of an empty picture
+      png.close()
+  except BaseException:
+    if png is not None:
+      png._shutdown()
+    raise
+  finally:
+    if f is not out:
+      f.close()
+  return out
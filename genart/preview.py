@@ -0,0 +1,78 @@
+'''Progressive preview: a picture is rendered small and coarse first, then
+finer, then at the full quality, every picture is passed to a callback as
+soon as it's ready:
+
+  progressive(gen, callback=show)   # show(img, scale)
+
+  x0.25          x0.5            x1
+  +---+        +------+       +------------+
+  |   |  --->  |      |  ---> |            |  the picture itself
+  +---+        |      |       |            |
+               +------+       |            |
+                              +------------+
+
+A generator tells how its parameters change at `scale` by `preview(scale)`:
+it returns overrides of its parameters - SIZE and lengths are scaled (see
+`scaled()`), sampling is coarser, so densities and counts of points and
+lines are smaller, and a preview takes about `scale`**2 of the time. The
+composition is the same, details differ (fewer random numbers are taken).
+Generators without `preview()` are fast, they render the full picture only.
+'''
+import os
+
+from genart import gen as generators
+from genart.rng import rng
+from genart.tile import render
+
+
+SCALES = (.25, .5, 1)
+
+
+def scaled(v, scale):
+  '''Length `v` (number or tuple/list of them, like SIZE) at `scale`: ints
+  stay ints, but not 0 if `v` is not 0, floats are just multiplied'''
+  if isinstance(v, (tuple, list)):
+    return type(v)(scaled(c, scale) for c in v)
+  if isinstance(v, int):
+    r = round(v * scale)
+    return r if r or not v else (1 if v > 0 else -1)
+  return v * scale
+
+def overrides(gen, scale):
+  '''Parameters of generator `gen` at `scale` as {NAME: value}, {} at
+  scale 1 or if it has no `preview()`'''
+  if scale == 1 or not hasattr(gen, 'preview'):
+    return {}
+  return gen.preview(scale)
+
+def preview(gen, scale, *, seed=None, **render_kw):
+  '''Renders generator `gen` at `scale` (see `overrides()`) with random
+  `seed` (`gen.SEED` by default) by `render()` with `render_kw` on a new
+  module of the generator (`gen` itself at scale 1), returns the image'''
+  ps = overrides(gen, scale)
+  if ps:
+    root = os.path.dirname(os.path.abspath(gen.__file__))
+    gen = generators.load(gen.__name__, root,
+                          **dict(generators.params(gen), **ps))
+  return render(gen, seed=seed, **render_kw)
+
+def progressive(gen, scales=SCALES, callback=None, *, seed=None,
+                **render_kw):
+  '''Renders generator `gen` at `scales` (ascending, see `preview()`) with
+  one random `seed` (`gen.SEED` by default, a random one if it's None),
+  calls `callback(img, scale)` with every picture. Scales below 1 are
+  skipped for generators without `preview()`. Returns the last picture'''
+  seed = getattr(gen, 'SEED', None) if seed is None else seed
+  if seed is None:
+    rng.seed(None)
+    seed = rng.root
+  if hasattr(gen, 'preview'):
+    scales = list(scales)
+  else:
+    scales = [s for s in scales if s >= 1] or [1]
+  img = None
+  for scale in scales:
+    img = preview(gen, scale, seed=seed, **render_kw)
+    if callback is not None:
+      callback(img, scale)
+  return img
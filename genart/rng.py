@@ -0,0 +1,67 @@
+'''Random streams. Generators take random numbers from `rng` (it has all the
+methods of `random.Random`: `randint()`, `choice()`, ...), which is seeded
+with `rng.seed(seed)` before drawing. Parts of a picture (layers, primitives)
+take numbers from their own streams, derived from the seed and the key of the
+part:
+
+  with rng.stream('layer', 2):
+    draw_layer(dr, Layer(2))
+
+so a part does not depend on parts drawn before it: the picture is the same
+when it is rendered serially, by tiles or partially (resumed).
+'''
+import contextlib
+import hashlib
+import random
+import numpy as np
+from PIL import PngImagePlugin
+
+
+def derive(seed, *key):
+  'Seed of the stream `key` of the root `seed`, the same in any process/run'
+  data = repr((seed,) + key).encode()
+  return int.from_bytes(hashlib.sha256(data).digest()[:8], 'big')
+
+class Streams:
+  '''Random numbers of the current stream: the root one (of the seed) or the
+  one entered by `stream()`'''
+  def __init__(self, seed=None):
+    self.seed(seed)
+
+  def seed(self, seed=None):
+    'Sets the root `seed`, None means a new random one (see `self.root`)'
+    if seed is None:
+      seed = random.SystemRandom().randrange(2**32)
+    self.root = seed
+    self.path = ()
+    self.current = random.Random(derive(seed))
+
+  @contextlib.contextmanager
+  def stream(self, *key):
+    '''Context of the stream `key` (nested in the current one), the previous
+    stream continues after it'''
+    prev, prev_path = self.current, self.path
+    self.path = prev_path + key
+    self.current = random.Random(derive(self.root, *self.path))
+    try:
+      yield self.current
+    finally:
+      self.current, self.path = prev, prev_path
+
+  def generator(self):
+    '''NumPy `Generator` seeded from the current stream, for arrays of random
+    numbers (it takes one number of the stream)'''
+    return np.random.default_rng(self.current.getrandbits(64))
+
+  def pnginfo(self):
+    'PNG text chunk with the root seed, to reproduce the picture'
+    info = PngImagePlugin.PngInfo()
+    info.add_text('seed', str(self.root))
+    return info
+
+  def __getattr__(self, name):
+    if name == 'current':
+      raise AttributeError(name)
+    return getattr(self.current, name)
+
+rng = Streams()
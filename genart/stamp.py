@@ -0,0 +1,89 @@
+'''Stamps: a motif repeated at many pins (the same geometry, only translated)
+is drawn once into RGBA sprite and then pasted at every pin. Sprites are
+cached by the motif key and the sub-pixel offset of the pin.
+'''
+from collections import OrderedDict
+import functools
+import math
+from PIL import Image, ImageDraw
+
+from genart.cache import layer
+from genart.draw import PointBatch
+
+
+class StampCache:
+  '''LRU cache of sprites (at most `maxsize` ones). Sub-pixel offset of a pin
+  is quantized to `subpixel` buckets per pixel; None means exact offsets
+  (closest to the direct drawing, but fractional pins are not cached at all).
+  `points` - `point()` calls of motifs are batched (see `PointBatch`), it's
+  useless overhead for motifs without points. `store` - sprites are cached on
+  disk too (`genart.cache.layer()`, while rendering by `RenderCache`), only
+  for motifs which depend on their key and parameters of the generator and on
+  nothing else (no random numbers).
+  The accuracy depends on `subpixel`: a motif is drawn up to 1/(2*`subpixel`)
+  pixel away from its pin, so edges of its lines and polygons may move by a
+  pixel anywhere (pins on a grid of 1/`subpixel` pixel are exact). With exact
+  offsets (None) only parts hanging off the top/left canvas edges may differ
+  in a pixel from the direct drawing: PIL rounds negative coordinates
+  differently.
+  '''
+  def __init__(self, maxsize=64, subpixel=4, points=True, store=False):
+    self.maxsize = maxsize
+    self.subpixel = subpixel
+    self.points = points
+    self.store = store
+    self.sprites = OrderedDict()
+    self.hits = self.misses = 0
+
+  def offset(self, v):
+    'Integer part and (quantized) sub-pixel offset of a canvas coordinate'
+    i = math.floor(v)
+    frac = v - i
+    if self.subpixel:
+      frac = round(frac * self.subpixel) / self.subpixel
+      if frac == 1:
+        i, frac = i + 1, 0.
+    return i, frac
+
+  def sprite(self, key, radius, draw, frac):
+    '''Returns (and caches) sprite of motif `key`, where `radius` is the extent
+    of the motif around its pin, `draw(dr, cp)` draws it at canvas point `cp`
+    '''
+    key = (key, frac)
+    spr = self.sprites.get(key)
+    if spr is not None:
+      self.hits += 1
+      self.sprites.move_to_end(key)
+      return spr
+    self.misses += 1
+    if self.store:
+      spr = layer('sprite', functools.partial(self._draw, radius, draw, frac),
+                  key, radius, self.points)
+    else:
+      spr = self._draw(radius, draw, frac)
+    self.sprites[key] = spr
+    if len(self.sprites) > self.maxsize:
+      self.sprites.popitem(last=False)
+    return spr
+
+  def _draw(self, radius, draw, frac):
+    r = math.ceil(radius) + 1
+    spr = Image.new('RGBA', (2*r + 2, 2*r + 2), (0, 0, 0, 0))
+    dr = ImageDraw.Draw(spr)
+    if self.points:
+      with PointBatch(spr, dr) as dr:
+        draw(dr, (r + frac[0], r + frac[1]))
+    else:
+      draw(dr, (r + frac[0], r + frac[1]))
+    return spr
+
+  def stamp(self, img, key, cp, radius, draw):
+    '''Draws on `img` motif `key` with the pin at canvas point `cp`, see
+    `sprite()`. Stamps overlap in the order of `stamp()` calls as the direct
+    drawing does
+    '''
+    ix, fx = self.offset(cp[0])
+    iy, fy = self.offset(cp[1])
+    spr = self.sprite(key, radius, draw, (fx, fy))
+    r = math.ceil(radius) + 1
+    img.paste(spr, (ix - r, iy - r), spr)
@@ -0,0 +1,191 @@
+'''Supersampling (antialiasing of the whole picture): a generator draws as
+usual (canvas coords of its SIZE) on `genart.tile.Recorder`, every tile
+(band of rows) is replayed `n` times larger and reduced back by a filter, so
+a tile is the only large buffer at a time:
+
+   1x canvas            n x tile              1x tile
+  +----------+        +------------+        +----------+
+  | 0        |        |            |  box/  |          |
+  +----------+ ---->  |     1      |  ----> |    1     |  --> pasted
+  | 1        |  n x   |            | Lanczos+----------+
+  +----------+        +------------+
+  | 2        |
+  +----------+
+
+Coords of primitives are scaled at the replay: points of lines/polygons are
+pixel centers (v*n + (n-1)//2, integer), bound boxes of ellipses, rectangles,
+etc and text positions are pixel edges (v*n), widths, radii and fonts are
+scaled by n. Pixel operations (points, masks, pastes of sprites) cover
+n x n blocks, raster operations (`genart.tile.raster()`) are applied to n*n
+sub-images of the tile (one sub-pixel of every pixel), so they are per-pixel
+as on 1x canvas. Lanczos reaches neighbour pixels, so its tiles are drawn
+with `HALO` rows around them and the picture is the same as reduced at once.
+'''
+import functools
+import inspect
+import math
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from genart.canvas import Canvas
+from genart.color import ink
+from genart.draw import _scatter_points
+from genart.tile import (_replay_draw, _replay_lines, _replay_paste,
+                         _replay_raster, _replay_text, lines_in)
+
+
+RESAMPLE = {'box': Image.BOX, 'lanczos': Image.LANCZOS}
+HALO = {'box': 0, 'lanczos': 3}  # rows around tiles (the filter's support)
+TILE = 64  # rows of a tile (1x), if the size of tiles is not given
+BOXES = {'rectangle', 'rounded_rectangle', 'ellipse', 'arc', 'chord',
+         'pieslice'}  # primitives of bound boxes
+LENGTHS = ('width', 'radius', 'spacing', 'stroke_width', 'font_size')
+
+
+@functools.lru_cache(maxsize=None)
+def _signature(name):
+  return inspect.signature(getattr(ImageDraw.ImageDraw, name))
+
+def arguments(name, xy, args, kw):
+  '''All arguments (with defaults) of the call of `ImageDraw.Draw` method
+  `name` with `xy`, `args`, `kw` as a dict of keyword arguments'''
+  bound = _signature(name).bind(None, xy, *args, **kw)
+  bound.apply_defaults()
+  a = bound.arguments
+  del a['self']
+  a.pop('args', None)
+  a.update(a.pop('kwargs', {}))
+  return a
+
+@functools.lru_cache(maxsize=None)
+def scaled_font(font, n):
+  'TrueType `font` of `n` times larger size (other fonts as they are)'
+  if isinstance(font, ImageFont.FreeTypeFont):
+    return font.font_variant(size=font.size * n)
+  return font
+
+def scale_image(im, n):
+  'Image `im` `n` times larger, pixels become n x n blocks'
+  return im.resize((im.width * n, im.height * n), Image.NEAREST)
+
+class Supersampled:
+  '''Tile `img` (PIL image, its top-left pixel is at `origin` of the canvas)
+  drawn `n` times larger on `genart.canvas.Canvas`, see the module'''
+  def __init__(self, img, origin, n):
+    self.size = img.size
+    self.origin = tuple(origin)
+    self.n = n
+    self.cv = Canvas(scale_image(img, n))
+
+  def replay(self, bbox, replay, args):
+    'Replays operation `(bbox, replay, args)` recorded by `Recorder`'
+    ox, oy = self.origin
+    if replay is _replay_draw or replay is _replay_text:
+      name, xy, args, kw = args[:4]
+      xy = np.array(xy, dtype=float).reshape(-1, 2) - (ox, oy)
+      self.draw(name, xy, args, kw)
+    elif replay is _replay_lines:
+      xy, margin, args, kw = args
+      for line in lines_in(xy, margin, oy, oy + self.size[1]):
+        self.draw('line', line.reshape(-1, 2) - (ox, oy), args, kw)
+    elif replay is _replay_paste:
+      im, (x, y), mask = args
+      self.paste(im, (x - ox, y - oy), mask)
+    elif replay is _replay_raster and args[0] is _scatter_points:
+      ps, fill = args[1:]
+      self.points(np.trunc(ps) - (ox, oy), fill)  # truncated on the canvas
+    elif replay is _replay_raster:
+      self.raster(*args, bbox=bbox)
+    else:
+      raise ValueError('Unknown operation %r' % replay)
+
+  def draw(self, name, xy, args, kw):
+    '''Draws `ImageDraw.Draw` primitive `name` with points `xy` (array of
+    shape (N, 2), 1x coords of the tile), `args`, `kw`'''
+    n = self.n
+    a = arguments(name, xy, args, kw)
+    if name == 'point':
+      return self.points(xy, a['fill'])
+    if name == 'bitmap':
+      a['bitmap'] = scale_image(a['bitmap'], n)
+      a['xy'] = tuple(int(v) * n for v in xy[0])
+    elif name in BOXES:
+      # pixels x0..x1 (inclusive) are sub-pixels x0*n..x1*n + n-1
+      xy = xy * n
+      xy[1:] += n - 1
+      a['xy'] = xy.ravel().tolist()
+    elif name in ('text', 'multiline_text'):
+      a['xy'] = tuple(xy[0] * n)
+      a['font'] = scaled_font(a['font'], n)
+    else:
+      # integer centers: PIL truncates negative coords (above the tile)
+      # towards 0, so only integer ones are shifted exactly
+      a['xy'] = (np.trunc(xy) * n + (n - 1) // 2).ravel().tolist()
+    for k in LENGTHS:
+      if a.get(k):
+        a[k] = a[k] * n
+    getattr(self.cv, name)(**a)
+
+  def points(self, xy, fill):
+    '''Points `xy` (1x coords of the tile) as n x n blocks of `fill` (one
+    color or an array of colors, one per point), the last point wins'''
+    n = self.n
+    (w, h), a = self.size, self.cv.a
+    xy = np.trunc(xy).astype(np.int64)
+    inside = ((0 <= xy) & (xy < (w, h))).all(axis=1)
+    idx = xy[inside, 1] * w + xy[inside, 0]
+    _, last = np.unique(idx[::-1], return_index=True)
+    last = len(idx) - 1 - last
+    if fill is None:
+      fill = ink('white', self.cv.mode)  # PIL's default ink
+    elif not isinstance(fill, np.ndarray):
+      fill = self.cv._ink(fill)
+    fill = np.asarray(fill, dtype=np.uint8)
+    if fill.ndim == a.ndim - 1:  # a color per point
+      fill = fill[inside][last][:, np.newaxis, np.newaxis]
+    blocks = a.reshape(h, n, w, n, *a.shape[2:])  # [y, dy, x, dx]
+    blocks[idx[last] // w, :, idx[last] % w] = fill
+
+  def paste(self, im, xy, mask=None):
+    'Pastes `im` (by `mask`) at `xy` (1x coords of the tile) as blocks'
+    n = self.n
+    big = scale_image(im, n)
+    if mask is not None:
+      mask = big if mask is im else scale_image(mask, n)
+    self.cv.paste(big, (xy[0] * n, xy[1] * n), mask)
+
+  def raster(self, func, *args, bbox=None):
+    '''Raster operation `func(img, origin, *args)` (see
+    `genart.tile.raster()`) applied to every sub-image of one sub-pixel per
+    pixel of its bound box `bbox` (canvas coords, None - the whole tile)'''
+    n = self.n
+    (ox, oy), (w, h) = self.origin, self.size
+    x0, y0, x1, y1 = 0, 0, w, h
+    if bbox is not None:
+      x0 = max(math.floor(bbox[0]) - ox, 0)
+      y0 = max(math.floor(bbox[1]) - oy, 0)
+      x1 = min(math.ceil(bbox[2]) + 1 - ox, w)
+      y1 = min(math.ceil(bbox[3]) + 1 - oy, h)
+      if x0 >= x1 or y0 >= y1:
+        return
+    a = self.cv.a[y0 * n:y1 * n, x0 * n:x1 * n]
+    for dy in range(n):
+      for dx in range(n):
+        sub = Image.fromarray(np.ascontiguousarray(a[dy::n, dx::n]))
+        func(sub, (ox + x0, oy + y0), *args)
+        a[dy::n, dx::n] = np.asarray(sub)
+
+  def image(self, resample='box'):
+    'The tile reduced to 1x by filter `resample` (see `RESAMPLE`)'
+    img = self.cv.image()
+    if resample == 'box':
+      return img.reduce(self.n)
+    return img.resize(self.size, RESAMPLE[resample])
+
+def render_tile(ops, box, img, idxs, *, n, resample='box'):
+  '''Replays `ops` with indexes `idxs` on `img`, the tile `box` of the
+  canvas, drawn `n` times larger, returns the tile reduced by `resample`'''
+  ss = Supersampled(img, box[:2], n)
+  for i in idxs:
+    ss.replay(*ops[i])
+  return ss.image(resample)
@@ -0,0 +1,417 @@
+'''Tiled rendering. A generator (a module with `new_image()` and `draw(img, dr)`)
+draws on `Recorder` instead of a real image: it stands for both `img` and
+`dr`, and records primitives with their bound boxes. The canvas is split into
+tiles, every tile gets only primitives which touch it (in the order of
+drawing), tiles are rendered in worker processes and pasted together:
+
+  +-----------------+
+  | 0 [:::::::::]   |    primitive with the bound box [:::] goes to
+  +---[:::::::::]---+    tiles 0, 1
+  | 1 [:::::::::]   |
+  +-----------------+
+  | 2               |
+  +-----------------+
+
+Tiles are bands of rows: PIL rasterizes polygons with float math on absolute
+x coordinates, so only vertical shift of primitives is exact. The whole
+picture is recorded before tiles are rendered, so operations are compact
+(see `Ops`): consecutive points and lines of one style are merged into one
+operation with their coords in an array. All random
+numbers are taken while recording (in one process, from the same streams of
+`genart.rng` as by the serial drawing), so the tiled picture is the same as
+the serial one.
+'''
+from array import array
+import collections
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import gc
+import inspect
+import math
+import os
+import numpy as np
+from PIL import Image, ImageDraw
+
+from genart.rng import rng
+
+
+# `ImageDraw.Draw` methods which draw, the 1st argument of all of them is `xy`:
+DRAW_METHODS = {'point', 'line', 'polygon', 'ellipse', 'rectangle',
+                'rounded_rectangle', 'arc', 'chord', 'pieslice', 'text',
+                'multiline_text', 'bitmap'}
+TEXT_OPTIONS = {'font', 'anchor', 'spacing', 'align', 'direction', 'features',
+                'language', 'stroke_width', 'embedded_color', 'font_size'}
+MERGEHEIGHT = 32  # consecutive `point()`-s are merged while they are so close
+TILE = 256  # rows of a tile of `tiles()`, if the size of tiles is not given
+INFLIGHT = 2  # tiles in progress per worker process of `tiles()`
+
+
+def flat_xy(xy):
+  '''Coordinates as a flat list of ints: PIL truncates them this way, so they
+  can be moved to a tile by integer subtraction without any rounding'''
+  if isinstance(xy, np.ndarray):
+    return np.trunc(xy.astype(float)).astype(int).ravel().tolist()
+  res = []
+  for v in xy:
+    if isinstance(v, (tuple, list, np.ndarray)):
+      res.extend(int(c) for c in v)
+    else:
+      res.append(int(v))
+  return res
+
+def line_width(name, args, kw):
+  'Width of lines drawn by `ImageDraw.Draw` method `name` with `args`, `kw`'
+  if args:
+    method = getattr(ImageDraw.ImageDraw, name)
+    kw = inspect.signature(method).bind(None, None, *args, **kw).arguments
+  return kw.get('width') or 1
+
+def union(a, b):
+  'Bound box of bound boxes `a` and `b`'
+  return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+def _replay_draw(img, dr, origin, name, xy, args, kw):
+  ox, oy = origin
+  xy = xy.tolist()  # PIL doesn't take arrays
+  if ox or oy:
+    xy[0::2] = [v - ox for v in xy[0::2]]
+    xy[1::2] = [v - oy for v in xy[1::2]]
+  getattr(dr, name)(xy, *args, **kw)
+
+def lines_in(xy, margin, y0, y1):
+  '''Lines of flat coords `xy` (array of ints: x0, y0, x1, y1, ...) which
+  are within `margin` of rows `y0`..`y1` (exclusive), array of shape (N, 4)'''
+  ls = np.frombuffer(xy, dtype=np.int32).reshape(-1, 4)
+  top = np.minimum(ls[:, 1], ls[:, 3]) - margin
+  bottom = np.maximum(ls[:, 1], ls[:, 3]) + margin
+  return ls[(top < y1) & (bottom >= y0)]
+
+def _replay_lines(img, dr, origin, xy, margin, args, kw):
+  ox, oy = origin
+  for line in (lines_in(xy, margin, oy, oy + img.height) -
+               (ox, oy, ox, oy)).tolist():
+    dr.line(line, *args, **kw)
+
+def _replay_text(img, dr, origin, name, xy, args, kw, bbox):
+  ox, oy = origin
+  x, y = xy[0] - ox, xy[1] - oy
+  if y >= 0 or y == int(y):
+    return getattr(dr, name)((x, y), *args, **kw)
+  # PIL truncates text coords to int (towards 0) and uses their fractional
+  # part: draw on a crop, where the text has positive coords as on the canvas
+  top = min(int(xy[1]), math.floor(bbox[1])) - oy
+  part = img.crop((0, top, img.width, math.ceil(bbox[3]) + 1 - oy))
+  getattr(ImageDraw.Draw(part), name)((x, y - top), *args, **kw)
+  img.paste(part, (0, top))
+
+def _replay_paste(img, dr, origin, im, xy, mask):
+  img.paste(im, (xy[0] - origin[0], xy[1] - origin[1]), mask)
+
+def _replay_raster(img, dr, origin, func, *args):
+  func(img, origin, *args)
+
+class Ops:
+  '''Recorded operations: a sequence of `(bbox, replay, args)`, `bbox` is
+  None if the operation touches the whole image. Bound boxes are kept in one
+  flat array (NaN for None), `replay` with `args` in a list, coords of
+  points and lines are arrays of ints in `args`, so an operation costs a few
+  dozens of bytes besides its coords'''
+  def __init__(self):
+    self.boxes = array('d')  # x0, y0, x1, y1 of every operation
+    self.calls = []  # (replay, args)
+
+  def __len__(self):
+    return len(self.calls)
+
+  def __getitem__(self, i):
+    i = range(len(self.calls))[i]
+    bbox = tuple(self.boxes[4*i:4*i + 4])
+    return (None if math.isnan(bbox[0]) else bbox,) + self.calls[i]
+
+  def __setitem__(self, i, op):
+    i = range(len(self.calls))[i]
+    bbox, replay, args = op
+    self.boxes[4*i:4*i + 4] = array('d', (math.nan,) * 4 if bbox is None else
+                                    bbox)
+    self.calls[i] = (replay, args)
+
+  def append(self, op):
+    bbox, replay, args = op
+    self.boxes.extend((math.nan,) * 4 if bbox is None else bbox)
+    self.calls.append((replay, args))
+
+  def rows(self):
+    '''Rows of the bound boxes: array of shape (N, 2) - the top and the
+    bottom one (-inf, inf if the operation touches the whole image)'''
+    ys = np.frombuffer(self.boxes, dtype=float).reshape(-1, 4)[:, 1::2]
+    return np.where(np.isnan(ys), (-math.inf, math.inf), ys)
+
+class Recorder:
+  '''Records drawing on the image of `mode` and `size` (like in `Image.new()`):
+  it works as its `ImageDraw.Draw` and as the image (`paste()`). `ops` are
+  the recorded operations (see `Ops`)
+  '''
+  def __init__(self, mode, size):
+    self.mode = mode
+    self.size = tuple(size)
+    self.ops = Ops()
+    # not drawing methods (`textlength()`, etc) are answered by it:
+    self._dr = ImageDraw.Draw(Image.new(mode, (1, 1)))
+
+  @property
+  def width(self): return self.size[0]
+
+  @property
+  def height(self): return self.size[1]
+
+  def __getattr__(self, name):
+    if name.startswith('_'):
+      raise AttributeError(name)
+    return getattr(self._dr, name)
+
+  def _draw(self, name, xy, *args, **kw):
+    if name == 'point' and len(xy) == 2 and not hasattr(xy[0], '__len__'):
+      # the most frequent case - one point
+      x, y = int(xy[0]), int(xy[1])
+      bbox = (x - 2, y - 2, x + 2, y + 2)
+      if not (self.ops and self._merge_points(bbox, (x, y), args, kw)):
+        self.ops.append((bbox, _replay_draw,
+                         ('point', array('i', (x, y)), args, kw)))
+      return
+    if name in ('text', 'multiline_text'):
+      textbbox = (self._dr.textbbox if name == 'text' else
+                  self._dr.multiline_textbbox)
+      opts = {k: v for k, v in kw.items() if k in TEXT_OPTIONS}
+      bbox = textbbox(xy, args[0] if args else kw['text'], **opts)
+      xy = tuple(xy)
+    else:
+      xy = flat_xy(xy)
+      if name == 'bitmap':
+        w, h = (args[0] if args else kw['bitmap']).size
+        bbox = (xy[0], xy[1], xy[0] + w, xy[1] + h)
+      else:
+        bbox = (min(xy[0::2]), min(xy[1::2]), max(xy[0::2]), max(xy[1::2]))
+    m = line_width(name, args, kw) + 1  # lines are wider than the bound box
+    if name == 'line' and len(xy) == 4:
+      return self._lines(bbox, array('i', xy), m, args, kw)
+    bbox = (bbox[0] - m, bbox[1] - m, bbox[2] + m, bbox[3] + m)
+    if name == 'point' and self.ops and self._merge_points(bbox, xy, args, kw):
+      return
+    if name in ('text', 'multiline_text'):
+      self.ops.append((bbox, _replay_text, (name, xy, args, kw, bbox)))
+    else:
+      self.ops.append((bbox, _replay_draw, (name, array('i', xy), args, kw)))
+
+  def _merge_points(self, bbox, xy, args, kw):
+    'Appends points to the previous `point()` with the same color if possible'
+    prev_bbox, replay, prev = self.ops[-1]
+    if replay is not _replay_draw or prev[0] != 'point':
+      return False
+    bbox = union(bbox, prev_bbox)
+    if (prev[2:] != (args, kw)) or (bbox[3] - bbox[1] > MERGEHEIGHT):
+      return False
+    prev[1].extend(xy)
+    self.ops[-1] = (bbox, replay, prev)
+    return True
+
+  def _lines(self, bbox, xy, margin, args, kw):
+    '''Records lines of flat int coords `xy` (array: x0, y0, x1, y1, ...)
+    with the bound box `bbox`, appends them to the previous lines of the same
+    style if any: a tile replays only its lines (`lines_in()`), so lines are
+    merged however far they are'''
+    bbox = (bbox[0] - margin, bbox[1] - margin, bbox[2] + margin,
+            bbox[3] + margin)
+    if self.ops:
+      prev_bbox, replay, prev = self.ops[-1]
+      if replay is _replay_lines and prev[2:] == (args, kw):
+        prev[0].extend(xy)
+        self.ops[-1] = (union(bbox, prev_bbox), replay, prev)
+        return
+    self.ops.append((bbox, _replay_lines, (xy, margin, args, kw)))
+
+  def lines(self, xys, fill=None, width=0):
+    '''Records lines `xys` (array of shape (N, 4): x0, y0, x1, y1 of every
+    line) of one style at once, like `line()` of every one of them'''
+    xys = np.trunc(np.asarray(xys, dtype=float)).astype(np.int32).reshape(-1, 4)
+    if not len(xys):
+      return
+    kw = {'fill': fill, 'width': width}
+    ys, xs = xys[:, 1::2], xys[:, 0::2]
+    bbox = (int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max()))
+    xy = array('i')
+    xy.frombytes(xys.tobytes())
+    self._lines(bbox, xy, (width or 1) + 1, (), kw)
+
+  for name in DRAW_METHODS:
+    locals()[name] = functools.partialmethod(_draw, name)
+  del name
+
+  def regular_polygon(self, bounding_circle, n_sides, rotation=0, fill=None,
+                      outline=None, width=1):
+    'Recorded as `polygon()`, vertices are calculated like PIL does'
+    xy = ImageDraw._compute_regular_polygon_vertices(bounding_circle, n_sides,
+                                                     rotation)
+    self._draw('polygon', xy, fill=fill, outline=outline, width=width)
+
+  def paste(self, im, box=None, mask=None):
+    'Pastes image `im`, see `Image.paste()` (`box` is None or 2/4-tuple)'
+    x, y = (0, 0) if box is None else box[:2]
+    w, h = im.size
+    self.ops.append(((x, y, x + w, y + h), _replay_paste, (im, (x, y), mask)))
+
+  def raster(self, func, *args, bbox=None):
+    'Records raster operation `func(img, origin, *args)`, see `raster()`'
+    self.ops.append((bbox, _replay_raster, (func,) + args))
+
+def raster(img, func, *args, bbox=None):
+  '''Applies raster operation `func(img, origin, *args)` to `img` (PIL image,
+  `Recorder` or `genart.canvas.Canvas`). `func` processes pixels of `img` in-place, `origin` is the
+  canvas coords of the top-left pixel of `img` (`img` is a tile), `bbox` is the
+  bound box of touched pixels (None - all). `func` and `args` must be picklable
+  '''
+  if not isinstance(img, Image.Image):
+    img.raster(func, *args, bbox=bbox)
+  else:
+    func(img, (0, 0), *args)
+
+def split(size, tile):
+  'Boxes `(x0, y0, x1, y1)` of tiles (bands of `tile` rows) of canvas `size`'
+  w, h = size
+  return [(0, y, w, min(y + tile, h)) for y in range(0, h, tile)]
+
+def bucket(ops, size, tile, halo=0):
+  '''Indexes of `ops` (in the order of drawing) touching every tile of
+  `split(size, tile)` widened by `halo` rows up and down'''
+  n = math.ceil(size[1] / tile)
+  ys = ops.rows()
+  if not halo:
+    r0 = np.floor(ys[:, 0] / tile)
+    r1 = np.floor(ys[:, 1] / tile)
+    return [np.flatnonzero((r0 <= r) & (r1 >= r)).tolist() for r in range(n)]
+  return [np.flatnonzero((ys[:, 0] < (r + 1) * tile + halo) &
+                         (ys[:, 1] >= r * tile - halo)).tolist()
+          for r in range(n)]
+
+def widen(box, halo, size):
+  'Tile `box` widened by `halo` rows up and down within canvas `size`'
+  x0, y0, x1, y1 = box
+  return (x0, max(y0 - halo, 0), x1, min(y1 + halo, size[1]))
+
+_Ops = None  # recorded operations in the worker process
+
+def _init_worker(ops):
+  global _Ops
+  _Ops = ops
+
+def render_tile(ops, box, img, idxs):
+  'Replays `ops` with indexes `idxs` on `img`, the tile `box` of the canvas'
+  dr = ImageDraw.Draw(img)
+  for i in idxs:
+    _, replay, args = ops[i]
+    replay(img, dr, box[:2], *args)
+  return img
+
+def _render_tile(render, box, img, idxs):
+  return render(_Ops, box, img, idxs)
+
+def _imap(ex, func, window, *iterables):
+  'Like `ex.map()`, but at most `window` calls are submitted at a time'
+  pending = collections.deque()
+  for args in zip(*iterables):
+    if len(pending) >= window:
+      yield pending.popleft().result()
+    pending.append(ex.submit(func, *args))
+  while pending:
+    yield pending.popleft().result()
+
+def tiles(gen, *, seed=None, tile=None, workers=None, supersample=None,
+          resample='box'):
+  '''Renders generator `gen` by tiles (see `render()`), yields `(box, img)`
+  of every tile from the top as soon as it is ready. At most `INFLIGHT`
+  tiles per worker are in progress, blank tiles are `gen.new_image(size)` of
+  the size of a tile, so pixels of the whole picture are never held (if
+  `new_image()` doesn't take the size, tiles are cropped from the blank
+  picture). Operations of the whole picture are recorded at first and are
+  held till the last tile (see `Ops`)'''
+  rng.seed(getattr(gen, 'SEED', None) if seed is None else seed)
+  if 'size' in inspect.signature(gen.new_image).parameters:
+    img = None
+    mode, size = gen.new_image((1, 1)).mode, tuple(gen.SIZE)
+  else:
+    img = gen.new_image()
+    mode, size = img.mode, img.size
+  def blank(box):
+    if img is not None:
+      return img.crop(box)
+    return gen.new_image((box[2] - box[0], box[3] - box[1]))
+  halo = 0
+  render_op = render_tile
+  if supersample:
+    from genart import supersample as ss
+    if resample not in ss.RESAMPLE:
+      raise ValueError('Unknown resample filter %r, expected one of %s' % (
+        resample, ', '.join(ss.RESAMPLE)))
+    tile = tile or ss.TILE
+    halo = ss.HALO[resample]
+    render_op = functools.partial(ss.render_tile, n=supersample,
+                                  resample=resample)
+  tile = tile or TILE
+  rec = Recorder(mode, size)
+  gc_enabled = gc.isenabled()
+  gc.disable()  # millions of recorded ops make GC passes very slow
+  try:
+    gen.draw(rec, rec)
+  finally:
+    if gc_enabled:
+      gc.enable()
+  boxes = split(size, tile)
+  wides = [widen(box, halo, size) for box in boxes]
+  idxs = bucket(rec.ops, size, tile, halo)
+  workers = min(workers or os.cpu_count() or 1, len(boxes))
+  def cut(box, wide, t):  # the halo
+    if wide == box:
+      return t
+    return t.crop((0, box[1] - wide[1], t.width, box[3] - wide[1]))
+  if workers <= 1:  # or no tiles at all
+    for box, wide, ii in zip(boxes, wides, idxs):
+      yield box, cut(box, wide, render_op(rec.ops, wide, blank(wide), ii))
+    return
+  gc.freeze()  # forked workers don't copy pages of recorded ops then
+  try:
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(rec.ops,)) as ex:
+      rendered = _imap(ex, functools.partial(_render_tile, render_op),
+                       workers * INFLIGHT, wides, map(blank, wides), idxs)
+      for box, wide, t in zip(boxes, wides, rendered):
+        yield box, cut(box, wide, t)
+  finally:
+    gc.unfreeze()
+
+def render(gen, *, seed=None, tile=None, workers=None, wrap=None,
+           canvas=False, supersample=None, resample='box'):
+  '''Renders generator `gen` (module with `new_image()`, `draw(img, dr)`) with
+  random `seed` (`gen.SEED` by default, see `rng.root` then): serially if
+  `tile` is None, else by tiles (bands of `tile` rows) in `workers` processes
+  (all CPUs by default, see `tiles()`). `wrap(dr)` wraps `ImageDraw.Draw` of
+  the serial rendering (see `genart.instrument`). With `canvas` the serial
+  rendering draws on NumPy `genart.canvas.Canvas`. With `supersample` = n
+  tiles are drawn n times larger and reduced by filter `resample` ('box',
+  'lanczos'), see `genart.supersample`. Returns the image
+  '''
+  if not tile and not supersample:
+    rng.seed(getattr(gen, 'SEED', None) if seed is None else seed)
+    img = gen.new_image()
+    if canvas:
+      from genart.canvas import Canvas
+      img = dr = Canvas(img)
+    else:
+      dr = ImageDraw.Draw(img)
+    gen.draw(img, wrap(dr) if wrap else dr)
+    return img.image() if canvas else img
+  if wrap or canvas:
+    raise ValueError('wrap and canvas are for the serial rendering only')
+  img = gen.new_image()
+  for box, t in tiles(gen, seed=seed, tile=tile, workers=workers,
+                      supersample=supersample, resample=resample):
+    img.paste(t, box[:2])
+  return img
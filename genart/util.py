@@ -0,0 +1,43 @@
+'''Small non-geometric utilities'''
+import functools
+
+
+def seq(xs, *, t=None, **mod):
+  '''Converts `xs` to list/tuple, modifies items with args like _0=value/lambda
+  or _=value/lambda (over all items). `t` may be not only function (like `list`),
+  but a list or tuple of functions - they will be applied one by one: from the
+  left to the right.
+  '''
+  l = list(xs)
+  for k in mod:
+    try:
+      assert k.startswith('_')
+      v = mod[k]
+      if not k[1:]:
+        for i in range(len(l)):
+          l[i] = v(l[i]) if callable(v) else v
+      else:
+        i = int(k[1:])
+        l[i] = v(l[i]) if callable(v) else v
+    except:
+      continue
+  if t is None:
+    return tuple(l) if isinstance(xs, tuple) else list(l)
+  elif isinstance(t, (list, tuple)):
+    return functools.reduce(lambda i,f:f(i), t, l)
+  else:
+    return t(l)
+
+def matrix(cols, rows, init=None):
+  return [[init for col in range(cols)] for x in range(rows)]
+
+def flat_2x2(mx): return [col for row in mx for col in row]
+
+def to_scale(from_scale, to_scale, from_value):
+  'Maps from_value from a scale from_scale to new scale/scale: to_scale'
+  from_segs = from_scale[1] - from_scale[0]
+  to_segs = to_scale[1] - to_scale[0]
+  from_seg = from_value - from_scale[0]
+  to_seg = (to_segs * from_seg) / from_segs
+  to_value = round(to_scale[0] + to_seg)
+  return to_value
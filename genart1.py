@@ -1,6 +1,10 @@
 from PIL import Image, ImageDraw, ImageFont, ImageColor
-import random
+from genart.color import hsl
+from genart.layers import Stage, draw_stages
+from genart.rng import rng
 
+OUT = 'genart1.png'
+SEED = None  # seed of random numbers, None - a random one
 IMGBG = (40,20,2)
 SIZE = (1024, 768)
 SQSIDE = 10
@@ -13,10 +17,11 @@ LAYERDIST = 5  # distance between layers in squares
 
 def rnd(x, tolerance=None, positive=True):
   if tolerance is None: res = x
-  else: res = random.randint(x - tolerance, x + tolerance)
+  else: res = rng.randint(x - tolerance, x + tolerance)
   return abs(res) if positive else res
 
-def square_coord(col, row, sqside=SQSIDE):
+def square_coord(col, row, sqside=None):
+  sqside = sqside or SQSIDE
   return [(col*sqside, row*sqside),
           ((col+1)*sqside, (row+1)*sqside)]
 
@@ -47,21 +52,40 @@ def draw_square(dr, coords, **opts):
 def draw_layer(dr, layer):
   for col in layer.cols:
     for row in layer.rows:
-      if random.randint(0, 20) % DECIMATION:
+      if rng.randint(0, 20) % DECIMATION:
         continue
       coords = square_coord(col, row, layer.sqside)
       coords = [(rnd(x, SQCOORDTOLERANCE),
                  rnd(y, SQCOORDTOLERANCE)) for x,y in coords]
-      outline2 = 'hsl(%d,%d%%,%d%%)' % layer.pencolor
-      fill2 = 'hsl(%d,%d%%,%d%%)' % layer.brushcolor
+      outline2 = hsl(*layer.pencolor)
+      fill2 = hsl(*layer.brushcolor)
       draw_square(dr, coords, width=rnd(1, WIDTHTOLERANCE),
                   fill=fill2, outline=outline2)
 
-im = Image.new("RGB", SIZE, IMGBG)
-dr = ImageDraw.Draw(im)
-for l in [0,1,2]:
-  draw_layer(dr, Layer(l))
+def new_image(size=None):
+  'Blank picture, or its tile of `size` (see `genart.tile.tiles()`)'
+  return Image.new("RGB", size or SIZE, IMGBG)
 
-# Save result
-with open('genart1.png', 'wb') as f:
-  im.save(f, format='PNG')
\ No newline at end of file
+def stages():
+  'Layer stages of the picture, see `genart.layers`'
+  deps = ('SIZE', 'SEED', 'DECIMATION', 'SQCOORDTOLERANCE', 'WIDTHTOLERANCE',
+          'LAYERDIST')
+  def stage(l):
+    def draw(img, dr):
+      with rng.stream('layer', l):
+        draw_layer(dr, Layer(l))
+    return Stage('layer%d' % l, deps, draw)
+  return [stage(l) for l in [0,1,2]]
+
+def draw(img, dr):
+  'Draws the picture on `img`, `dr` is its `ImageDraw.Draw`'
+  draw_stages(img, dr, stages())
+
+
+############################## draw ####################################
+if __name__ == '__main__':
+  rng.seed(SEED)
+  img = new_image()
+  draw(img, ImageDraw.Draw(img))
+  with open(OUT, 'wb') as f:
+    img.save(f, format='PNG', pnginfo=rng.pnginfo())
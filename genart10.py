@@ -1,10 +1,19 @@
 # -*- coding: utf-8 -*-
 from PIL import Image, ImageDraw, ImageColor
-import random
 import math
 import pdb
+import numpy as np
+from genart.color import hsv
+from genart.draw import PointBatch, draw_annulus, draw_circle, draw_points
+from genart.geom import (canvas_to_cartesian, cartesian_to_canvas, circle_point,
+                         polar_to_cartesian)
+from genart.preview import scaled
+from genart.rng import rng
+from genart.stamp import StampCache
+from genart.util import flat_2x2
 
 OUT = 'genart10.png'
+SEED = None  # seed of random numbers, None - a random one
 IMGBG = (36,31,80)  # HSV
 SIZE = (1400, 800)
 RINGRADIUS = 80
@@ -22,16 +31,18 @@ SHADOWMAXLEN = 0.06  # multiplier of RANDRADIUS
 #  '. / |   .'
 #    o..|..'
 CROSSANGLE = 7
-
-assert 1 < CROSSANGLE < 45, 'Invalid CROSSANGLE value'
-assert 1 < STRIPES, 'Invalid STRIPES value'
+# draw rings once as sprites and paste them: faster, and the picture is the
+# same as drawn directly - sprites are of exact sub-pixel offsets of pins
+# (`StampCache` with subpixel=None, pins repeat them along rows and columns),
+# rings hanging off the top/left edges are drawn directly
+STAMPS = True
 
 
 def rnd(x, tolerance=None, step=None):
   if not tolerance:
     return x
   else:
-    return random.randrange(x - tolerance, x + tolerance, step or 1)
+    return rng.randrange(x - tolerance, x + tolerance, step or 1)
 
 def gap_side():
   r'''Finds the approximate gap (between rings) side, it's 2*b,
@@ -50,162 +61,35 @@ def gap_side():
   b = math.tan(math.radians(CROSSANGLE)) * RINGRADIUS
   return b*2
 
-GapSide = gap_side()
-# Horiz/vertic distance b/w ring centers:
-PinsOrthogonalDist = GapSide + (2*RINGRADIUS)
-
-
-def seq(xs, *, t=None, **mod):
-  'Converts `xs` to list/tuple, modifies items with args like _0=value/lambda'
-  l = list(xs)
-  for k in mod:
-    try:
-      assert k.startswith('_')
-      i = int(k[1:])
-      v = mod[k]
-      l[i] = v(l[i]) if callable(v) else v
-    except:
-      continue
-  if t is None:
-    return tuple(l) if isinstance(xs, tuple) else list(l)
-  else:
-    return t(l)
-
-# def norm_angle(ang):
-#   'Normilizes angle (in usual trigonometric coordinates)'
-#   ang0 = ang % 360 if ang >= 360 else ang
-#   return 360 + ang0 if ang0 < 0 else ang0
-
-def distance(pt1, pt2):
-  return math.sqrt(((pt2[0] - pt1[0])**2) + ((pt2[1] - pt1[1])**2))
-
-def polar_to_cartesian(pp, orig=None):
-  r'''Converts polar coordinates (angle, radius) to abstract Descartes (x,y)
-  if `orig` is None or to real/global Descrates if `orig` points out the
-  real cartesian coordinates of the origin point of the polar turning:
-
-   x,y...|
-         |^  ang
-  orig...|.\.___    Polar coord  (ang,dist) - vector tip is "x"
-         | /:
-         |/_:_____
-       0,0  :
-          orig
-  '''
-  ang, rad = pp
-  ang = math.radians(ang)
-  x = rad * math.cos(ang)
-  y = rad * math.sin(ang)
-  ox, oy = (0,0) if orig is None else orig
-  # if to return int-s I hit strange error with multiple points very close
-  # to each others, like additive error:
-  return (x + ox, y + oy)
-
-def cartesian_to_polar(p, orig=None):
-  r'''
-   x,y...|
-         |^  ang
-  orig...|.\.___    Polar coord  (ang,dist) - vector tip is "x"
-         | /:
-         |/_:_____
-       0,0  :
-          orig
-  '''
-  if orig is not None:
-    length = distance(p, orig)
-    x1, y1 = p[0] - orig[0], p[1] - orig[1]  # TODO is it right?
-    mul = x1 * 1 - y1 * 0  # 1,0 - coords of new vector
-    cos_ang = mul / (length * 1)
-    ang = math.degrees(math.acos(cos_ang))
-    return (length, ang)
-  else:
-    orig = (0, 0)
-    hipot = distance(p, orig)
-    sin_ang = p[1] / hipot
-    ang = math.degrees(math.asin(sin_ang))
-    return (hipot, ang)
-
-# def canvas_to_cartesian(pt):
-#   return (pt[0] - (SIZE[0]//2), (SIZE[1]//2) - pt[1])
+def init():
+  'Checks constants and calculates derived globals, call it after changing them'
+  global GapSide, PinsOrthogonalDist, Stamps
+  assert 1 < CROSSANGLE < 45, 'Invalid CROSSANGLE value'
+  assert 1 < STRIPES, 'Invalid STRIPES value'
+  GapSide = gap_side()
+  # Horiz/vertic distance b/w ring centers:
+  PinsOrthogonalDist = GapSide + (2*RINGRADIUS)
+  Stamps = StampCache(subpixel=None, store=True)
 
-def cartesian_to_canvas(pt):
-  return (pt[0] + (SIZE[0]/2), (SIZE[1]/2) - pt[1])
+init()
 
-def affine(p, mx):
-  x,y = p
-  ((a,b,c), (d,e,f)) = mx
-  x1 = a*x + b*y + c
-  y1 = d*x + e*y + f
-  return (x1, y1)
-
-def circle_pt(cp, radius, *, x=None, y=None):
-  '''Returns x or y from y or x of the circle with a center `cp`:
-  (x-cx)^2 + (y-cy)^2 = R^2
-  (y-cy) = +/-sqrt(R^2 - (x-cx)^2) => y = cy +/- sqrt(R^2 - (x-cx)^2)
-  (x-cx) = +/-sqrt(R^2 - (y-cy)^2) => x = cx +/- sqrt(R^2 - (y-cy)^2)
-  '''
-  cx, cy = cp
-  if x is not None:
-    x_cx = x - cx
-    y0 = math.sqrt((radius**2) - (x_cx**2))
-    return sorted((cy + y0, cy - y0))
-  elif y is not None:
-    y_cy = y - cy
-    x0 = math.sqrt((radius**2) - (y_cy**2))
-    return sorted((cx + x0, cx - x0))
-  else:
-    raise ValueError('Either x or y keyword arg must be passed')
-
-def draw_circle(dr, p, radius, **kw):
-  l = p[0] - radius
-  r = p[0] + radius
-  t = p[1] - radius
-  b = p[1] + radius
-  dr.ellipse((l,t,r,b), **kw)
 
 def draw_arc(dr, pt, radius, ang0, ang1, *, width=1, color='white', aa=False):
   '''`pt` - abstract cartesian coords, start/stop angels are in degrees.
-  `color` as HSV tuple if antialiasing (`aa`=True) is needed.
+  The arc is `width` pixels wide (wider than 1 - see `draw_thick_arc()`),
+  `aa`=True means antialiasing of 1 pixel wide arcs.
   '''
-  def draw(width, color):
-    '''Common draw (for antialiasing): `width` is radius of small circles -
-    they simulate "width" of the arc-line'''
-    nonlocal ang0, ang1
-    if ang1 < ang0:
-      ang1 += 360 * (1 + (ang0 // 360)) # add N full turn like they are in ang0
-    # Now make ang1 to follow ang0 (clockwise turn!), so: 120..0 is 120,121..360:
-    delta_ang = abs(ang1 - ang0)
-    ang1 = ang0 + delta_ang
-    # arc_len = (PI * r * angle)/180
-    # angle = (arc_len * 180) / (PI * r)
-    # So, angle for arc_len=0.25 pixels (0.25 looks smooth):
-    ang_step = (0.25 * 180) / (math.pi * max(1, radius))
-    ang_step = ang_step if ang1 > ang0 else -ang_step
-    ang = ang0
-    while ang <= ang1:
-      p = polar_to_cartesian((ang, radius), orig=pt)
-      pc = cartesian_to_canvas(p)
-      #draw_circle(dr, pc, width, fill=color, width=1) # "point" drawing the arc
-      dr.point(pc, fill=color)
-      ang += ang_step
-  if aa and isinstance(color, (tuple, list)):
-    c1 = seq(color, t=tuple, _2=lambda c: max(1, c - (c//3)))
-    c2 = seq(color, t=tuple, _2=lambda c: c)
-    c1 = 'hsv(%d,%d%%,%d%%)' % c1
-    c2 = 'hsv(%d,%d%%,%d%%)' % c2
-    draw(max(1, width), c1)
-    draw(max(1, (width) - 2), c2)
-  else:
-    if isinstance(color, (tuple, list)):
-      color = 'hsv(%d,%d%%,%d%%)' % color
-    draw(max(1, width), color)
+  if width > 1:
+    return draw_thick_arc(dr, pt, radius, ang0, ang1, width=width, color=color)
+  draw_annulus(dr, cartesian_to_canvas(pt, SIZE), radius - 0.5, radius + 0.5,
+               ang0, ang1, fill=color, aa=aa)
 
 def draw_thick_arc(dr, pt, radius, ang0, ang1, *, width=1, color='white'):
-  'Draws arcs which width is greater than 1 as concentrated arcs'
+  'Draws arcs which width is greater than 1 as one annular sector'
   rad0 = round(radius - (width/2))
   rad1 = round(radius + (width/2))
-  for r in range(rad0, rad1 + 1):
-    draw_arc(dr, pt, r, ang0, ang1, width=1, color=color, aa=False)
+  draw_annulus(dr, cartesian_to_canvas(pt, SIZE), rad0 - 0.5, rad1 + 0.5,
+               ang0, ang1, fill=color)
 
 def find_pins():
   '''Returns matrix of pins as Discartes coords and matrix is:
@@ -239,12 +123,10 @@ def find_pins():
       bps.append(   pins_not_from_center(-(v*ort2)))
   return tps + bps
 
-def flat_2x2(mx): return [col for row in mx for col in row]
-
 def draw_ring(dr, p, angs):
   'p - cartesian'
-  c1 = 'hsv(%d,%d%%,%d%%)' % tuple(RINGCOLOR)
-  c2 = 'hsv(%d,%d%%,%d%%)' % tuple(STRIPECOLOR)
+  c1 = hsv(*RINGCOLOR)
+  c2 = hsv(*STRIPECOLOR)
   spaces = STRIPES - 1
   whole = RINGRADIUS
   ang0, ang1 = angs
@@ -271,34 +153,48 @@ def draw_ring(dr, p, angs):
     draw_thick_arc(dr, p, r, ang0, ang1, width=w, color=c2)
     draw_thick_arc(dr, p, r - (w/2) - (s1/2), ang0, ang1, width=s1, color=c1)
     r = r - w - s1
-  draw_circle(dr, cartesian_to_canvas(p), w*0.75, fill=c2)
-
-def draw_rings(dr, pins):
+  draw_circle(dr, cartesian_to_canvas(p, SIZE), w*0.75, fill=c2)
+
+def stamp_ring(img, dr, p, angs):
+  'The same as `draw_ring()`, but with a cached sprite if STAMPS'
+  extent = RINGRADIUS + 2  # +2: thick arcs are rounded outside
+  cp = cartesian_to_canvas(p, SIZE)
+  if not STAMPS or min(cp) < extent:  # PIL rounds negative coords its way
+    return draw_ring(dr, p, angs)
+  def draw(dr, cp):
+    draw_ring(dr, canvas_to_cartesian(cp, SIZE), angs)
+  key = ('ring', tuple(angs), RINGRADIUS, STRIPES, SPACEWIDTH, RINGCOLOR,
+         STRIPECOLOR)
+  Stamps.stamp(img, key, cp, extent, draw)
+
+def draw_rings(img, dr, pins):
   for p in pins:
-    draw_ring(dr, p, (0,360))
+    stamp_ring(img, dr, p, (0,360))
 
-def draw_order(dr, mx):
+def draw_order(img, dr, mx):
   rows_2 = len(mx) // 2
   restore_quadrants = [3, 4]
   for i, row in enumerate(reversed(mx)):  # from bottom to top
     ii = i - 1 if i >= rows_2 else i
     restore_quadrant = restore_quadrants[ii%2]
     for j, p in enumerate(row):
-      draw_ring_shadow(dr, p, restore_quadrant)
+      with rng.stream('shadow', i, j):
+        with PointBatch(img, dr) as pdr:
+          draw_ring_shadow(pdr, p, restore_quadrant)
       ang0, ang1 = arc_angle(restore_quadrant)
-      draw_ring(dr, p, (ang0,ang1))
+      stamp_ring(img, dr, p, (ang0,ang1))
 
 def random_inside_circle(radius, density=10):
   density = int(density)
   res = []
   for _i in range(density):
-    x = random.randint(-radius, radius)
-    yrange = circle_pt((0,0), radius, x=x)
+    x = rng.randint(-radius, radius)
+    yrange = circle_point((0,0), radius, x=x)
     yrange = list(map(int, yrange))
     if yrange[0] == yrange[1]:
       y = yrange[0]
     else:
-      y = random.randint(*map(round, yrange))
+      y = rng.randint(*map(round, yrange))
     res.append((x,y))
   return res
 
@@ -307,7 +203,7 @@ def draw_ring_shadow(dr, p, quadrant):
     return
   #cc = cartesian_to_canvas(p)
   #draw_circle(dr, cc, 3, fill='red')
-  color = 'hsv(%d,%d%%,%d%%)' % tuple(STRIPECOLOR)
+  color = hsv(*STRIPECOLOR)
   ang0, ang1 = arc_angle(quadrant)
   ang0 += 5; ang1 -= 5
   arc_degrees = ang1 - ang0  # ang1 > ang0
@@ -325,11 +221,9 @@ def draw_ring_shadow(dr, p, quadrant):
       rndps = random_inside_circle(int(zone_r), density=max(1, zone_r**2))
     else:
       rndps = [(0,0)]
-    for rndp in rndps:
-      cp = (rndp[0] + zone_c[0], rndp[1] + zone_c[1])
-      cp = cartesian_to_canvas(cp)
-      #draw_circle(dr, cp, 2, fill=color)
-      dr.point(cp, fill=color)
+    cps = cartesian_to_canvas(np.add(rndps, zone_c), SIZE)
+    #draw_circle(dr, cp, 2, fill=color)
+    draw_points(dr, cps, color)
     #zone_cc = cartesian_to_canvas(zone_c)
     #draw_circle(dr, zone_cc, zone_r, fill='green')
     # next iteration:
@@ -342,17 +236,16 @@ def draw_ring_shadow(dr, p, quadrant):
 def draw_gaps_shadow(dr, pins):
   if not SHADOWS:
     return
-  color = 'hsv(%d,%d%%,%d%%)' % tuple(STRIPECOLOR)
+  color = hsv(*STRIPECOLOR)
   gapside_2 = GapSide//2
   gap_r = round(gapside_2 * 1.2)
-  rndps = random_inside_circle(gap_r, density=max(1, 8*(gap_r**2)))
+  with rng.stream('gaps'):
+    rndps = random_inside_circle(gap_r, density=max(1, 8*(gap_r**2)))
   for row in pins:
     for p in row:
       gap_c = (p[0] + RINGRADIUS + gapside_2, p[1])
-      for rndp in rndps:
-        cp = (rndp[0] + gap_c[0], rndp[1] + gap_c[1])
-        cp = cartesian_to_canvas(cp)
-        dr.point(cp, fill=color)
+      cps = cartesian_to_canvas(np.add(rndps, gap_c), SIZE)
+      draw_points(dr, cps, color)
 
 def arc_angle(quadrant):
   '''Returns the angle of arc (in degrees) to restore the down ring part
@@ -375,19 +268,34 @@ def arc_angle(quadrant):
 
 def debug(dr, ps, color='white'):
   for p in ps:
-    cp = cartesian_to_canvas(p)
-    draw_arc(dr, p, RINGRADIUS, 0, 360, width=5, color=(0,0,100), aa=0)
+    cp = cartesian_to_canvas(p, SIZE)
+    draw_arc(dr, p, RINGRADIUS, 0, 360, width=5, color=hsv(0,0,100), aa=0)
     #draw_circle(dr, cp, RINGRADIUS, fill='white')
     #dr.point(p, fill='red')
 
-############################## draw ####################################
-img = Image.new("RGB", SIZE, 'hsv(%d,%d%%,%d%%)' % IMGBG)
-dr = ImageDraw.Draw(img)
-pins_2x2 = find_pins()
-pins = flat_2x2(pins_2x2)
-draw_gaps_shadow(dr, pins_2x2)
-draw_rings(dr, pins)
-draw_order(dr, pins_2x2)
+def new_image(size=None):
+  'Blank picture, or its tile of `size` (see `genart.tile.tiles()`)'
+  return Image.new("RGB", size or SIZE, hsv(*IMGBG))
+
+def preview(scale):
+  '''Parameters of the preview at `scale` (see `genart.preview`): rings are
+  smaller, so their shadows are of fewer random points (by the area)'''
+  return {'SIZE': scaled(SIZE, scale), 'RINGRADIUS': scaled(RINGRADIUS, scale)}
 
-with open(OUT, 'wb') as f:
-  img.save(f, format='PNG')
\ No newline at end of file
+def draw(img, dr):
+  'Draws the picture on `img`, `dr` is its `ImageDraw.Draw`'
+  pins_2x2 = find_pins()
+  pins = flat_2x2(pins_2x2)
+  with PointBatch(img, dr) as pdr:
+    draw_gaps_shadow(pdr, pins_2x2)
+  draw_rings(img, dr, pins)
+  draw_order(img, dr, pins_2x2)
+
+
+############################## draw ####################################
+if __name__ == '__main__':
+  rng.seed(SEED)
+  img = new_image()
+  draw(img, ImageDraw.Draw(img))
+  with open(OUT, 'wb') as f:
+    img.save(f, format='PNG', pnginfo=rng.pnginfo())
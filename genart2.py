@@ -1,7 +1,11 @@
 from PIL import Image, ImageDraw, ImageFont, ImageColor
-import random
+from genart.color import hsl
+from genart.font import load_font
+from genart.layers import Stage, draw_stages
+from genart.rng import rng
 
 OUT = 'genart2.png'
+SEED = None  # seed of random numbers, None - a random one
 IMGBG = (0, 0, 0)
 SIZE = (1200, 1000)
 CELLSIZE = 80
@@ -20,9 +24,10 @@ RAYS = 10  # rays number in each direction
 
 Up, Down, Left, Right = range(4)  # directions
 
-def rnddir(): return random.randint(0, 3)
+def rnddir(): return rng.randint(0, 3)
 
-def dir2coord(pt, dir, step=CELLSIZE):
+def dir2coord(pt, dir, step=None):
+  step = step or CELLSIZE
   if dir == Up:      return (pt[0],                      max(1, pt[1] - step))
   elif dir == Left:  return (max(1, pt[0] - step),       pt[1])
   elif dir == Down:  return (pt[0],                      min(SIZE[1], pt[1] + step))
@@ -33,7 +38,7 @@ def rnd(x, tolerance=None, step=None):
   if not tolerance:
     return x
   else:
-    return random.randrange(x - tolerance, x + tolerance, step or 1)
+    return rng.randrange(x - tolerance, x + tolerance, step or 1)
 
 class Layer:
   def __init__(self, i):
@@ -45,7 +50,7 @@ class Layer:
     self.x_tolerance = (SIZE[0] // 2) - (i*40)
     self.y_tolerance = (SIZE[1] // 2) - (i*40)
     self.cellsize = CELLSIZE//i1
-    self.line_segments = random.randint(2, i1*2)
+    self.line_segments = rng.randint(2, i1*2)
     self.steps = STARTSTEPS*min(1, 10-i)
   @property
   def pen_color(self):
@@ -72,31 +77,54 @@ def draw_circles(dr):
   center_y = SIZE[1] // 2
   for step in range(STARTSTEPS):
     if 0 == step % CIRCLEDENSITY: continue
-    radius = random.randint(5, CIRCLERADIUS)
+    radius = rng.randint(5, CIRCLERADIUS)
     pt0 = (rnd(center_x, center_x - radius + 1),
            rnd(center_y, center_y - radius+ 1))
     pt1 = (pt0[0] + radius, pt0[1] + radius)
     pts = [pt0, pt1]
-    pen_color = list(random.choice(CIRCLECOLORS))
+    pen_color = list(rng.choice(CIRCLECOLORS))
     pen_color[2] = abs(rnd(pen_color[2], 10))
-    pen_color = 'hsl(%d,%d%%,%d%%)' % tuple(pen_color)
+    pen_color = hsl(*pen_color)
     dr.ellipse(pts, fill=pen_color)
 
 def draw_text(dr):
-  font = ImageFont.truetype(FONTNAME, FONTSIZE)
+  font = load_font(FONTNAME, FONTSIZE)
   txt_len = dr.textlength(TEXT, font=font)
   center_x = SIZE[0] // 2
   center_y = SIZE[1] // 2
   pt = (center_x - (txt_len//2), center_y - (FONTSIZE//2))
   dr.text(pt, TEXT, font=font, fill=TEXTCOLOR)
 
-im = Image.new("RGB", SIZE, IMGBG)
-dr = ImageDraw.Draw(im)
-draw_circles(dr)
-for l in range(LAYERS):
-  draw_lines(dr, Layer(l))
-draw_text(dr)
+def new_image(size=None):
+  'Blank picture, or its tile of `size` (see `genart.tile.tiles()`)'
+  return Image.new("RGB", size or SIZE, IMGBG)
 
-# Save result
-with open(OUT, 'wb') as f:
-  im.save(f, format='PNG')
\ No newline at end of file
+def stages():
+  'Layer stages of the picture, see `genart.layers`'
+  def circles(img, dr):
+    with rng.stream('circles'):
+      draw_circles(dr)
+  def lines(l):
+    def draw(img, dr):
+      with rng.stream('layer', l):
+        draw_lines(dr, Layer(l))
+    return Stage('lines%d' % l, ('SIZE', 'SEED', 'CELLSIZE', 'STARTSTEPS',
+                                 'PENCOLOR'), draw)
+  return ([Stage('circles', ('SIZE', 'SEED', 'STARTSTEPS', 'CIRCLERADIUS',
+                             'CIRCLEDENSITY', 'CIRCLECOLORS'), circles)] +
+          [lines(l) for l in range(LAYERS)] +
+          [Stage('text', ('SIZE', 'TEXT', 'TEXTCOLOR', 'FONTNAME', 'FONTSIZE'),
+                 lambda img, dr: draw_text(dr))])
+
+def draw(img, dr):
+  'Draws the picture on `img`, `dr` is its `ImageDraw.Draw`'
+  draw_stages(img, dr, stages())
+
+
+############################## draw ####################################
+if __name__ == '__main__':
+  rng.seed(SEED)
+  img = new_image()
+  draw(img, ImageDraw.Draw(img))
+  with open(OUT, 'wb') as f:
+    img.save(f, format='PNG', pnginfo=rng.pnginfo())
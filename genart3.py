@@ -1,14 +1,23 @@
 from PIL import Image, ImageDraw, ImageFont, ImageColor
 import random
 from math import *
+import numpy as np
+from genart.draw import PointBatch, scatter_points
+from genart.font import load_font
+from genart.geom import distance, cartesian_to_canvas
+from genart.rng import rng
+from genart.tile import raster
 
 OUT = 'genart3.png'
+SEED = None  # seed of random numbers, None - a random one
 IMGBG = (0, 0, 0)
 SIZE = (1200, 900)
-def ANOMALY1(x):
-  return (100*sin(x/10)/sqrt(x), (10, 100)) if x > 0 else None
-def ANOMALY2(x):
-  return (100*sin(-x/10)/sqrt(-x), (-10, 100)) if x < 0 else None
+# Anomaly: 0y displacement `dy` with center `off` where `when` is true. `dy`,
+# `when` must be array-friendly (numpy) to work with FASTLINES:
+ANOMALY1 = dict(dy=lambda x: 100*np.sin(x/10)/np.sqrt(x), off=(10, 100),
+                when=lambda x: x > 0)
+ANOMALY2 = dict(dy=lambda x: 100*np.sin(-x/10)/np.sqrt(-x), off=(-10, 100),
+                when=lambda x: x < 0)
 ANOMALIES = [ANOMALY1, ANOMALY2]
 ANOMALYCOLOR = '#ffffff'
 SENSITIVITY = 300
@@ -20,6 +29,7 @@ TEXTCOLOR = '#ffffff'
 FONTSIZE = 200
 FONTNAME = 'msyhbd.ttc'
 COMPOSITIONPADDING = (40, 40)
+FASTLINES = True  # draw lines over the whole grid at once (draw_lines_fast)
 
 #def rnd(x, tolerance=None, step=None):
 #  if not tolerance:
@@ -27,14 +37,15 @@ COMPOSITIONPADDING = (40, 40)
 #  else:
 #    return random.randrange(x - tolerance, x + tolerance, step or 1)
 
-def toaxis(pt):
-  return (pt[0] - (SIZE[0]//2), (SIZE[1]//2) - pt[1])
+def anomaly_at(anomaly, x):
+  '''Anomaly as (dy, offset) at `x` or None. Old style anomaly is a function
+  of `x` returning the same'''
+  if callable(anomaly):
+    return anomaly(x)
+  return (anomaly['dy'](x), anomaly['off']) if anomaly['when'](x) else None
 
-def fromaxis(x, y):
-  return (x + (SIZE[0]//2), (SIZE[1]//2) - y)
-
-def dist(pt1, pt2):
-  return int(sqrt(((pt2[0] - pt1[0])**2) + ((pt2[1] - pt1[1])**2)))
+def is_fast_anomaly(anomaly):
+  return isinstance(anomaly, dict)
 
 def draw_lines(dr):
   hstep = 1
@@ -47,9 +58,9 @@ def draw_lines(dr):
     for x in range(-domain, domain, hstep):
       for anom_i, anomaly in enumerate(ANOMALIES):
         y1 = y
-        if (anom := anomaly(x)):
+        if (anom := anomaly_at(anomaly, x)):
           anom_y, anom_off = anom
-          anom_dist = max(1, dist((x,y), anom_off))
+          anom_dist = max(1, int(distance((x,y), anom_off)))
           if anom_dist < SENSITIVITY:
             pen_color = ANOMALYCOLOR
             y1 = y + anom_y*(RING/anom_dist)
@@ -62,28 +73,82 @@ def draw_lines(dr):
       # select first 0y that is different than 0y w/o anomaly. If no one
       # then use any (default, the 0-th, eg.):
       (y1, pen_color) = next((p for p in ypts if p[0]!=y), ypts[0])
-      pt = fromaxis(x, y1)
+      pt = cartesian_to_canvas((x, y1), SIZE)
       dr.point(pt, fill=pen_color)
 
-def draw_text(dr, img):
-  background = Image.new("RGBA", img.size, (0, 0, 0))
+def draw_lines_fast(img):
+  '''The same as `draw_lines()`, but the anomalies are calculated over the
+  whole grid (rows are 0y, columns are 0x) at once'''
+  hstep = 1
+  vstep = LINEHEIGHT
+  padding = COMPOSITIONPADDING
+  domain = SIZE[0] - 2*padding[0]  # just half of domain actually
+  codomain = SIZE[1] - 2*padding[1]  # just half of codomain actually
+  xs = np.arange(-domain, domain, hstep)
+  ys = np.arange(-codomain, codomain, vstep)[:, None]
+  y_res = None  # resulting 0y-s of the grid
+  anom_res = None  # is resulting point an anomaly one (its color)
+  displaced = np.zeros((len(ys), len(xs)), dtype=bool)
+  for anomaly in ANOMALIES:
+    when = anomaly['when'](xs)
+    anom_y = np.zeros(len(xs))
+    anom_y[when] = anomaly['dy'](xs[when])
+    off_x, off_y = anomaly['off']
+    anom_dist = np.sqrt(((off_x - xs)**2) + ((off_y - ys)**2)).astype(int)
+    anom_dist = np.maximum(1, anom_dist)
+    is_anom = when & (anom_dist < SENSITIVITY)
+    y1 = np.where(is_anom, ys + anom_y*(RING/anom_dist), ys)
+    if y_res is None:
+      # default (if no one anomaly displaces 0y) is the 0-th one:
+      y_res, anom_res = y1, is_anom
+    # select first 0y that is different than 0y w/o anomaly:
+    first = ~displaced & (y1 != ys)
+    y_res = np.where(first, y1, y_res)
+    anom_res = np.where(first, is_anom, anom_res)
+    displaced |= first
+  ps = np.column_stack((np.broadcast_to(xs, y_res.shape).ravel(), y_res.ravel()))
+  ps = cartesian_to_canvas(ps, SIZE)
+  colors = np.array([ImageColor.getrgb(LINECOLOR),
+                     ImageColor.getrgb(ANOMALYCOLOR)], dtype=np.uint8)
+  scatter_points(img, ps, colors[anom_res.ravel().astype(int)])
+
+def draw_text(img, dr):
+  'Shades the picture except the text'
   mask = Image.new("RGBA", img.size, (0,0,0,123))
   draw = ImageDraw.Draw(mask)
-  font = ImageFont.truetype(FONTNAME, FONTSIZE)
+  font = load_font(FONTNAME, FONTSIZE)
   txt_len = dr.textlength(TEXT, font=font)
   center_x = SIZE[0] // 2
   bottom = SIZE[1] - COMPOSITIONPADDING[1] - 2*FONTSIZE  # under the padding
   pt = (center_x - (txt_len//2), bottom)
   draw.text(pt, TEXT, fill=TEXTCOLOR, font=font)
-  new_img = Image.composite(img, background, mask)
-  return new_img
+  raster(img, shade, mask)
+
+def shade(img, origin, mask):
+  'Keeps pixels of `img` where `mask` is opaque, the rest are shaded'
+  x, y = origin
+  mask = mask.crop((x, y, x + img.width, y + img.height))
+  background = Image.new("RGBA", img.size, (0, 0, 0))
+  img.paste(Image.composite(img, background, mask).convert("RGB"))
+
+def new_image(size=None):
+  'Blank picture, or its tile of `size` (see `genart.tile.tiles()`)'
+  return Image.new("RGB", size or SIZE, IMGBG)
+
+def draw(img, dr):
+  'Draws the picture on `img`, `dr` is its `ImageDraw.Draw`'
+  if FASTLINES and all(is_fast_anomaly(a) for a in ANOMALIES):
+    draw_lines_fast(img)
+  else:
+    with PointBatch(img, dr) as dr:
+      draw_lines(dr)
+  draw_text(img, dr)
 
 
 ############################## draw ####################################
-img = Image.new("RGB", SIZE, IMGBG)
-dr = ImageDraw.Draw(img)
-draw_lines(dr)
-img = draw_text(dr, img)
-# Save result
-with open(OUT, 'wb') as f:
-  img.save(f, format='PNG')
\ No newline at end of file
+if __name__ == '__main__':
+  rng.seed(SEED)
+  img = new_image()
+  draw(img, ImageDraw.Draw(img))
+  with open(OUT, 'wb') as f:
+    img.save(f, format='PNG', pnginfo=rng.pnginfo())
@@ -1,8 +1,12 @@
 from PIL import Image, ImageDraw, ImageFont, ImageColor
-import random
 from math import *
+import numpy as np
+from genart.color import hsl_array
+from genart.geom import distance
+from genart.rng import rng
 
 OUT = 'genart4.png'
+SEED = None  # seed of random numbers, None - a random one
 IMGBG = (0, 0, 0)
 SIZE = (900, 900)
 CELLSIDE = 25
@@ -12,22 +16,17 @@ CELLCOLORMAXLIGHT = 80  # maximal value of L (%) in HSL
 
 LeftTilt, RightTilt = range(2)
 
-assert SIZE[0]==SIZE[1], 'This artwork must be square'
+def init():
+  'Checks constants and calculates derived globals, call it after changing them'
+  assert SIZE[0]==SIZE[1], 'This artwork must be square'
+
+init()
 
 def rnd(x, tolerance=None, step=None):
   if not tolerance:
     return x
   else:
-    return random.randrange(x - tolerance, x + tolerance, step or 1)
-
-def toaxis(pt):
-  return (pt[0] - (SIZE[0]//2), (SIZE[1]//2) - pt[1])
-
-def fromaxis(x, y):
-  return (x + (SIZE[0]//2), (SIZE[1]//2) - y)
-
-def dist(pt1, pt2):
-  return int(sqrt(((pt2[0] - pt1[0])**2) + ((pt2[1] - pt1[1])**2)))
+    return rng.randrange(x - tolerance, x + tolerance, step or 1)
 
 def draw_rhomb(dr, col, row, tilt, color):
   'Tilt is a float <, > 0 (left, right tilt) and is < 1.0 - a part of CELLSIDE'
@@ -63,28 +62,36 @@ def draw_rhombs(dr):
   center_y = SIZE[1] / 2
   # XXX better not diagonal for the full scale, but just width/2:
   diag_len = center_y #*sqrt(2.)
-  for row in range(ncols+1):
-    for col in range(nrows+1):
-      pt = ((col*CELLSIDE) + (CELLSIDE/2),
-            (row*CELLSIDE) + (CELLSIDE/2))
-      center_dist = dist((center_x,center_y), pt)
-      # center_dist        x
-      # ----------- = ----------  => x = (center_dist * drange_len) / diag_len
-      #   diag_len    drange_len
-      d = (center_dist * drange_len) / diag_len
-      d = min(max(DRANGE), d)
-      cl = list(CELLCOLOR)
-      cl[2] = (abs(center_y - center_dist) * 100) / diag_len
-      cl[2] = max(CELLCOLORMINLIGHT, cl[2])
-      cl[2] = min(CELLCOLORMAXLIGHT, cl[2])
-      cl = 'hsl(%d,%d%%,%d%%)' % tuple(cl)
-      draw_rhomb(dr, col, row, -d, cl)
+  rows, cols = np.mgrid[0:ncols+1, 0:nrows+1].reshape(2, -1)
+  pts = np.column_stack(((cols*CELLSIDE) + (CELLSIDE/2),
+                         (rows*CELLSIDE) + (CELLSIDE/2)))
+  # all cells at once, the same formulas:
+  center_dist = np.trunc(distance((center_x,center_y), pts))
+  # center_dist        x
+  # ----------- = ----------  => x = (center_dist * drange_len) / diag_len
+  #   diag_len    drange_len
+  ds = (center_dist * drange_len) / diag_len
+  ds = np.minimum(max(DRANGE), ds)
+  ls = (abs(center_y - center_dist) * 100) / diag_len
+  ls = np.clip(ls, CELLCOLORMINLIGHT, CELLCOLORMAXLIGHT)
+  cls = hsl_array(CELLCOLOR[0], CELLCOLOR[1], ls)
+  for row, col, d, cl in zip(rows.tolist(), cols.tolist(), ds.tolist(),
+                             map(tuple, cls.tolist())):
+    draw_rhomb(dr, col, row, -d, cl)
+
+def new_image(size=None):
+  'Blank picture, or its tile of `size` (see `genart.tile.tiles()`)'
+  return Image.new("RGB", size or SIZE, IMGBG)
+
+def draw(img, dr):
+  'Draws the picture on `img`, `dr` is its `ImageDraw.Draw`'
+  draw_rhombs(dr)
 
 
 ############################## draw ####################################
-img = Image.new("RGB", SIZE, IMGBG)
-dr = ImageDraw.Draw(img)
-draw_rhombs(dr)
-# Save result
-with open(OUT, 'wb') as f:
-  img.save(f, format='PNG')
\ No newline at end of file
+if __name__ == '__main__':
+  rng.seed(SEED)
+  img = new_image()
+  draw(img, ImageDraw.Draw(img))
+  with open(OUT, 'wb') as f:
+    img.save(f, format='PNG', pnginfo=rng.pnginfo())
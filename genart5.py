@@ -1,8 +1,10 @@
 from PIL import Image, ImageDraw, ImageFont, ImageColor
-import random
 from math import *
+from genart.color import hsl
+from genart.rng import rng
 
 OUT = 'genart5.png'
+SEED = None  # seed of random numbers, None - a random one
 IMGBG = (0, 0, 0)
 SIZE = (1200, 840)
 CUBELONGDIAG = 120
@@ -15,22 +17,17 @@ CUBETOPFACECOLOR = [223, 75, 50]  # HSL
 CUBERIGHTFACECOLOR = [223, 75, 35]  # HSL
 RANDOMCOLOR = True
 
-assert CUBESHORTDIAG < CUBELONGDIAG, 'Short diagonal must be really shorter'
+def init():
+  'Checks constants and calculates derived globals, call it after changing them'
+  assert CUBESHORTDIAG < CUBELONGDIAG, 'Short diagonal must be really shorter'
+
+init()
 
 def rnd(x, tolerance=None, step=None):
   if not tolerance:
     return x
   else:
-    return random.randrange(x - tolerance, x + tolerance, step or 1)
-
-def toaxis(pt):
-  return (pt[0] - (SIZE[0]//2), (SIZE[1]//2) - pt[1])
-
-def fromaxis(x, y):
-  return (x + (SIZE[0]//2), (SIZE[1]//2) - y)
-
-def dist(pt1, pt2):
-  return int(sqrt(((pt2[0] - pt1[0])**2) + ((pt2[1] - pt1[1])**2)))
+    return rng.randrange(x - tolerance, x + tolerance, step or 1)
 
 def aspt(pt, *, x=None, y=None, rx=None, ry=None):
   l = list(pt)
@@ -72,11 +69,12 @@ def draw_cube(dr, p0):
   tfc = CUBETOPFACECOLOR[:]
   rfc = CUBERIGHTFACECOLOR[:]
   if RANDOMCOLOR:
-    rndc = random.randint(20, 355)
+    with rng.stream('cube', *p0):
+      rndc = rng.randint(20, 355)
     lfc[0] = tfc[0] = rfc[0] = rndc
-  lfc = 'hsl(%d,%d%%,%d%%)' % tuple(lfc)
-  tfc = 'hsl(%d,%d%%,%d%%)' % tuple(tfc)
-  rfc = 'hsl(%d,%d%%,%d%%)' % tuple(rfc)
+  lfc = hsl(*lfc)
+  tfc = hsl(*tfc)
+  rfc = hsl(*rfc)
   dr.polygon([p[0],p[1],p[2],p[5],p[0]], fill=lfc,
              outline=LINECOLOR, width=LINEWIDTH)
   dr.polygon([p[5],p[2],p[3],p[4],p[5]], fill=tfc,
@@ -130,14 +128,22 @@ def draw_cubes(dr, c0p0):
       p0rb = aspt(p0rb, x=start_x, ry=vstep)
       flip_sign *= (-1)
 
+def new_image(size=None):
+  'Blank picture, or its tile of `size` (see `genart.tile.tiles()`)'
+  return Image.new("RGB", size or SIZE, IMGBG)
+
+def draw(img, dr):
+  'Draws the picture on `img`, `dr` is its `ImageDraw.Draw`'
+  center_x = SIZE[0] // 2
+  center_y = SIZE[1] // 2
+  center = (center_x, center_y)
+  draw_cubes(dr, center)
 
-############################## draw ####################################
-img = Image.new("RGB", SIZE, IMGBG)
-dr = ImageDraw.Draw(img)
-center_x = SIZE[0] // 2
-center_y = SIZE[1] // 2
-center = (center_x, center_y)
-draw_cubes(dr, center)
 
-with open(OUT, 'wb') as f:
-  img.save(f, format='PNG')
\ No newline at end of file
+############################## draw ####################################
+if __name__ == '__main__':
+  rng.seed(SEED)
+  img = new_image()
+  draw(img, ImageDraw.Draw(img))
+  with open(OUT, 'wb') as f:
+    img.save(f, format='PNG', pnginfo=rng.pnginfo())
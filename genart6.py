@@ -1,9 +1,12 @@
 from PIL import Image, ImageDraw, ImageFont, ImageColor
-import random
 from math import *
+import numpy as np
+from genart.color import hsl
+from genart.rng import rng
 
 
 OUT = 'genart6.png'
+SEED = None  # seed of random numbers, None - a random one
 IMGBG = (0, 0, 0)
 SIZE = (1200, 900)
 RADIUS = 450
@@ -11,78 +14,88 @@ STICKS = 1800
 ANGLERANGE = radians(0.5)
 STICKCOLOR = [24,100,36]  # HSL
 SEGMENTLEN = 5  # length of a color segment in pixels
+STICKCHUNK = 1000  # sticks whose segments are calculated at once
 
 
-center = (SIZE[0] // 2, SIZE[1] // 2)
-radius_segments = RADIUS//SEGMENTLEN
-light_step = 5*(STICKCOLOR[2] / radius_segments)
+def init():
+  'Checks constants and calculates derived globals, call it after changing them'
+  global center, radius_segments, light_step, Ramp
+  center = (SIZE[0] // 2, SIZE[1] // 2)
+  radius_segments = RADIUS//SEGMENTLEN
+  light_step = 5*(STICKCOLOR[2] / radius_segments)
+  # colors of segments of the longest stick, from its tip:
+  Ramp = segment_colors(len(range(RADIUS, 1, -SEGMENTLEN)))
 
 def rnd(x, tolerance=None, step=None):
   if not tolerance:
     return x
   else:
-    return random.randrange(x - tolerance, x + tolerance, step or 1)
+    return rng.randrange(x - tolerance, x + tolerance, step or 1)
 
-def toaxis(pt):
-  return (pt[0] - (SIZE[0]//2), (SIZE[1]//2) - pt[1])
-
-def fromaxis(x, y):
-  return (x + (SIZE[0]//2), (SIZE[1]//2) - y)
-
-def dist(pt1, pt2):
-  return int(sqrt(((pt2[0] - pt1[0])**2) + ((pt2[1] - pt1[1])**2)))
-
-def det_line(p1, p2):
-  '''Determines the equation on 2 points as (k,b). If it is a vertical line,
-  return (float('inf'), x)'''
-  x1,y1 = p1; x2,y2 = p2
-  if x1 != x2:
-    k = (y1 - y2) / (x1 - x2)
-    b = y2 - k*x2
-  else:
-    k = inf
-    b = x1
-  return (k, b)
-
-def pol2dec(pp):
-  'Converts polar coordinates (angle, radius) to Descartes (x,y)'
-  ang, rad = pp
-  x = rad * cos(ang)
-  y = rad * sin(ang)
-  #print('ang=%.2f rad=%d x=%d y=%d cos=%.2f sin=%.2f' % (ang,rad,x,y,cos(ang),sin(ang)))
-  return fromaxis(x, y)
-
-def draw_segment(dr, pp0, seg_color):
-  mid_ang, tip_rad = pp0
-  angs = [mid_ang + ANGLERANGE, mid_ang - ANGLERANGE]
-  rads = [tip_rad, tip_rad - SEGMENTLEN]
-  pps = [(angs[0], rads[0]), (angs[1],rads[0]),(angs[1],rads[1]),(angs[0],rads[1]),
-         (angs[0], rads[0])]
-  dps = [pol2dec(pp) for pp in pps]
-  color = 'hsl(%d,%d%%,%d%%)' % seg_color
-  dr.polygon(dps, fill=color, outline=color)
-
-def draw_stick(dr, pp0):
-  mid_ang, tip_rad = pp0
+def segment_colors(n):
+  '''Colors of `n` segments of a stick from its tip to the center: hue and
+  lightness decrease along it'''
   seg_color = STICKCOLOR[:]
-  for r in range(tip_rad, 1, -SEGMENTLEN):
+  colors = []
+  for _ in range(n):
     seg_color[0] = max(0, seg_color[0] - 4)
-    segment_color = tuple(seg_color)
-    draw_segment(dr, (mid_ang,r), tuple(seg_color))
+    colors.append(hsl(*seg_color))
     seg_color[2] = max(0, seg_color[2] - light_step)
+  return colors
+
+init()
+
+def stick_segments(sticks):
+  '''Segments of `sticks` (array of `(mid_ang, tip_rad)` pairs) from their tips
+  to the center, in the order of sticks. Returns quads as array of shape
+  (N, 5, 2) (canvas coords, closed) and indexes of segments in their sticks
+  (of `Ramp`):
+
+     tip_rad ._____.
+             |_____|  <- segment 0 (SEGMENTLEN long)
+             |_____|  <- segment 1
+             :     :
+           mid_ang +- ANGLERANGE
+  '''
+  mid_ang, tip_rad = sticks[:, 0], sticks[:, 1]
+  counts = np.maximum(0, np.ceil((tip_rad - 1) / SEGMENTLEN)).astype(int)
+  si = np.repeat(np.arange(len(sticks)), counts)  # stick of every segment
+  js = np.arange(len(si)) - (np.cumsum(counts) - counts)[si]
+  rad = tip_rad[si] - js * SEGMENTLEN
+  ang0 = mid_ang[si] + ANGLERANGE
+  ang1 = mid_ang[si] - ANGLERANGE
+  angs = np.column_stack((ang0, ang1, ang1, ang0, ang0))
+  rads = np.column_stack((rad, rad, rad - SEGMENTLEN, rad - SEGMENTLEN, rad))
+  xs = rads * np.cos(angs) + center[0]
+  ys = center[1] - rads * np.sin(angs)
+  return np.stack((xs, ys), axis=-1), js
 
 def draw_sticks(dr):
-  for s in range(STICKS):
-    mid_ang = random.random() * tau
-    rad = random.randint(1, RADIUS)
-    draw_stick(dr, (mid_ang,rad))
-  pass
+  for s0 in range(0, STICKS, STICKCHUNK):
+    sticks = []
+    for s in range(s0, min(s0 + STICKCHUNK, STICKS)):
+      with rng.stream('stick', s):
+        mid_ang = rng.random() * tau
+        rad = rng.randint(1, RADIUS)
+      sticks.append((mid_ang, rad))
+    quads, js = stick_segments(np.array(sticks, dtype=float).reshape(-1, 2))
+    for quad, j in zip(quads.reshape(len(quads), -1).tolist(), js.tolist()):
+      # the outline of the same color is the filled polygon itself
+      dr.polygon(quad, fill=Ramp[j])
+
+def new_image(size=None):
+  'Blank picture, or its tile of `size` (see `genart.tile.tiles()`)'
+  return Image.new("RGB", size or SIZE, IMGBG)
+
+def draw(img, dr):
+  'Draws the picture on `img`, `dr` is its `ImageDraw.Draw`'
+  draw_sticks(dr)
 
 
 ############################## draw ####################################
-img = Image.new("RGB", SIZE, IMGBG)
-dr = ImageDraw.Draw(img)
-draw_sticks(dr)
-
-with open(OUT, 'wb') as f:
-  img.save(f, format='PNG')
\ No newline at end of file
+if __name__ == '__main__':
+  rng.seed(SEED)
+  img = new_image()
+  draw(img, ImageDraw.Draw(img))
+  with open(OUT, 'wb') as f:
+    img.save(f, format='PNG', pnginfo=rng.pnginfo())
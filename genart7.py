@@ -1,10 +1,18 @@
 from PIL import Image, ImageDraw, ImageFont, ImageColor
-import random
 import itertools
-import math
+import numpy as np
+from genart.canvas import span_pixels
+from genart.color import hsv, hsv_array
+from genart.draw import fill_spans
+from genart.geom import (bound_box, canvas_to_cartesian, cartesian_to_canvas,
+                         determine_line)
+from genart.preview import scaled
+from genart.rng import rng
+from genart.tile import raster
 
 
 OUT = 'genart7.png'
+SEED = None  # seed of random numbers, None - a random one
 IMGBG = (20, 40, 50)
 SIZE = (1200, 900)
 AVERAGECELL = 400
@@ -21,71 +29,22 @@ COLORS = [[203,0,90], [203,63,60], [263,1,37]]
 LINECOLOR = '#050505'
 
 
-Center = (SIZE[0] // 2, SIZE[1] // 2)
-NoPxl, DarkPxl = 0, 1
-Lighting = [[NoPxl for y in range(SIZE[1])] for x in range(SIZE[0])] # Shadows
+NoPxl, DarkPxl = 0, 255
+
+def init():
+  'Checks constants and calculates derived globals, call it after changing them'
+  global Center, Lighting
+  Center = (SIZE[0] // 2, SIZE[1] // 2)
+  # Shadows: 8-bit mask, indexed as [y, x] (it's the mask of `draw_lighting()`)
+  Lighting = np.full((SIZE[1], SIZE[0]), NoPxl, dtype=np.uint8)
+
+init()
 
 def rnd(x, tolerance=None, step=None):
   if not tolerance:
     return x
   else:
-    return random.randrange(x - tolerance, x + tolerance, step or 1)
-
-def to_axis(pt):
-  return (pt[0] - (SIZE[0]//2), (SIZE[1]//2) - pt[1])
-
-def from_axis(pt):
-  return (pt[0] + (SIZE[0]//2), (SIZE[1]//2) - pt[1])
-
-def is_segment_point(seg, x):
-  x1, x2 = seg
-  if x1 <= x <= x2: return True
-  elif x2 <= x <= x1: return True
-  else: return False
-
-def distance(pt1, pt2):
-  return int(math.sqrt(((pt2[0] - pt1[0])**2) + ((pt2[1] - pt1[1])**2)))
-
-def determine_line(p1, p2):
-  'Determines the equation on 2 points'
-  x1,y1 = p1; x2,y2 = p2
-  if x1 != x2:
-    k = (y1 - y2) / (x1 - x2)
-    b = y2 - k*x2
-    return dict(k=k, b=b, domain=(x1,x2), codomain=(y1,y2))
-  else:
-    return dict(k=math.inf, b=None, domain=(x1,x2), codomain=(y1,y2))
-
-def line_y(line, x):
-  '''Take line as a dict, see `determine_line()` and `x` and returns line's `[y]`
-  which length is one or more (when line is vertical) or zero (when line is
-  vertical and `x` is out of domain)
-  '''
-  if line['k'] == math.inf:
-    if is_segment_point(line['domain'], x):
-      y0, y1 = sorted(line['codomain'])
-      return list(range(y0, y1+1))
-    else: return []
-  else:
-    if is_segment_point(line['domain'], x):
-      return [int(line['k']*x + line['b'])]
-    else: return []
-
-def bound_box(ps):
-  'Bound box from list of points'
-  x0 = x1 = y0 = y1 = None
-  for p in ps:
-    if x0 is None:
-      x0 = p[0]
-      x1 = p[0]
-      y0 = p[1]
-      y1 = p[1]
-    else:
-      if p[0] < x0: x0 = p[0]
-      elif p[0] > x1: x1 = p[0]
-      if p[1] < y0: y0 = p[1]
-      elif p[1] > y1: y1 = p[1]
-  return [(x0,y0), (x1,y1)]
+    return rng.randrange(x - tolerance, x + tolerance, step or 1)
 
 def cell_segments(cell):
   'All segments of cell consisting of 3, 4 points'
@@ -99,6 +58,24 @@ def cell_segments(cell):
     opts = [seg for seg in opts if is_horiz_seg(*seg) or is_vert_seg(*seg)]
     return opts
 
+def generate_cell(layer, aver_cell):
+  'Generates one cell (list of 3 or 4 points) of `layer`'
+  mid_x = rng.randint(1, SIZE[0] - 1)
+  mid_y = rng.randint(1, SIZE[1] - 1)
+  w = rnd(aver_cell//layer, CELLSIZETOLERANCE, step=5)
+  h = rnd(aver_cell//layer, CELLSIZETOLERANCE, step=5)
+  lt = (0, mid_x - w//2, mid_y - h//2)
+  rt = (1, mid_x + w//2, mid_y - h//2)
+  rb = (2, mid_x + w//2, mid_y + h//2)
+  lb = (3, mid_x - w//2, mid_y + h//2)
+  opts = [lt, rt, rb, lb]
+  pts = []
+  for ntries in range(rng.choice((3,4))):  # triangles or rectangles
+    pt = rng.choice(opts)
+    pts.append(pt)
+    opts.remove(pt)
+  return [p[1:] for p in sorted(pts, key=lambda p: p[0])]
+
 def generate_cells():
   '''Generates cells as a list of points lists (point-tuple `(x,y)`).
   Points-list can have 3 or 4 elements.'''
@@ -107,65 +84,71 @@ def generate_cells():
   aver_cell = AVERAGECELL
   for i in range(CELLS):
     layer = 1 + (i // layer_cells)
-    mid_x = random.randint(1, SIZE[0] - 1)
-    mid_y = random.randint(1, SIZE[1] - 1)
-    w = rnd(aver_cell//layer, CELLSIZETOLERANCE, step=5)
-    h = rnd(aver_cell//layer, CELLSIZETOLERANCE, step=5)
-    lt = (0, mid_x - w//2, mid_y - h//2)
-    rt = (1, mid_x + w//2, mid_y - h//2)
-    rb = (2, mid_x + w//2, mid_y + h//2)
-    lb = (3, mid_x - w//2, mid_y + h//2)
-    opts = [lt, rt, rb, lb]
-    pts = []
-    for ntries in range(random.choice((3,4))):  # triangles or rectangles
-      pt = random.choice(opts)
-      pts.append(pt)
-      opts.remove(pt)
-    cells.append([p[1:] for p in sorted(pts, key=lambda p: p[0])])
+    with rng.stream('cell', i):
+      cells.append(generate_cell(layer, aver_cell))
   return cells
 
 #def debug1(dr, cells, color=[100,200,300]):
 #  for cell in cells:
 #    if color:
-#      color[0] = random.randint(20,255)
-#      color[1] = random.randint(20,255)
+#      color[0] = rng.randint(20,255)
+#      color[1] = rng.randint(20,255)
 #      dr.polygon([p for p in cell], fill=tuple(color))
 #    else:
 #      dr.polygon([p for p in cell])
 
-def draw_vert_line(dr_or_light, x, y0, y1, *, line_num=0, del_shadow=False,
-                   base_color='white'):
-  if not (0 < x < SIZE[0]):
-    return
-  y0 = max(0, min(SIZE[1] - 1, y0))
-  y1 = max(0, min(SIZE[1] - 1, y1))
-  if y0 > y1:
-    y0, y1 = y1, y0
-  if dr_or_light is Lighting:
-    for y in range(y0, y1 + 1):
-      Lighting[x][y] = int(not del_shadow)
-  else:
-    for y in range(y0, y1 + 1):
-      color = vert_gradient_point(base_color, x, y, y0, noise=True,
-                                  global_gradient=True)
-      color = 'hsv(%d,%d%%,%d%%)' % color
-      dr.point((x,y), fill=color)
-
-def vert_gradient_point(base_color, x, y, y0, *, noise=True,
-                        global_gradient=False):
-  '''Returns HSV-color from `base_color` (HSV too), generating noise and adding
+def cell_spans(cell, shrink=0):
+  '''Edge table of `cell` (3 or 4 points, cartesian coords): vertical spans of
+  its face as arrays `xs`, `y0s`, `y1s` - the lowest and the highest points of
+  its sides on columns `xs` (columns of the bound box narrowed by `shrink`
+  from both sides, ones without sides are skipped)
+  '''
+  (x0, _), (x1, _) = bound_box(cell)
+  xs = np.arange(x0 + shrink, x1 + 1 - shrink)
+  segs = cell_segments(cell)
+  lines = determine_line([seg[0] for seg in segs], [seg[1] for seg in segs])
+  domain = np.sort(lines['domain'], axis=1)
+  codomain = np.sort(lines['codomain'], axis=1)
+  # [side, column]: is the column in the domain of the side, y of the side:
+  on = (domain[:, :1] <= xs) & (xs <= domain[:, 1:])
+  vert = np.isinf(lines['k'])[:, np.newaxis]
+  with np.errstate(invalid='ignore'):
+    ys = np.trunc(lines['k'][:, np.newaxis] * xs + lines['b'][:, np.newaxis])
+  y0s = np.where(on, np.where(vert, codomain[:, :1], ys), np.inf).min(axis=0)
+  y1s = np.where(on, np.where(vert, codomain[:, 1:], ys), -np.inf).max(axis=0)
+  has = on.any(axis=0)
+  return xs[has], y0s[has].astype(int), y1s[has].astype(int)
+
+def vert_spans(xs, y0s, y1s):
+  '''Vertical spans (columns `xs`, rows from `y0s` to `y1s` in any order,
+  canvas coords) clipped by the canvas: arrays `xs`, `y0s`, `y1s`, where
+  `y0s` <= `y1s`'''
+  inside = (0 < xs) & (xs < SIZE[0])
+  y0s = np.clip(y0s[inside], 0, SIZE[1] - 1)
+  y1s = np.clip(y1s[inside], 0, SIZE[1] - 1)
+  return xs[inside], np.minimum(y0s, y1s), np.maximum(y0s, y1s)
+
+def vert_gradient(base_color, ys, y0s, *, noise=True, global_gradient=False):
+  '''HSV-colors (arrays of components) from `base_color` (HSV too) of pixels at
+  rows `ys` of spans starting at rows `y0s`, generating noise and adding
   global gradient'''
-  color = list(base_color)
-  if noise:
-    color[1] = rnd(color[1], NOISELEVEL)
-    color[2] = rnd(color[2], NOISELEVEL)
-  local_y_dist = y - y0
-  global_y_dist = y
-  color[2] -= ((local_y_dist * SHADOWSTEP) +
-               ((global_y_dist * GLOBALSHADOWSTEP) if global_gradient else 0))
-  color[1] = max(0, min(100, color[1]))
-  color[2] = max(0, min(100, color[2]))
-  return tuple(color)
+  h, s, v = base_color
+  s = np.full(len(ys), s)
+  v = np.full(len(ys), v)
+  if noise and NOISELEVEL:
+    jitter = rng.generator().integers(-NOISELEVEL, NOISELEVEL, (2, len(ys)))
+    s = s + jitter[0]
+    v = v + jitter[1]
+  local_y_dist = ys - y0s
+  global_y_dist = ys
+  v = v - ((local_y_dist * SHADOWSTEP) +
+           ((global_y_dist * GLOBALSHADOWSTEP) if global_gradient else 0))
+  return h, np.clip(s, 0, 100), np.clip(v, 0, 100)
+
+def mark_spans(xs, y0s, y1s, value):
+  'Sets pixels of `Lighting` on vertical spans (see `vert_spans()`) to `value`'
+  px, py, _ = span_pixels(xs, y0s, y1s)
+  Lighting[py, px] = value
 
 def find_top_line(segs):
   'Finds top horizontal line of the cell segments (axis coord are used)'
@@ -173,63 +156,88 @@ def find_top_line(segs):
   horiz = [seg for seg in segs if seg[0][1] == seg[1][1] and seg[0][1] == top_y]
   return horiz[0] if horiz else None
 
-def draw_cells(dr, cells):
+def draw_cell(img, dr, cnv_cell):
+  '''Draws one cell (canvas coords) with its shadow in `Lighting`: the face is
+  filled by vertical spans with gradient and noise at once'''
   # Due to different algorithms of line drawing (I paint solid cells face by
   # vertical lines that forms sides of triangles too, but PIL draws sides -
   # the outline in a different way, so I get solid face outside outline by
   # 1-2 pixels, so I do this fix for 0x, 0y with +/- fix_outline pixel):
   fix_outline = 2
-  for cnv_cell in cells:  # cnv_cell: canvas coord cells
-    base_color = list(random.choice(COLORS))
-    cell = [to_axis(p) for p in cnv_cell]
-    bbox = bound_box(cell)
-    segs = cell_segments(cell)
-    lines = [determine_line(*seg) for seg in segs]
-    xrng = sorted([bbox[0][0], bbox[1][0] + 1])
-    xrng[0] += fix_outline
-    xrng[1] -= fix_outline
-    for line_num, x in enumerate(range(*xrng)):
-      ys = sum((line_y(line, x) for line in lines), [])  # flatten
-      if ys:
-        y0 = min(ys)
-        y1 = max(ys)
-        ps = [from_axis(p) for p in [(x,y0), (x,y1)]]
-        shad_ps = [(p[0] + SHADOWOFFSET[0], p[1] + SHADOWOFFSET[1]) for p in ps]
-        draw_vert_line(dr, ps[0][0], # 0x is the same (cos vertical)
-                       # y0 is min, y1 is max so why min-fix, max+fix and not
-                       # min+fix, max-fix? BCS min,max are on axis, not on
-                       # canvas! On canvas they are swapped:
-                       ps[0][1] - fix_outline, ps[1][1] + fix_outline,
-                       line_num=line_num, base_color=base_color)
-        draw_vert_line(Lighting, shad_ps[0][0], shad_ps[0][1], shad_ps[1][1])
-        draw_vert_line(Lighting, ps[0][0], ps[0][1], ps[1][1], del_shadow=True)
-    top_line = find_top_line(segs)
-    if top_line:
-      color = base_color[:]
-      color[2] += 7  # light top line
-      color[2] = min(100, color[2])
-      color = 'hsv(%d,%d%%,%d%%)' % tuple(color)
-      top_line = ((p[0] + 5 if i==0 else p[0] - 5, p[1] - 3)
-                  for i, p in enumerate(top_line))
-      top_pts = [from_axis(p) for p in top_line]
-      dr.line(top_pts, fill=color, width=2)
-    dr.polygon(cnv_cell, outline=LINECOLOR, width=2)
+  base_color = list(rng.choice(COLORS))
+  cell = [canvas_to_cartesian(p, SIZE) for p in cnv_cell]
+  segs = cell_segments(cell)
+  xs, y0s, y1s = cell_spans(cell, fix_outline)
+  # y0 is min, y1 is max on axis, on canvas they are swapped (bottom, top):
+  xs, bottoms = cartesian_to_canvas(np.column_stack((xs, y0s)), SIZE).T
+  tops = cartesian_to_canvas(np.column_stack((xs, y1s)), SIZE)[:, 1]
+  face = vert_spans(xs, bottoms - fix_outline, tops + fix_outline)
+  _, py, si = span_pixels(*face)
+  color = vert_gradient(base_color, py, face[1][si], noise=True,
+                        global_gradient=True)
+  fill_spans(img, *face, hsv_array(*color))
+  shadow = (vert_spans(xs + SHADOWOFFSET[0], bottoms + SHADOWOFFSET[1],
+                       tops + SHADOWOFFSET[1]), DarkPxl)
+  light = (vert_spans(xs, bottoms, tops), NoPxl)
+  # columns go from left to right: the face removes a shadow cast by columns
+  # on the left of it, but not by ones on the right
+  for spans, value in ((shadow, light) if SHADOWOFFSET[0] >= 0 else
+                       (light, shadow)):
+    mark_spans(*spans, value)
+  top_line = find_top_line(segs)
+  if top_line:
+    color = base_color[:]
+    color[2] += 7  # light top line
+    color[2] = min(100, color[2])
+    color = hsv(*color)
+    top_line = ((p[0] + 5 if i==0 else p[0] - 5, p[1] - 3)
+                for i, p in enumerate(top_line))
+    top_pts = [cartesian_to_canvas(p, SIZE) for p in top_line]
+    dr.line(top_pts, fill=color, width=2)
+  dr.polygon(cnv_cell, outline=LINECOLOR, width=2)
+
+def draw_cells(img, dr, cells):
+  for i, cnv_cell in enumerate(cells):  # cnv_cell: canvas coord cells
+    with rng.stream('face', i):
+      draw_cell(img, dr, cnv_cell)
 
 def draw_lighting(img):
-  for y in range(SIZE[1]):
-    for x in range(SIZE[0]):
-      if Lighting[x][y] == DarkPxl:
-        rgb = img.getpixel((x,y))
-        rgb = (rgb[0] - SHADOWDEPTH, rgb[1] - SHADOWDEPTH, rgb[2] - SHADOWDEPTH)
-        img.putpixel((x,y), rgb)
+  'Darkens (by SHADOWDEPTH) pixels of `img` which are marked in `Lighting`'
+  raster(img, darken, Lighting)
+
+def darken(img, origin, mask):
+  'Darkens (by SHADOWDEPTH) pixels of `img` which are marked in `mask` array'
+  x, y = origin
+  mask = Image.fromarray(mask[y:y + img.height, x:x + img.width])
+  dark = img.point(lambda c: max(0, c - SHADOWDEPTH))
+  img.paste(Image.composite(dark, img, mask))
+
+def new_image(size=None):
+  'Blank picture, or its tile of `size` (see `genart.tile.tiles()`)'
+  return Image.new("RGB", size or SIZE, IMGBG)
+
+def preview(scale):
+  '''Parameters of the preview at `scale` (see `genart.preview`): cells are
+  smaller, so their faces are of fewer points, gradients are steeper'''
+  return {'SIZE': scaled(SIZE, scale),
+          'AVERAGECELL': scaled(AVERAGECELL, scale),
+          'CELLSIZETOLERANCE': scaled(CELLSIZETOLERANCE, scale),
+          'SHADOWOFFSET': scaled(SHADOWOFFSET, scale),
+          'SHADOWSTEP': SHADOWSTEP / scale,
+          'GLOBALSHADOWSTEP': GLOBALSHADOWSTEP / scale}
+
+def draw(img, dr):
+  'Draws the picture on `img`, `dr` is its `ImageDraw.Draw`'
+  Lighting.fill(NoPxl)  # shadows of the previous picture
+  cells = generate_cells()
+  draw_cells(img, dr, cells)
+  draw_lighting(img)
 
 
 ############################## draw ####################################
-img = Image.new("RGB", SIZE, IMGBG)
-dr = ImageDraw.Draw(img)
-cells = generate_cells()
-draw_cells(dr, cells)
-draw_lighting(img)
-
-with open(OUT, 'wb') as f:
-  img.save(f, format='PNG')
\ No newline at end of file
+if __name__ == '__main__':
+  rng.seed(SEED)
+  img = new_image()
+  draw(img, ImageDraw.Draw(img))
+  with open(OUT, 'wb') as f:
+    img.save(f, format='PNG', pnginfo=rng.pnginfo())
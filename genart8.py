@@ -1,9 +1,19 @@
 from PIL import Image, ImageDraw
-import random
+import functools
 import math
+import numpy as np
+from genart.color import hsv
+from genart.draw import draw_lines
+from genart.geom import (canvas_to_cartesian, cartesian_to_canvas, is_outside,
+                         polar_pairs, polar_to_cartesian)
+from genart.rng import rng
+from genart.preview import scaled
+from genart.stamp import StampCache
+from genart.util import seq
 
 
 OUT = 'genart8.png'
+SEED = None  # seed of random numbers, None - a random one
 IMGBG = (18, 55, 15)  # HSV
 SIZE = (1200, 900)
 RADIUS = 80  # 50 allows to check correctness covering of the canvas
@@ -13,41 +23,30 @@ FLARECOLOR = (26,0,90)  # HSV
 FLARESHORTERON = 10  # degrees: how flare is shorter from left/right edges
 PINCONTRAST = 20  # value,% in HSV how lighter pin is than the IMGBG
 RINGWIDTH = 15
-SHADOWBAND = 15
+SHADOWBAND = 15  # lines (1/SMOOTH degree) of shadows at ends of rims
 SHADOWCONTRAST = 30  # value,% in HSV of the rim darkest shadow
 IMGTILT = 70  # degrees
+SMOOTH = 5  # angle accuracy: lines of rims per degree
+# draw stars with pins once as sprites and paste them: much faster, but pins
+# are rounded to 1/4 pixel (see `StampCache`), so lines of stars shift a bit
+STAMPS = False
 
 
-center = (SIZE[0]//2, SIZE[1]//2)
-xrng = (-SIZE[0]//2, SIZE[0]//2)  # 0x range in Descartes
-yrng = (-SIZE[1]//2, SIZE[1]//2)  # 0y range in Descartes
+def init():
+  'Checks constants and calculates derived globals, call it after changing them'
+  global center, xrng, yrng, Stamps
+  center = (SIZE[0]//2, SIZE[1]//2)
+  xrng = (-SIZE[0]//2, SIZE[0]//2)  # 0x range in Descartes
+  yrng = (-SIZE[1]//2, SIZE[1]//2)  # 0y range in Descartes
+  Stamps = StampCache(points=False, store=True)  # stars: lines and polygons
+
+init()
 
 def rnd(x, tolerance=None, step=None):
   if not tolerance:
     return x
   else:
-    return random.randrange(x - tolerance, x + tolerance, step or 1)
-
-def as_list(xs, **mod):
-  'Converts `xs` to list and modify some items with args like _0=value/lambda'
-  l = list(xs)
-  for k in mod:
-    try:
-      assert k.startswith('_')
-      i = int(k[1:])
-      v = mod[k]
-      l[i] = v(l[i]) if callable(v) else v
-    except:
-      continue
-  return l
-
-def is_outside(pts, xr, yr):
-  '''Returns True if all `pts` are outside of the canvas. `xr`, `yr` are ranges
-  (min, max) for 0x, 0y.
-  '''
-  return all(
-    (p[0] < xr[0]) or (p[0] > xr[1]) or (p[1] < yr[0]) or (p[1] > yr[1])
-    for p in pts)
+    return rng.randrange(x - tolerance, x + tolerance, step or 1)
 
 def norm_angle(ang):
   'Normilizes angle (in usual trigonometric coordinates)'
@@ -72,55 +71,6 @@ def to_arc(ang1, ang2=None):
     a2 = norm_angle(270 + (90 - ang2))
     return reversed((a1, a2))  # reversed - clockwise
 
-def distance(pt1, pt2):
-  return math.sqrt(((pt2[0] - pt1[0])**2) + ((pt2[1] - pt1[1])**2))
-
-def polar_to_cartesian(pp, orig=None):
-  r'''Converts polar coordinates (angle, radius) to abstract Descartes (x,y)
-  if `orig` is None or to real/global Descrates if `orig` points out the
-  real cartesian coordinates of the origin point of the polar turning:
-
-   x,y...|
-         |^  ang
-  orig...|.\.___    Polar coord  (ang,dist) - vector tip is "x"
-         | /:
-         |/_:_____
-       0,0  :
-          orig
-  '''
-  ang, rad = pp
-  ang = math.radians(ang)
-  x = rad * math.cos(ang)
-  y = rad * math.sin(ang)
-  ox, oy = (0,0) if orig is None else orig
-  # if to return int-s I hit strange error with multiple points very close
-  # to each others, like additive error:
-  return (x + ox, y + oy)
-
-def cartesian_to_polar(p, orig=None):
-  r'''
-   x,y...|
-         |^  ang
-  orig...|.\.___    Polar coord  (ang,dist) - vector tip is "x"
-         | /:
-         |/_:_____
-       0,0  :
-          orig
-  '''
-  if orig is not None:
-    length = distance(p, orig)
-    x1, y1 = p[0] - orig[0], p[1] - orig[1]  # TODO is it right?
-    mul = x1 * 1 - y1 * 0  # 1,0 - coords of new vector
-    cos_ang = mul / (length * 1)
-    ang = math.degrees(math.acos(cos_ang))
-    return (length, ang)
-  else:
-    orig = (0, 0)
-    hipot = distance(p, orig)
-    sin_ang = p[1] / hipot
-    ang = math.degrees(math.asin(sin_ang))
-    return (hipot, ang)
-
 def draw_rim(dr, p, ang0, ang1):
   'Pseudo-3D sector (rim of a ring)'
   steps = 7
@@ -138,7 +88,7 @@ def draw_rim(dr, p, ang0, ang1):
   lws = abs(lwn - lw0)/(steps - 1)
   lwi = lw0
   for i in range(steps):
-    face_color = as_list(COLOR, _2=ci)
+    face_color = seq(COLOR, t=list, _2=ci)
     draw_sector(dr, p, ang0, ang1,
                 outer_radius=ri, inner_radius=ri-rwi,
                 face_color=face_color, shadow=True,
@@ -154,10 +104,14 @@ def draw_rim(dr, p, ang0, ang1):
               face_color=FLARECOLOR, shadow=False,
               line_width=1)
 
-def draw_sector(dr, p, ang0, ang1, *, outer_radius=RADIUS,
-                inner_radius=RADIUS-RINGWIDTH, shadow=False,
-                face_color=COLOR, line_width=3):
-  smooth = 5  # angle accuracy
+def draw_sector(dr, p, ang0, ang1, *, outer_radius=None,
+                inner_radius=None, shadow=False,
+                face_color=None, line_width=3):
+  'Defaults are RADIUS, RADIUS-RINGWIDTH, COLOR'
+  outer_radius = RADIUS if outer_radius is None else outer_radius
+  inner_radius = RADIUS-RINGWIDTH if inner_radius is None else inner_radius
+  face_color = COLOR if face_color is None else face_color
+  smooth = SMOOTH
   if ang1 < ang0:
     ang1 += 360 * (1 + (ang0 // 360)) # add N full turn like they are in ang0
   # Now make ang1 to follow ang0 (clockwise turn!), so: 120..0 is 120,121..360:
@@ -165,29 +119,41 @@ def draw_sector(dr, p, ang0, ang1, *, outer_radius=RADIUS,
   #ang0, ang1 = map(norm_angle, (ang0, ang1))
   ang1 = ang0 + delta_ang
   #print('%s..%s: %s' % (ang0, ang1, delta_ang))
-  shadow_color = as_list(face_color, _2=lambda cc: int(0.75*cc))
+  shadow_color = seq(face_color, _2=lambda cc: int(0.75*cc))
+  fills = (hsv(*face_color), hsv(*shadow_color))
+  rel, runs = sector_lines(ang0, ang1, outer_radius, inner_radius, smooth,
+                           SHADOWBAND if shadow else None)
+  # the sector is the same around any point, it's just moved to `p`:
+  ps = cartesian_to_canvas((rel + (p[0], p[1], p[0], p[1])).reshape(-1, 2),
+                           SIZE).reshape(-1, 4)
+  for i0, i1, is_shadow in runs:
+    draw_lines(dr, ps[i0:i1], fills[is_shadow], line_width)
+
+@functools.lru_cache(maxsize=None)
+def sector_lines(ang0, ang1, outer_radius, inner_radius, smooth, shadowband):
+  '''Lines of the sector (see `draw_sector()`) with the center at (0,0): array
+  of shape (N, 4) - the outer and inner points (cartesian) of every 1/`smooth`
+  degree, and runs of lines of one color as tuple of `(start, end, shadow)`,
+  `shadow` - the lines are in the shadow band (`shadowband` of the sector
+  ends, None - no shadow). Cached: all rims of all stars share the same few
+  sectors
+  '''
   sm_ang0 = ang0 * smooth
   sm_ang1 = ang1 * smooth
-  for ang in range(sm_ang0, sm_ang1):
-    if shadow and (ang <= sm_ang0 + SHADOWBAND or ang >= sm_ang1 - SHADOWBAND):
-      fill_color = 'hsv(%d,%d%%,%d%%)' % tuple(shadow_color)
-    else:
-      fill_color = 'hsv(%d,%d%%,%d%%)' % tuple(face_color)
-    ang = ang / smooth
-    #angn = norm_angle(ang)  # don't !
-    pp1 = (ang, outer_radius)
-    pp2 = (ang, inner_radius)
-    p1 = polar_to_cartesian(pp1, p)
-    p2 = polar_to_cartesian(pp2, p)
-    p1 = cartesian_to_canvas(p1)
-    p2 = cartesian_to_canvas(p2)
-    dr.line([p1,p2], fill=fill_color, width=line_width)
-
-def canvas_to_cartesian(pt):
-  return (pt[0] - (SIZE[0]//2), (SIZE[1]//2) - pt[1])
-
-def cartesian_to_canvas(pt):
-  return (pt[0] + (SIZE[0]//2), (SIZE[1]//2) - pt[1])
+  sm_angs = np.arange(sm_ang0, sm_ang1)
+  if shadowband is None:
+    shadowed = np.zeros(len(sm_angs), dtype=bool)
+  else:
+    shadowed = ((sm_angs <= sm_ang0 + shadowband) |
+                (sm_angs >= sm_ang1 - shadowband))
+  angs = sm_angs / smooth
+  #angn = norm_angle(ang)  # don't !
+  p1s = polar_to_cartesian(polar_pairs(angs, outer_radius))
+  p2s = polar_to_cartesian(polar_pairs(angs, inner_radius))
+  ends = (np.flatnonzero(shadowed[1:] != shadowed[:-1]) + 1).tolist()
+  starts = [0] + ends if len(shadowed) else []
+  runs = zip(starts, ends + [len(shadowed)], shadowed[starts].tolist())
+  return np.hstack((p1s, p2s)), tuple(runs)
 
 def draw_star(dr, p0):
   '`p0` - central point of the new/drawn star'
@@ -206,14 +172,9 @@ def draw_star(dr, p0):
 
 def draw_hexagon(dr, p0, radius, color):
   '6-edges polygon: a hexagon'
-  ang = IMGTILT + 30
-  ps = []
-  for i in range(6):
-    p = polar_to_cartesian((ang, radius), p0)
-    cp = cartesian_to_canvas(p)
-    ps.append(cp)
-    ang += 60
-  dr.polygon(ps, fill=color)
+  pps = [(IMGTILT + 30 + i*60, radius) for i in range(6)]
+  ps = cartesian_to_canvas(polar_to_cartesian(pps, p0), SIZE)
+  dr.polygon([tuple(p) for p in ps.tolist()], fill=color)
 
 def draw_pin(dr, p0):
   'Pin - the area in the middle of rings'
@@ -221,9 +182,9 @@ def draw_pin(dr, p0):
   smooth = 4
   cs = PINCONTRAST/(step - 1)
   radius = (RINGSDENSITY*0.3) * RADIUS
-  ci = as_list(IMGBG)
+  ci = seq(IMGBG, t=list)
   for i in range(step):
-    color = 'hsv(%d,%d%%,%d%%)' % tuple(ci)
+    color = hsv(*ci)
     draw_hexagon(dr, p0, radius, color)
     radius -= smooth
     if radius <= 0: break
@@ -319,18 +280,43 @@ def find_pins():
   ps.add(c0)
   return ps
 
-def draw_all(dr, ps):
+def draw_all(img, dr, ps):
   def draw_star_and_pin(dr, p):
     draw_pin(dr, p)
     draw_star(dr, p)
+  def stamp_star_and_pin(dr, cp):
+    draw_star_and_pin(dr, canvas_to_cartesian(cp, SIZE))
+  key = ('star', IMGBG, RADIUS, RINGSDENSITY, COLOR, FLARECOLOR, FLARESHORTERON,
+         PINCONTRAST, RINGWIDTH, SHADOWBAND, SHADOWCONTRAST, IMGTILT, SMOOTH)
+  extent = (RINGSDENSITY + 1) * RADIUS + 3  # +3: width of sector lines
   for p in ps:
-    draw_star_and_pin(dr, p)
+    if STAMPS:
+      Stamps.stamp(img, key, cartesian_to_canvas(p, SIZE), extent,
+                   stamp_star_and_pin)
+    else:
+      draw_star_and_pin(dr, p)
 
+def new_image(size=None):
+  'Blank picture, or its tile of `size` (see `genart.tile.tiles()`)'
+  return Image.new("RGB", size or SIZE, hsv(*IMGBG))
 
-############################## draw ####################################
-img = Image.new("RGB", SIZE, 'hsv(%d,%d%%,%d%%)' % IMGBG)
-dr = ImageDraw.Draw(img)
-draw_all(dr, find_pins())
+def preview(scale):
+  '''Parameters of the preview at `scale` (see `genart.preview`): rings are
+  smaller, their rims of fewer lines, stars are stamped'''
+  smooth = max(1, round(SMOOTH * scale))
+  return {'SIZE': scaled(SIZE, scale), 'RADIUS': scaled(RADIUS, scale),
+          'RINGWIDTH': scaled(RINGWIDTH, scale), 'SMOOTH': smooth,
+          'SHADOWBAND': round(SHADOWBAND * smooth / SMOOTH), 'STAMPS': True}
+
+def draw(img, dr):
+  'Draws the picture on `img`, `dr` is its `ImageDraw.Draw`'
+  draw_all(img, dr, find_pins())
 
-with open(OUT, 'wb') as f:
-  img.save(f, format='PNG')
\ No newline at end of file
+
+############################## draw ####################################
+if __name__ == '__main__':
+  rng.seed(SEED)
+  img = new_image()
+  draw(img, ImageDraw.Draw(img))
+  with open(OUT, 'wb') as f:
+    img.save(f, format='PNG', pnginfo=rng.pnginfo())
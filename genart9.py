@@ -1,14 +1,24 @@
 from PIL import Image, ImageDraw, ImageColor
 import math
+import numpy as np
+from genart.color import hsv
+from genart.draw import draw_circle
+from genart.geom import affine, canvas_to_cartesian, cartesian_to_canvas
+from genart.gradient import draw_gradient
+from genart.layers import Stage, draw_stages
+from genart.rng import rng
+from genart.stamp import StampCache
+from genart.util import seq
 
 
 OUT = 'genart9.png'
+SEED = None  # seed of random numbers, None - a random one
 IMGBG = (0, 0, 100)  # HSV
 SIZE = (1400, 800)
 COLOR = (18, 55, 15)  # HSV
 CROSSSIDE = 80
 PENWIDTH = 10
-SINMAGN = CROSSSIDE/5
+STAMPS = True  # draw crosses once as sprites and paste them
 
 # x<0: -3*sin(sqrt(-x)), x>0: 3*sin(sqrt(x))
 
@@ -16,20 +26,6 @@ Sqrt2 = math.sqrt(2)
 
 def square_diag(a): return a * Sqrt2
 
-SqDiag = square_diag(CROSSSIDE)
-
-def seq(xs, **mod):
-  'Converts `xs` to list/tuple, modifies items with args like _0=value/lambda'
-  l = list(xs)
-  for k in mod:
-    try:
-      assert k.startswith('_')
-      i = int(k[1:])
-      v = mod[k]
-      l[i] = v(l[i]) if callable(v) else v
-    except:
-      continue
-  return tuple(l) if isinstance(xs, tuple) else list(l)
 
 def cut_uneven_edges():
   'Changes SIZE to be more relevant to CROSSSIDE'
@@ -38,26 +34,23 @@ def cut_uneven_edges():
   rows = SIZE[1] // CROSSSIDE
   SIZE = (cols*CROSSSIDE, rows*CROSSSIDE)
 
-cut_uneven_edges()
+def init():
+  'Checks constants and calculates derived globals, call it after changing them'
+  global SqDiag, SinMagn, Stamps
+  SqDiag = square_diag(CROSSSIDE)
+  SinMagn = CROSSSIDE/5
+  Stamps = StampCache(store=True)
+  cut_uneven_edges()
 
-# def canvas_to_cartesian(pt):
-#   return (pt[0] - (SIZE[0]//2), (SIZE[1]//2) - pt[1])
+init()
 
-def cartesian_to_canvas(pt):
-  return (pt[0] + (SIZE[0]//2), (SIZE[1]//2) - pt[1])
-
-def affine(p, mx):
-  x,y = p
-  ((a,b,c), (d,e,f)) = mx
-  x1 = a*x + b*y + c
-  y1 = d*x + e*y + f
-  return (x1, y1)
-
-def get_sin(magn=SINMAGN, half_period=SqDiag/2):
+def get_sin(magn=None, half_period=None):
   '''Returns a function (as {'fn':sin, 'domain':_}) which will be used to
   calculate points of the 1/2 cross side (aka swastika's ray). Coords will
-  be abstract.
+  be abstract. Defaults are SinMagn and SqDiag/2.
   '''
+  magn = SinMagn if magn is None else magn
+  half_period = SqDiag/2 if half_period is None else half_period
   domain = (-int(half_period), int(half_period))
   fn = lambda x: magn * math.sin(x * math.pi/half_period)
   table = {x:fn(x) for x in range(domain[0], domain[1]+1, 1)}
@@ -78,32 +71,30 @@ def rays_points(orig=None, get_func=get_sin):
   for a in (a1, a2):
     rots.append([[math.cos(a), -math.sin(a), ox],
                  [math.sin(a), math.cos(a), oy]])
-  ps = []
-  for rot in rots:
-    ps.extend(affine(p, rot) for p in sin_ps)
-  return ps
-
-def draw_circle(dr, p, radius, antialiasing=True, **kw):
-  l = p[0] - radius
-  r = p[0] + radius
-  t = p[1] - radius
-  b = p[1] + radius
-  dr.ellipse((l,t,r,b), **kw)
+  return np.concatenate([affine(sin_ps, rot) for rot in rots])
 
 def draw_cross(dr, ps):
   radius = PENWIDTH
-  fill = 'hsv(%d,%d%%,%d%%)' % COLOR
-  for p in ps:
-    cp = cartesian_to_canvas(p)
+  fill = hsv(*COLOR)
+  for cp in cartesian_to_canvas(ps, SIZE).tolist():
     draw_circle(dr, cp, radius, fill=fill)
 
-def draw_crosses(dr, pins, **kw):
-  for pin in pins:
-    ps = rays_points(orig=pin, get_func=get_sin)
+def draw_crosses(img, dr, pins, **kw):
+  def stamp_cross(dr, cp):
+    ps = rays_points(orig=canvas_to_cartesian(cp, SIZE), get_func=get_sin)
     draw_cross(dr, ps, **kw)
-
-def draw_gradient_bg(dr):
-  'Draws gradient background by nested rectangles'
+  key = ('cross', COLOR, CROSSSIDE, PENWIDTH, SinMagn)
+  extent = SqDiag/2 + SinMagn + PENWIDTH
+  for pin in pins:
+    if STAMPS:
+      Stamps.stamp(img, key, cartesian_to_canvas(pin, SIZE), extent, stamp_cross)
+    else:
+      ps = rays_points(orig=pin, get_func=get_sin)
+      draw_cross(dr, ps, **kw)
+
+def draw_gradient_bg(img):
+  '''Draws gradient background: nested rectangles, every pixel is filled once
+  (see `genart.gradient`)'''
   center = (SIZE[0]//2, SIZE[1]//2)
   n = 2  # ratio of the whole canvas area to final rectangle area
   aspect = SIZE[0] / SIZE[1]
@@ -113,15 +104,12 @@ def draw_gradient_bg(dr):
   v_n = IMGBG[2]
   v = COLOR[2]
   cs = (v_n - v + 1) / steps
+  colors = []  # of rectangles of heights SIZE[1] ... h_0 + 1
   for h in range(SIZE[1], h_0, -1):
-    w = aspect * h
-    x1 = center[0] - (w/2)
-    x2 = center[0] + (w/2)
-    y1 = center[1] - (h/2)
-    y2 = center[1] + (h/2)
-    color = 'hsv(%d,%d%%,%d%%)' % seq(COLOR, _2=v)
-    dr.rectangle([(x1,y1), (x2,y2)], fill=color)
+    colors.append(hsv(*seq(COLOR, _2=v)))
     v += cs
+  draw_gradient(img, 'rect', colors, center=center, outer=SIZE[1],
+                inner=h_0, aspect=aspect)
 
 def find_pins(_step=None):
   'Centers of crosses/swastikas in Descartes coords'
@@ -144,12 +132,26 @@ def find_pins(_step=None):
 #   for p in ps:
 #     dr.point(p, fill=color)
 
+def new_image(size=None):
+  'Blank picture, or its tile of `size` (see `genart.tile.tiles()`)'
+  return Image.new("RGB", size or SIZE, hsv(*IMGBG))
+
+def stages():
+  'Layer stages of the picture, see `genart.layers`'
+  return [Stage('background', ('SIZE', 'IMGBG', 'COLOR'),
+                lambda img, dr: draw_gradient_bg(img)),
+          Stage('crosses', ('SIZE', 'COLOR', 'CROSSSIDE', 'PENWIDTH', 'STAMPS'),
+                lambda img, dr: draw_crosses(img, dr, find_pins()))]
+
+def draw(img, dr):
+  'Draws the picture on `img`, `dr` is its `ImageDraw.Draw`'
+  draw_stages(img, dr, stages())
+
+
 ############################## draw ####################################
-img = Image.new("RGB", SIZE, 'hsv(%d,%d%%,%d%%)' % IMGBG)
-dr = ImageDraw.Draw(img)
-draw_gradient_bg(dr)
-ps = find_pins()
-draw_crosses(dr, ps)
-
-with open(OUT, 'wb') as f:
-  img.save(f, format='PNG')
\ No newline at end of file
+if __name__ == '__main__':
+  rng.seed(SEED)
+  img = new_image()
+  draw(img, ImageDraw.Draw(img))
+  with open(OUT, 'wb') as f:
+    img.save(f, format='PNG', pnginfo=rng.pnginfo())